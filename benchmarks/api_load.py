@@ -0,0 +1,146 @@
+# =========================================================
+# HARLUR COFFEE - LOAD TEST JSON LOOKUP API
+# =========================================================
+# Menembak harlur.api dengan banyak thread klien (koneksi keep-alive per
+# thread) lalu melaporkan throughput dan latensi p50/p95/p99.
+#
+#   python -m benchmarks.datagen --dir /tmp/hb --batches 100000
+#   python -m benchmarks.api_load --db /tmp/hb/data_produksi.db --serve --threads 16 --seconds 20
+#   python -m benchmarks.api_load --db /tmp/hb/data_produksi.db --url http://127.0.0.1:8000
+#
+# Campuran permintaan (--mix get,lookup,list dalam persen): GET satu batch
+# (80% ID "populer" untuk meniru lonjakan scan satu produk), POST lookup
+# --lookup-size ID, dan daftar status near.
+
+import argparse
+import http.client
+import json
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from benchmarks.run import _percentile
+
+
+def sample_ids(db_path, n=5000, seed=0):
+    conn = sqlite3.connect(db_path)
+    ids = [r[0] for r in conn.execute("SELECT batch_id FROM produksi WHERE deleted_at IS NULL")]
+    conn.close()
+    rng = random.Random(seed)
+    return rng.sample(ids, min(n, len(ids)))
+
+
+def worker(host, port, ids, mix, lookup_size, deadline, seed, out):
+    rng = random.Random(seed)
+    popular = ids[:20]
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    lat, errors = {"get": [], "lookup": [], "list": []}, 0
+    while time.perf_counter() < deadline:
+        r = rng.random() * 100
+        t = time.perf_counter()
+        try:
+            if r < mix[0]:
+                kind = "get"
+                b = rng.choice(popular) if rng.random() < 0.8 else rng.choice(ids)
+                conn.request("GET", f"/batch/{quote(b, safe='')}")
+            elif r < mix[0] + mix[1]:
+                kind = "lookup"
+                body = json.dumps({"batch_ids": rng.sample(ids, min(lookup_size, len(ids)))})
+                conn.request("POST", "/batches:lookup", body, {"Content-Type": "application/json"})
+            else:
+                kind = "list"
+                conn.request("GET", "/batches?status=near&limit=50")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 500:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        lat[kind].append((time.perf_counter() - t) * 1000)
+    conn.close()
+    out.append((lat, errors))
+
+
+def _wait_ready(host, port, timeout=20):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            c = http.client.HTTPConnection(host, port, timeout=1)
+            c.request("GET", "/health")
+            if c.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("API tidak siap")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test harlur.api")
+    ap.add_argument("--db", required=True, help="Database untuk sampel batch_id (dan --serve)")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--serve", action="store_true", help="Jalankan `python -m harlur.api` di subprocess")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--mix", default="90,5,5", help="Persen get,lookup,list")
+    ap.add_argument("--lookup-size", type=int, default=200)
+    ap.add_argument("--out", help="Simpan hasil ke JSON")
+    args = ap.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    mix = [float(x) for x in args.mix.split(",")]
+    ids = sample_ids(args.db)
+
+    server = None
+    if args.serve:
+        server = subprocess.Popen([sys.executable, "-m", "harlur.api", "--db", args.db,
+                                   "--host", host, "--port", str(port)])
+    try:
+        _wait_ready(host, port)
+        deadline = time.perf_counter() + args.seconds
+        out = []
+        threads = [threading.Thread(target=worker, args=(host, port, ids, mix, args.lookup_size,
+                                                          deadline, i, out))
+                   for i in range(args.threads)]
+        t = time.perf_counter()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.perf_counter() - t
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    hasil = {"threads": args.threads, "seconds": elapsed, "errors": sum(e for _, e in out), "per_jenis": {}}
+    total = 0
+    for kind in ("get", "lookup", "list"):
+        samples = [x for lat, _ in out for x in lat[kind]]
+        total += len(samples)
+        if samples:
+            hasil["per_jenis"][kind] = {
+                "n": len(samples),
+                "p50_ms": _percentile(samples, 0.50),
+                "p95_ms": _percentile(samples, 0.95),
+                "p99_ms": _percentile(samples, 0.99),
+            }
+    hasil["rps"] = total / elapsed
+
+    print(f"{total} permintaan dalam {elapsed:.1f} s -> {hasil['rps']:.0f} req/s, error {hasil['errors']}")
+    for kind, r in hasil["per_jenis"].items():
+        print(f"  {kind:<8} n={r['n']:<7} p50 {r['p50_ms']:.2f} ms  p95 {r['p95_ms']:.2f} ms  p99 {r['p99_ms']:.2f} ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(hasil, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# =========================================================
+# HARLUR COFFEE - GENERATOR DATA PRODUKSI SINTETIS
+# =========================================================
+# Membuat database `produksi`/`log_aktivitas` realistis (nilai diambil dari
+# pola data backup) beserta gambar QR-nya, untuk benchmark dan load test.
+# Lot bahan baku mingguan per bahan (kopi = blend dari dua lot green bean)
+# ikut dibuat dan ditautkan ke setiap batch (lihat harlur/bahan.py), begitu
+# juga mutasi stok gudang: masuk, sebagian pindah, lalu keluar (harlur/stok.py).
+#
+#   python -m benchmarks.datagen --dir /tmp/harlur_bench --batches 100000
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from harlur.db import connect, init_db
+from harlur.qr import consumer_link, make_qr_image
+from harlur.storage import QRStore
+from harlur.varian import assign_variant_ids
+
+SITES = ["Bandung", "Jakarta", "Arcamanik", "Jatinangor"]
+VARIANTS = ["Matcha Latte", "Aren Latte", "Chocolate", "Americano", "Matcha", "Thai Tea", "Kopi Gula Aren"]
+WAREHOUSES = ["Bandung", "Jatinangor", "Pegangsaan Timur", "Arcamanik", "Cikarang"]
+PICS = ["Alya", "Faqih", "Hafizh", "Intan", "Rizky", "Salsa", "Dimas"]
+# Bahan baku per varian; lot baru setiap minggu per bahan
+RESEP = {
+    "Matcha Latte": ["matcha", "susu"], "Matcha": ["matcha"], "Aren Latte": ["kopi", "gula aren", "susu"],
+    "Chocolate": ["cocoa", "susu"], "Americano": ["kopi"], "Thai Tea": ["teh", "susu"],
+    "Kopi Gula Aren": ["kopi", "gula aren", "susu"],
+}
+SUPPLIERS = {
+    "matcha": "Uji Matcha Co.", "susu": "KPBS Pangalengan", "kopi": "Roastery Harlur",
+    "gula aren": "Aren Garut", "cocoa": "Kakao Jembrana", "teh": "Perkebunan Malabar",
+    "green bean": "Petani Gunung Puntang",
+}
+
+LOGO_PATH = Path(__file__).resolve().parents[1] / "logo_harlur.png"
+
+
+def batch_row(i, n, rng, start):
+    # Tanggal produksi tersebar merata selama dua tahun terakhir
+    tanggal = start + timedelta(days=i * 730 // max(n, 1))
+    site = rng.choice(SITES)
+    varian = rng.choice(VARIANTS)
+    expired = tanggal + timedelta(days=rng.choice([5, 30, 90, 180, 180, 180, 365]))
+    ts = f"{tanggal} {rng.randint(7, 20):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    batch_id = f"{site[:3].upper()}-{i:07d}"
+    return (batch_id, str(tanggal), rng.choice(PICS), site, varian,
+            rng.choice(WAREHOUSES), str(expired), ts, ts)
+
+
+def generate(data_dir, n_batches, real_qr=500, seed=42, logs_per_batch=2):
+    """Isi `data_dir` dengan data_produksi.db + qr_codes/ untuk `n_batches` batch.
+
+    Hanya `real_qr` gambar pertama yang benar-benar di-render; sisanya salinan
+    byte dari gambar tersebut supaya jumlah & ukuran file tetap realistis
+    tanpa menghabiskan waktu berjam-jam untuk 1 juta QR.
+    """
+    data_dir = Path(data_dir)
+    qr_dir = data_dir / "qr_codes"
+    store = QRStore(qr_dir)
+    db_path = data_dir / "data_produksi.db"
+    if db_path.exists():
+        db_path.unlink()
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=730)
+
+    conn = connect(db_path)
+    init_db(conn)
+
+    chunk = 10_000
+    rendered = []
+    for off in range(0, n_batches, chunk):
+        rows = [batch_row(i, n_batches, rng, start) for i in range(off, min(off + chunk, n_batches))]
+        with conn:
+            conn.executemany("""
+                INSERT INTO produksi (
+                    batch_id, tanggal, pic, tempat_produksi, varian_produksi,
+                    lokasi_gudang, expired_date, timestamp, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.executemany(
+                "INSERT INTO log_aktivitas (waktu, deskripsi) VALUES (?, ?)",
+                [(r[7], f"Tambah data {r[0]}") for r in rows for _ in range(logs_per_batch)]
+            )
+
+        for r in rows:
+            if len(rendered) < real_qr:
+                path = store.save(r[0], make_qr_image(consumer_link(r[0]), LOGO_PATH))
+                rendered.append(path.read_bytes())
+            else:
+                store.write_bytes(r[0], rendered[rng.randrange(len(rendered))])
+
+    with conn:
+        assign_variant_ids(conn)
+    generate_lots(conn, start, rng)
+    generate_stok(conn, rng)
+    conn.close()
+    return db_path, qr_dir
+
+
+def generate_lots(conn, start, rng, weeks=105):
+    """Lot mingguan per bahan + tautan batch_lot sesuai resep varian (satu statement)."""
+    lots = []
+    for week in range(weeks):
+        tgl = str(start + timedelta(weeks=week))
+        for bahan in SUPPLIERS:
+            lots.append((f"{bahan[:3].upper()}-{week:03d}", bahan, SUPPLIERS[bahan], tgl))
+    with conn:
+        conn.executemany(
+            "INSERT INTO lot_bahan (kode, bahan, supplier, tanggal_terima) VALUES (?, ?, ?, ?)", lots
+        )
+        # Kopi sangrai minggu ini = blend green bean minggu ini dan minggu lalu
+        conn.executemany("""
+            INSERT INTO lot_asal (lot_id, parent_id)
+            SELECT k.id, g.id FROM lot_bahan k, lot_bahan g WHERE k.kode = ? AND g.kode = ?
+        """, [(f"KOP-{w:03d}", f"GRE-{g:03d}") for w in range(weeks) for g in {max(w - 1, 0), w}])
+        conn.execute("CREATE TEMP TABLE _resep (varian TEXT, bahan TEXT)")
+        conn.executemany("INSERT INTO _resep VALUES (?, ?)",
+                         [(v, b) for v, daftar in RESEP.items() for b in daftar])
+        conn.execute("""
+            INSERT OR IGNORE INTO batch_lot (batch_id, lot_id)
+            SELECT p.batch_id, l.id
+            FROM produksi p
+            JOIN _resep r ON r.varian = p.varian_produksi
+            JOIN lot_bahan l ON l.bahan = r.bahan
+             AND l.kode = upper(substr(r.bahan, 1, 3)) || '-' ||
+                 printf('%03d', CAST((julianday(p.tanggal) - julianday(?)) / 7 AS INTEGER))
+        """, (str(start),))
+        conn.execute("DROP TABLE _resep")
+
+
+def generate_stok(conn, rng, today=None):
+    """Mutasi stok per batch: masuk di lokasi_gudang, 30% dipindah sebagian,
+    dan batch berumur > 1 tahun sudah habis keluar. Ringkasan diisi trigger."""
+    batas = str((today or date.today()) - timedelta(days=365))
+    rows = []
+    for batch_id, tanggal, gudang in conn.execute(
+        "SELECT batch_id, tanggal, lokasi_gudang FROM produksi ORDER BY id"
+    ).fetchall():
+        ts = f"{tanggal} 21:00:00"
+        stok = {gudang: rng.randint(20, 60)}
+        rows.append((ts, batch_id, "masuk", None, gudang, stok[gudang]))
+        if rng.random() < 0.3:
+            ke = rng.choice([w for w in WAREHOUSES if w != gudang])
+            stok[ke] = rng.randint(1, stok[gudang] // 2)
+            stok[gudang] -= stok[ke]
+            rows.append((ts, batch_id, "pindah", gudang, ke, stok[ke]))
+        if tanggal < batas:
+            rows.extend((ts, batch_id, "keluar", g, None, n) for g, n in stok.items())
+    with conn:
+        conn.executemany(
+            "INSERT INTO stok_mutasi (waktu, batch_id, jenis, dari, ke, jumlah) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generator data produksi sintetis Harlur")
+    ap.add_argument("--dir", required=True, help="Folder tujuan (database + qr_codes/)")
+    ap.add_argument("--batches", type=int, default=10_000)
+    ap.add_argument("--real-qr", type=int, default=500, help="Jumlah QR yang benar-benar di-render")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    db_path, qr_dir = generate(args.dir, args.batches, args.real_qr, args.seed)
+    print(f"{args.batches} batch -> {db_path} ({time.perf_counter() - t:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
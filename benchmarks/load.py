@@ -0,0 +1,219 @@
+# =========================================================
+# HARLUR COFFEE - LOAD TEST SCAN KONSUMEN & OPERATOR SERENTAK
+# =========================================================
+# Menjalankan jalur data aplikasi (tanpa UI) dari banyak thread sekaligus,
+# masing-masing dengan koneksi SQLite sendiri seperti sesi Streamlit, untuk
+# melihat kapan lock SQLite / kontensi thread mulai terasa:
+#
+#   consumer  -> get_batch + katalog varian + QR base64 + kartu HTML
+#   tambah    -> seperti tambah_data: ID otomatis, INSERT, log, QR, auto-backup
+#   edit      -> update_batch + log aktivitas
+#   listing   -> tabel Lihat lewat cache query (seperti tab Lihat)
+#
+# Backup memakai LocalDirBackend (folder lokal) sebagai pengganti GitHub.
+# Semua tulis terjadi di salinan database di folder kerja sementara.
+#
+#   python -m benchmarks.datagen --dir /tmp/hb --batches 20000
+#   python -m benchmarks.load --dir /tmp/hb --threads 1,4,16 --seconds 15
+#   python -m benchmarks.load --dir /tmp/hb --mix consumer=70,tambah=10,edit=10,listing=10 --wal
+#
+# Setiap level --threads dijalankan bergantian; hasil per jenis operasi:
+# throughput, p50/p95/p99, dan jumlah error per jenis exception.
+
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.run import LOGO_PATH, _percentile
+from harlur import produksi
+from harlur.backup import LocalDirBackend, produksi_csv
+from harlur.batch_ids import next_batch_id
+from harlur.cache import QueryCache
+from harlur.db import connect, init_db
+from harlur.qr import consumer_link, make_qr_image
+from harlur.render import consumer_card_html, listing_html, load_qr_base64
+from harlur.storage import QRStore
+from harlur.varian import info_for
+
+OPS = ("consumer", "tambah", "edit", "listing")
+DEFAULT_MIX = "consumer=90,tambah=4,edit=4,listing=2"
+SITES = ["Bandung", "Jakarta", "Arcamanik"]
+VARIANTS = ["Matcha Latte", "Aren Latte", "Chocolate", "Thai Tea"]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise SystemExit(f"Operasi tidak dikenal: {name} (pilihan: {', '.join(OPS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Harness:
+    """Salinan kerja database + QR dan implementasi tiap jenis operasi."""
+
+    def __init__(self, data_dir, work_dir, autobackup=True, wal=False):
+        self.src = Path(data_dir)
+        self.work = Path(work_dir)
+        self.db_path = self.work / "data_produksi.db"
+        shutil.copy(self.src / "data_produksi.db", self.db_path)
+        self.qr_read = QRStore(self.src / "qr_codes")
+        self.qr_write = QRStore(self.work / "qr_codes")
+        self.backend = LocalDirBackend(self.work / "backup")
+        self.autobackup = autobackup
+        self.query_cache = QueryCache()
+
+        conn = connect(self.db_path)
+        if wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        init_db(conn)
+        self.batch_ids = [r[0] for r in conn.execute("SELECT batch_id FROM produksi WHERE deleted_at IS NULL")]
+        self.journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+    def qr_path(self, batch_id):
+        path = self.qr_write.locate(batch_id)
+        return path if path.exists() else self.qr_read.locate(batch_id)
+
+    def consumer(self, conn, rng):
+        batch_id = rng.choice(self.batch_ids)
+        df = produksi.get_batch(conn, batch_id)
+        if df is None:
+            raise LookupError(f"{batch_id} tidak ditemukan")
+        data = df.iloc[0]
+        consumer_card_html(data, batch_id, load_qr_base64(self.qr_path(batch_id)), info=info_for(conn, data))
+
+    def tambah(self, conn, rng):
+        tanggal = str(date.today())
+        batch_id = next_batch_id(conn, rng.choice(SITES), rng.choice(VARIANTS), tanggal)
+        produksi.insert_batch(conn, batch_id, tanggal, "Load", rng.choice(SITES), rng.choice(VARIANTS),
+                              "Jatinangor", str(date.today() + timedelta(days=180)))
+        produksi.log_activity(conn, f"Tambah data {batch_id}")
+        self.qr_write.save(batch_id, make_qr_image(consumer_link(batch_id), LOGO_PATH))
+        if self.autobackup:
+            self.backend.put(f"auto_backup_{batch_id}.csv", produksi_csv(conn), f"Auto-backup batch {batch_id}")
+
+    def edit(self, conn, rng):
+        batch_id = rng.choice(self.batch_ids)
+        produksi.update_batch(conn, batch_id, rng.choice(SITES), rng.choice(VARIANTS), "Cikarang",
+                              str(date.today() + timedelta(days=rng.randint(1, 365))))
+        produksi.log_activity(conn, f"Edit batch {batch_id}")
+
+    def listing(self, conn, rng):
+        self.query_cache.call(conn, self._lihat_html)
+
+    def _lihat_html(self, conn):
+        df = produksi.list_produksi(conn)
+        return listing_html(df, self.qr_path) if not df.empty else None
+
+
+def worker(h, mix, deadline, seed, think_ms, out):
+    rng = random.Random(seed)
+    ops, weights = list(mix), list(mix.values())
+    conn = connect(h.db_path)
+    lat = {op: [] for op in ops}
+    errors = {op: Counter() for op in ops}
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        t = time.perf_counter()
+        try:
+            getattr(h, op)(conn, rng)
+        except Exception as e:
+            errors[op][f"{type(e).__name__}: {str(e)[:60]}"] += 1
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        else:
+            lat[op].append((time.perf_counter() - t) * 1000)
+        if think_ms:
+            time.sleep(rng.expovariate(1000 / think_ms))
+    conn.close()
+    out.append((lat, errors))
+
+
+def run_level(h, mix, threads, seconds, think_ms, seed=0):
+    out = []
+    deadline = time.perf_counter() + seconds
+    pool = [threading.Thread(target=worker, args=(h, mix, deadline, seed + i, think_ms, out))
+            for i in range(threads)]
+    t = time.perf_counter()
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    elapsed = time.perf_counter() - t
+
+    hasil = {"threads": threads, "seconds": elapsed, "per_op": {}}
+    total_ok = total_err = 0
+    for op in mix:
+        samples = [x for lat, _ in out for x in lat[op]]
+        errs = Counter()
+        for _, e in out:
+            errs.update(e[op])
+        n_err = sum(errs.values())
+        total_ok += len(samples)
+        total_err += n_err
+        r = {"ok": len(samples), "errors": n_err, "rps": len(samples) / elapsed}
+        if samples:
+            r.update(p50_ms=_percentile(samples, 0.50), p95_ms=_percentile(samples, 0.95),
+                     p99_ms=_percentile(samples, 0.99))
+        if errs:
+            r["error_types"] = dict(errs.most_common(5))
+        hasil["per_op"][op] = r
+    hasil["rps"] = total_ok / elapsed
+    hasil["error_rate"] = total_err / (total_ok + total_err) if total_ok + total_err else 0.0
+    return hasil
+
+
+def print_level(hasil):
+    print(f"\n{hasil['threads']} thread: {hasil['rps']:.1f} op/s, error {hasil['error_rate']:.2%}")
+    for op, r in hasil["per_op"].items():
+        if r["ok"]:
+            print(f"  {op:<9} {r['rps']:8.1f} op/s  p50 {r['p50_ms']:8.1f}  p95 {r['p95_ms']:8.1f}  "
+                  f"p99 {r['p99_ms']:8.1f} ms  error {r['errors']}")
+        else:
+            print(f"  {op:<9} tidak ada yang berhasil, error {r['errors']}")
+        for kind, n in r.get("error_types", {}).items():
+            print(f"            {n}x {kind}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test scan konsumen & operator serentak")
+    ap.add_argument("--dir", required=True, help="Folder hasil benchmarks.datagen")
+    ap.add_argument("--threads", default="1,4,16", help="Level jumlah thread, dipisah koma")
+    ap.add_argument("--seconds", type=float, default=10, help="Durasi per level")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="Bobot operasi, mis. consumer=90,tambah=4,edit=4,listing=2")
+    ap.add_argument("--think-ms", type=float, default=0, help="Rata-rata jeda antar operasi per thread")
+    ap.add_argument("--no-autobackup", action="store_true", help="tambah tanpa auto-backup CSV")
+    ap.add_argument("--wal", action="store_true", help="Jalankan dengan journal_mode=WAL")
+    ap.add_argument("--out", help="Simpan hasil ke JSON")
+    args = ap.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(x) for x in args.threads.split(",")]
+    with tempfile.TemporaryDirectory(prefix="harlur_load_") as work:
+        h = Harness(args.dir, work, autobackup=not args.no_autobackup, wal=args.wal)
+        print(f"{len(h.batch_ids)} batch, journal_mode={h.journal}, mix {args.mix}")
+        hasil = [run_level(h, mix, n, args.seconds, args.think_ms, seed=i * 1000) for i, n in enumerate(levels)]
+        for r in hasil:
+            print_level(r)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mix": mix, "journal_mode": h.journal, "levels": hasil}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# =========================================================
+# HARLUR COFFEE - PERBANDINGAN FORMAT PAYLOAD QR
+# =========================================================
+# Membandingkan payload lama (?batch_id=, mode byte, ECC M) dengan payload
+# ringkas (?B=, mode alfanumerik, ECC dipilih sesuai logo): versi QR,
+# jumlah modul, panjang payload, waktu decode cv2, dan tingkat keberhasilan
+# decode pada gambar yang didegradasi (label kecil, blur, JPEG, miring).
+#
+#   python -m benchmarks.qr_payload --samples 50 --out qr_payload.json
+
+import argparse
+import io
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import qrcode
+from PIL import Image, ImageFilter
+from qrcode.constants import ERROR_CORRECT_M
+
+from harlur.batch_ids import format_batch_id, make_prefix
+from harlur.qr import (
+    BORDER, BOX_SIZE, LOGO_SIZE, batch_id_from_payload, build_qr, consumer_link,
+    decode_qr, legacy_consumer_link, make_qr_image,
+)
+
+from benchmarks.datagen import SITES, VARIANTS
+
+LOGO_PATH = Path(__file__).resolve().parents[1] / "logo_harlur.png"
+ECC_NAMA = {qrcode.constants.ERROR_CORRECT_L: "L", ERROR_CORRECT_M: "M",
+            qrcode.constants.ERROR_CORRECT_Q: "Q", qrcode.constants.ERROR_CORRECT_H: "H"}
+
+
+def legacy_image(link, logo_path):
+    """Replika pembuatan QR sebelum format ringkas (byte mode, ECC default M)."""
+    qr = qrcode.QRCode(box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(link)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+    logo = Image.open(logo_path).resize((LOGO_SIZE, LOGO_SIZE))
+    img.paste(logo, ((img.size[0]-LOGO_SIZE)//2, (img.size[1]-LOGO_SIZE)//2))
+    return img, qr
+
+
+def compact_image(link, logo_path):
+    return make_qr_image(link, logo_path), build_qr(link)
+
+
+# ===================== DEGRADASI =====================
+def _label(img, qr, px_per_module):
+    # Simulasi label kecil / kamera jauh: skala ke N piksel per modul
+    size = (qr.modules_count + 2 * BORDER) * px_per_module
+    return img.resize((size, size), Image.BILINEAR)
+
+
+def _jpeg(img, quality):
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return Image.open(io.BytesIO(buf.getvalue()))
+
+
+DEGRADASI = {
+    "asli": lambda img, qr: img,
+    "label_3px": lambda img, qr: _label(img, qr, 3),
+    "label_2px": lambda img, qr: _label(img, qr, 2),
+    "blur": lambda img, qr: img.filter(ImageFilter.GaussianBlur(radius=3)),
+    "jpeg_q15": lambda img, qr: _jpeg(_label(img, qr, 4), 15),
+    "miring_10": lambda img, qr: img.rotate(10, expand=True, fillcolor="white"),
+    "kecil_blur": lambda img, qr: _label(img, qr, 3).filter(ImageFilter.GaussianBlur(radius=0.8)),
+}
+
+FORMATS = {
+    "lama": (legacy_consumer_link, legacy_image),
+    "ringkas": (consumer_link, compact_image),
+}
+
+
+def sample_batch_ids(n, seed):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    ids = []
+    for _ in range(n):
+        prefix = make_prefix(rng.choice(SITES), rng.choice(VARIANTS), start + timedelta(days=rng.randrange(730)))
+        ids.append(format_batch_id(prefix, rng.randint(1, 9999)))
+    return ids
+
+
+def evaluate(fmt, batch_ids, logo_path):
+    link_fn, image_fn = FORMATS[fmt]
+    versions, modules, lengths, ecc = [], [], [], {}
+    sukses = {name: 0 for name in DEGRADASI}
+    decode_ms = []
+    for batch_id in batch_ids:
+        link = link_fn(batch_id)
+        img, qr = image_fn(link, logo_path)
+        versions.append(qr.version)
+        modules.append(qr.modules_count)
+        lengths.append(len(link))
+        nama = ECC_NAMA[qr.error_correction]
+        ecc[nama] = ecc.get(nama, 0) + 1
+        for name, degrade in DEGRADASI.items():
+            probe = degrade(img, qr)
+            t = time.perf_counter()
+            data = decode_qr(probe)
+            if name == "asli":
+                decode_ms.append((time.perf_counter() - t) * 1000)
+            if batch_id_from_payload(data) == batch_id:
+                sukses[name] += 1
+
+    n = len(batch_ids)
+    return {
+        "versi_rata2": statistics.fmean(versions),
+        "versi_maks": max(versions),
+        "modul_rata2": statistics.fmean(modules),
+        "panjang_payload_rata2": statistics.fmean(lengths),
+        "ecc": ecc,
+        "decode_ms_p50": statistics.median(decode_ms),
+        "decode_ms_mean": statistics.fmean(decode_ms),
+        "sukses_decode": {name: v / n for name, v in sukses.items()},
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bandingkan format payload QR lama vs ringkas")
+    ap.add_argument("--samples", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--logo", default=str(LOGO_PATH))
+    ap.add_argument("--out", help="Simpan hasil ke JSON")
+    args = ap.parse_args(argv)
+
+    batch_ids = sample_batch_ids(args.samples, args.seed)
+    hasil = {fmt: evaluate(fmt, batch_ids, args.logo) for fmt in FORMATS}
+
+    kolom = list(FORMATS)
+    print(f"{'metrik':<26}" + "".join(f"{k:>12}" for k in kolom))
+    for key in ("versi_rata2", "versi_maks", "modul_rata2", "panjang_payload_rata2", "decode_ms_p50"):
+        print(f"{key:<26}" + "".join(f"{hasil[k][key]:>12.2f}" for k in kolom))
+    print(f"{'ecc':<26}" + "".join(f"{str(hasil[k]['ecc']):>12}" for k in kolom))
+    for name in DEGRADASI:
+        print(f"{'sukses ' + name:<26}" + "".join(f"{hasil[k]['sukses_decode'][name]:>12.0%}" for k in kolom))
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"samples": args.samples, "hasil": hasil}, indent=2))
+        print(f"Hasil -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
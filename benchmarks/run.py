@@ -0,0 +1,273 @@
+# =========================================================
+# HARLUR COFFEE - BENCHMARK JALUR UTAMA APLIKASI
+# =========================================================
+# Mengukur tambah_data, tabel Lihat, get_batch/Consumer View, export PDF,
+# pembuatan & pembacaan QR, telusur recall lot bahan, mutasi & stok gudang
+# (termasuk saran FEFO), serta backup/restore
+# (backend folder lokal sebagai pengganti GitHub). Hasil ditulis ke JSON
+# agar bisa dibandingkan antar-run:
+#
+#   python -m benchmarks.datagen --dir /tmp/hb --batches 10000
+#   python -m benchmarks.run --dir /tmp/hb --out hasil.json
+#   python -m benchmarks.run --dir /tmp/hb --out baru.json --baseline hasil.json
+
+import argparse
+import io
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from harlur import bahan, produksi, stok
+from harlur.backup import LocalDirBackend, produksi_csv, restore_produksi_csv
+from harlur.db import connect, init_db
+from harlur.qr import consumer_link, decode_qr, make_qr_image
+from harlur.render import consumer_card_html, listing_html, load_qr_base64
+from harlur.report import render_pdf
+from harlur.storage import QRStore
+from harlur.varian import info_for
+
+LOGO_PATH = Path(__file__).resolve().parents[1] / "logo_harlur.png"
+
+
+class Context:
+    """State bersama benchmark: salinan database kerja, folder QR, sampel ID."""
+
+    def __init__(self, data_dir, work_dir, seed=0):
+        self.src_dir = Path(data_dir)
+        self.work = Path(work_dir)
+        self.qr_store = QRStore(self.src_dir / "qr_codes")
+        self.db_path = self.work / "data_produksi.db"
+        shutil.copy(self.src_dir / "data_produksi.db", self.db_path)
+
+        self.conn = connect(self.db_path)
+        init_db(self.conn)
+        self.rng = random.Random(seed)
+        self.batch_ids = [r[0] for r in self.conn.execute("SELECT batch_id FROM produksi")]
+        self.n_batches = len(self.batch_ids)
+        self.backend = LocalDirBackend(self.work / "backup")
+        self.new_qr_store = QRStore(self.work / "qr_new")
+        self.seq = 0
+        self.lot_codes = bahan.lot_codes(self.conn)
+        self.stok_keys = self.conn.execute("SELECT gudang, variant_id FROM stok_level").fetchall()
+
+        self.sample_img = make_qr_image(consumer_link(self.batch_ids[0]), LOGO_PATH)
+        self.csv_bytes = produksi_csv(self.conn)
+        self.restore_conn = None
+
+    def random_batch(self):
+        return self.batch_ids[self.rng.randrange(self.n_batches)]
+
+
+# ===================== BENCHMARK =====================
+def bench_tambah_data(ctx):
+    ctx.seq += 1
+    batch_id = f"BENCH-{ctx.seq:07d}"
+    produksi.insert_batch(ctx.conn, batch_id, "2025-11-28", "Bench", "Bandung",
+                          "Matcha Latte", "Jatinangor", "2026-05-28")
+    produksi.log_activity(ctx.conn, f"Tambah data {batch_id}")
+    ctx.new_qr_store.save(batch_id, make_qr_image(consumer_link(batch_id), LOGO_PATH))
+
+
+def bench_tambah_autobackup(ctx):
+    # Auto-backup CSV seluruh tabel yang dijalankan setiap tambah_data
+    ctx.backend.put("auto_backup_bench.csv", produksi_csv(ctx.conn))
+
+
+def bench_lihat_listing(ctx):
+    df = produksi.list_produksi(ctx.conn)
+    listing_html(df, ctx.qr_store.locate)
+
+
+def bench_get_batch(ctx):
+    produksi.get_batch(ctx.conn, ctx.random_batch())
+
+
+def bench_consumer_view(ctx):
+    batch_id = ctx.random_batch()
+    data = produksi.get_batch(ctx.conn, batch_id).iloc[0]
+    consumer_card_html(data, batch_id, load_qr_base64(ctx.qr_store.locate(batch_id)), info=info_for(ctx.conn, data))
+
+
+def bench_export_pdf(ctx):
+    batch_id = ctx.random_batch()
+    info = produksi.get_batch(ctx.conn, batch_id).iloc[0]
+    render_pdf(info, io.BytesIO(), ctx.qr_store.locate(batch_id), LOGO_PATH)
+
+
+def bench_qr_generate(ctx):
+    make_qr_image(consumer_link(ctx.random_batch()), LOGO_PATH)
+
+
+def bench_qr_decode(ctx):
+    if not decode_qr(ctx.sample_img):
+        raise RuntimeError("QR gagal dibaca")
+
+
+def bench_recall_forward(ctx):
+    if not ctx.lot_codes:
+        raise RuntimeError("Data tanpa lot bahan: buat ulang dengan benchmarks.datagen")
+    bahan.forward_summary(bahan.trace_forward(ctx.conn, ctx.rng.choice(ctx.lot_codes)))
+
+
+def bench_recall_backward(ctx):
+    bahan.trace_backward(ctx.conn, ctx.random_batch())
+
+
+def bench_stok_mutasi(ctx):
+    # Satu scan masuk + satu scan keluar: INSERT buku mutasi + trigger ringkasan
+    batch_id = ctx.random_batch()
+    stok.record_movement(ctx.conn, batch_id, "masuk", "Bench", jumlah=2)
+    stok.record_movement(ctx.conn, batch_id, "keluar", "Bench", jumlah=2)
+
+
+def bench_stok_level(ctx):
+    if not ctx.stok_keys:
+        raise RuntimeError("Data tanpa mutasi stok: buat ulang dengan benchmarks.datagen")
+    stok.stock_level(ctx.conn, *ctx.rng.choice(ctx.stok_keys))
+
+
+def bench_stok_rebuild(ctx):
+    # Pembanding: menjumlah ulang seluruh buku mutasi
+    stok.rebuild_stock(ctx.conn)
+
+
+def bench_fefo(ctx):
+    gudang, variant_id = ctx.rng.choice(ctx.stok_keys)
+    stok.fefo(ctx.conn, gudang, variant_id)
+
+
+def bench_backup(ctx):
+    ctx.backend.put("backup_bench.csv", produksi_csv(ctx.conn))
+
+
+def bench_restore(ctx):
+    if ctx.restore_conn is None:
+        path = ctx.work / "restore.db"
+        shutil.copy(ctx.db_path, path)
+        ctx.restore_conn = connect(path)
+    content = ctx.backend.get("backup_bench.csv") or ctx.csv_bytes
+    restore_produksi_csv(ctx.restore_conn, content)
+
+
+# nama -> (fungsi, faktor pengulangan relatif terhadap --repeat)
+BENCHMARKS = {
+    "tambah_data": (bench_tambah_data, 1.0),
+    "tambah_data_autobackup": (bench_tambah_autobackup, 0.2),
+    "lihat_listing": (bench_lihat_listing, 0.2),
+    "get_batch": (bench_get_batch, 5.0),
+    "consumer_view": (bench_consumer_view, 5.0),
+    "export_pdf": (bench_export_pdf, 1.0),
+    "qr_generate": (bench_qr_generate, 1.0),
+    "qr_decode": (bench_qr_decode, 1.0),
+    "recall_forward": (bench_recall_forward, 1.0),
+    "recall_backward": (bench_recall_backward, 5.0),
+    "stok_mutasi": (bench_stok_mutasi, 1.0),
+    "stok_level": (bench_stok_level, 5.0),
+    "stok_rebuild": (bench_stok_rebuild, 0.1),
+    "fefo": (bench_fefo, 5.0),
+    "backup": (bench_backup, 0.2),
+    "restore": (bench_restore, 0.2),
+}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def measure(fn, ctx, repeat, warmup=1):
+    for _ in range(warmup):
+        fn(ctx)
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(ctx)
+        samples.append((time.perf_counter() - t) * 1000)
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": _percentile(samples, 0.50),
+        "p95_ms": _percentile(samples, 0.95),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).resolve().parents[1]).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Bandingkan p50 dengan baseline; kembalikan daftar benchmark yang regresi."""
+    regresi = []
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = res["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        flag = "REGRESI" if ratio > 1 + threshold else ""
+        print(f"  {name:<24} {base['p50_ms']:>10.2f} -> {res['p50_ms']:>10.2f} ms  x{ratio:.2f} {flag}")
+        if flag:
+            regresi.append(name)
+    return regresi
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark jalur utama Harlur Traceability")
+    ap.add_argument("--dir", required=True, help="Folder hasil benchmarks.datagen")
+    ap.add_argument("--out", default="bench_output.json")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--only", help="Daftar benchmark dipisah koma")
+    ap.add_argument("--baseline", help="JSON hasil run sebelumnya untuk dibandingkan")
+    ap.add_argument("--threshold", type=float, default=0.2, help="Batas regresi p50 (0.2 = 20%%)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    with tempfile.TemporaryDirectory(prefix="harlur_bench_") as work:
+        ctx = Context(args.dir, work, args.seed)
+        results = {}
+        for name in names:
+            fn, factor = BENCHMARKS[name]
+            repeat = max(1, int(args.repeat * factor))
+            results[name] = measure(fn, ctx, repeat)
+            print(f"{name:<24} p50 {results[name]['p50_ms']:>10.2f} ms   p95 {results[name]['p95_ms']:>10.2f} ms   (n={repeat})")
+
+        report = {
+            "meta": {
+                "waktu": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "n_batches": ctx.n_batches,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Hasil -> {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regresi = compare(results, baseline, args.threshold)
+        if regresi:
+            raise SystemExit(f"Regresi: {', '.join(regresi)}")
+
+
+if __name__ == "__main__":
+    main()
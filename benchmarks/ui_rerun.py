@@ -0,0 +1,79 @@
+# =========================================================
+# HARLUR COFFEE - LATENSI RERUN HALAMAN MANAJEMEN DATA
+# =========================================================
+# Menjalankan streamlit_app.py lewat streamlit.testing (AppTest) terhadap
+# data sintetis lalu mengukur waktu rerun untuk interaksi khas di halaman
+# Manajemen Data: buka halaman, ketik di pencarian tab Edit, ubah filter
+# tab Bulk, dan buka tab Lihat.
+#
+#   python -m benchmarks.datagen --dir /tmp/hb --batches 5000
+#   python -m benchmarks.ui_rerun --data-dir /tmp/hb --runs 5
+#
+# AppTest selalu menjalankan ulang seluruh script; di browser, interaksi di
+# dalam fragment hanya menjalankan ulang bagian tersebut (lebih cepat lagi).
+
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parents[1] / "streamlit_app.py"
+TAB_KEY = "manajemen_tab"
+TAB_EDIT = "✏️ Edit"
+TAB_BULK = "🧰 Bulk"
+TAB_LIHAT = "📋 Lihat"
+
+
+def _timed_run(at):
+    t = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return (time.perf_counter() - t) * 1000
+
+
+def skenario(runs):
+    from streamlit.testing.v1 import AppTest
+
+    hasil = {"buka": [], "ketik_edit": [], "filter_bulk": [], "buka_lihat": []}
+    for i in range(runs):
+        at = AppTest.from_file(str(APP), default_timeout=300)
+        hasil["buka"].append(_timed_run(at))
+
+        at.session_state[TAB_KEY] = TAB_EDIT
+        at.run()
+        at.text_input(key="edit_cari").set_value(f"00{i}")
+        hasil["ketik_edit"].append(_timed_run(at))
+
+        at.session_state[TAB_KEY] = TAB_BULK
+        at.run()
+        ms = at.multiselect(key="bulk_varian")
+        ms.set_value(ms.options[:1])
+        hasil["filter_bulk"].append(_timed_run(at))
+
+        at.session_state[TAB_KEY] = TAB_LIHAT
+        hasil["buka_lihat"].append(_timed_run(at))
+    return hasil
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Latensi rerun halaman Manajemen Data")
+    ap.add_argument("--data-dir", required=True, help="Folder hasil benchmarks.datagen")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--out", help="Simpan hasil ke JSON")
+    args = ap.parse_args(argv)
+
+    os.environ["HARLUR_DATA_DIR"] = str(Path(args.data_dir).resolve())
+    hasil = skenario(args.runs)
+    ringkas = {k: {"median_ms": statistics.median(v), "max_ms": max(v)} for k, v in hasil.items()}
+    for k, r in ringkas.items():
+        print(f"{k:<12} median {r['median_ms']:8.1f} ms   max {r['max_ms']:8.1f} ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(ringkas, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
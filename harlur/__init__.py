@@ -0,0 +1,6 @@
+"""
+Lapisan data Harlur Coffee Traceability.
+
+Modul di paket ini tidak bergantung pada Streamlit sehingga bisa dipakai
+bersama oleh streamlit_app.py maupun tool pendukung (CLI, benchmark, API).
+"""
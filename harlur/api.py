@@ -0,0 +1,387 @@
+# =========================================================
+# HARLUR COFFEE - JSON LOOKUP API (ASGI)
+# =========================================================
+# Layanan HTTP ringan untuk ERP & aplikasi distributor, berjalan terpisah
+# dari UI Streamlit tetapi membaca database yang sama:
+#
+#   GET  /batch/{batch_id}                    -> satu batch (aktif, lalu arsip)
+#   POST /batches:lookup  {"batch_ids": [..]}  -> banyak batch sekali jalan
+#   GET  /batches?status=near&limit=100        -> filter status kedaluwarsa
+#   GET  /export/produksi.csv?dari=..&gudang=..  -> ekspor streaming (harlur/export.py)
+#   GET  /health, GET /metrics (Prometheus)
+#
+# Koneksi SQLite read-only (mode=ro, query_only) satu per thread worker;
+# hasil lookup disimpan di cache LRU ber-TTL sehingga scan berulang tidak
+# menyentuh database. Tanpa dependensi tambahan; server ASGI apa pun bisa
+# dipakai, `python -m harlur.api` memakai uvicorn jika terpasang.
+#
+#   python -m harlur.api --db data_produksi.db --archive arsip_produksi.db --port 8000
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from harlur.arsip import ARCHIVE_SCHEMA, ARCHIVE_TABLE
+from harlur.metrics import REGISTRY, span
+from harlur.render import STATUSES, expiry_bounds, expiry_status
+from harlur.waktu import WIB
+
+MAX_LOOKUP = 1000
+MAX_BODY = 1 << 20
+MAX_LIST = 1000
+# Kolom internal yang tidak ikut dikirim ke klien
+HIDDEN_COLUMNS = {"id", "deleted_at"}
+
+
+class TTLCache:
+    """LRU dengan masa berlaku per entri; aman dipakai lintas thread."""
+
+    def __init__(self, maxsize=10_000, ttl=5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class ReadOnlyDB:
+    """Satu koneksi read-only per thread worker (pool = ThreadPoolExecutor)."""
+
+    def __init__(self, db_path, archive_path=None, pool_size=8):
+        self.db_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.archive_path = Path(archive_path).resolve() if archive_path else None
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="harlur-api")
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+        self.columns = None
+        self.has_archive = False
+
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only=1")
+            if self.archive_path is not None and self.archive_path.exists():
+                conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (f"{self.archive_path.as_uri()}?mode=ro",))
+                self.has_archive = True
+            if self.columns is None:
+                self.columns = [r[1] for r in conn.execute("PRAGMA table_info(produksi)")
+                                if r[1] not in HIDDEN_COLUMNS]
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(self.conn(), *args))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+# ===================== QUERY =====================
+def _fetch_many(db, conn, batch_ids):
+    """{batch_id: dict} untuk batch aktif, lalu sisanya dari arsip jika ada."""
+    cols = ", ".join(db.columns)
+    found = {}
+    sources = [("produksi", "deleted_at IS NULL", False)]
+    if db.has_archive:
+        sources.append((ARCHIVE_TABLE, "1", True))
+    for table, where, arsip in sources:
+        todo = [b for b in batch_ids if b not in found]
+        for i in range(0, len(todo), 500):
+            part = todo[i:i + 500]
+            marks = ", ".join("?" * len(part))
+            for row in conn.execute(
+                f"SELECT {cols} FROM {table} WHERE {where} AND batch_id IN ({marks})", part
+            ):
+                item = dict(zip(db.columns, row))
+                item["arsip"] = arsip
+                found[item["batch_id"]] = item
+    return found
+
+
+def _status(expired_date, bounds, now):
+    # Tanggal ISO cukup dibandingkan sebagai string dengan batas yang sama dengan filter SQL
+    if not expired_date:
+        return None
+    if len(expired_date) == 10 and expired_date[4] == "-":
+        return "expired" if expired_date <= bounds[0] else "near" if expired_date <= bounds[1] else "fresh"
+    return expiry_status(expired_date, now)
+
+
+def _list_by_status(db, conn, status, limit, after, now):
+    expired_upto, near_upto = expiry_bounds(now)
+    cond, params = {
+        "expired": ("expired_date <= ?", [expired_upto]),
+        "near": ("expired_date > ? AND expired_date <= ?", [expired_upto, near_upto]),
+        "fresh": ("expired_date > ?", [near_upto]),
+    }[status]
+    if after:
+        # Kursor keyset: (expired_date, batch_id) baris terakhir halaman sebelumnya
+        cond += " AND (expired_date, batch_id) > (?, ?)"
+        params += list(after)
+    cols = ", ".join(db.columns)
+    rows = conn.execute(f"""
+        SELECT {cols} FROM produksi
+        WHERE deleted_at IS NULL AND {cond}
+        ORDER BY expired_date, batch_id LIMIT ?
+    """, params + [limit]).fetchall()
+    return [dict(zip(db.columns, row), arsip=False) for row in rows]
+
+
+# ===================== ASGI APP =====================
+class LookupAPI:
+    def __init__(self, db_path, archive_path=None, pool_size=8, cache_ttl=5.0,
+                 cache_size=10_000, expose_metrics=True):
+        self.db = ReadOnlyDB(db_path, archive_path, pool_size)
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.cache_ttl = cache_ttl
+        self.expose_metrics = expose_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        route = self._route(method, path)
+        if route == "export":
+            with span("api.export"):
+                return await self._export(scope, send)
+        with span(f"api.{route}"):
+            try:
+                status, body, headers = await self._dispatch(route, scope, receive)
+            except ValueError as e:
+                status, body, headers = 400, {"error": str(e)}, []
+        await self._send_json(send, status, body, headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.db.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    def _route(method, path):
+        if method == "GET" and path.startswith("/batch/") and len(path) > len("/batch/"):
+            return "get_batch"
+        if method == "POST" and path == "/batches:lookup":
+            return "lookup"
+        if method == "GET" and path == "/batches":
+            return "list"
+        if method == "GET" and path.startswith("/export/"):
+            return "export"
+        if method == "GET" and path in ("/health", "/metrics"):
+            return path[1:]
+        return "not_found"
+
+    async def _dispatch(self, route, scope, receive):
+        now = datetime.now(WIB).replace(tzinfo=None)
+        if route == "get_batch":
+            batch_id = scope["path"][len("/batch/"):]
+            found = await self._lookup([batch_id])
+            if batch_id not in found:
+                return 404, {"error": "Batch ID tidak ditemukan.", "batch_id": batch_id}, []
+            return 200, self._public(found[batch_id], now), [(b"cache-control", f"public, max-age={int(self.cache_ttl)}".encode())]
+
+        if route == "lookup":
+            payload = json.loads(await self._read_body(receive) or b"{}")
+            batch_ids = payload.get("batch_ids") if isinstance(payload, dict) else None
+            if not isinstance(batch_ids, list) or not all(isinstance(b, str) for b in batch_ids):
+                raise ValueError("Body harus berupa {\"batch_ids\": [\"...\"]}.")
+            if len(batch_ids) > MAX_LOOKUP:
+                raise ValueError(f"Maksimal {MAX_LOOKUP} batch_id per permintaan.")
+            batch_ids = list(dict.fromkeys(batch_ids))
+            found = await self._lookup(batch_ids)
+            return 200, {
+                "found": {b: self._public(found[b], now) for b in batch_ids if b in found},
+                "missing": [b for b in batch_ids if b not in found],
+            }, []
+
+        if route == "list":
+            query = _query(scope)
+            status = query.get("status", "")
+            if status not in STATUSES:
+                raise ValueError(f"status harus salah satu dari: {', '.join(STATUSES)}.")
+            limit = int(query.get("limit", 100))
+            if not 1 <= limit <= MAX_LIST:
+                raise ValueError(f"limit harus antara 1 dan {MAX_LIST}.")
+            after = query.get("after")
+            if after:
+                after = after.split(",", 1)
+                if len(after) != 2:
+                    raise ValueError("Format after: <expired_date>,<batch_id>.")
+            items = await self.db.run(lambda conn: _list_by_status(self.db, conn, status, limit, after, now))
+            nxt = f"{items[-1]['expired_date']},{items[-1]['batch_id']}" if len(items) == limit else None
+            return 200, {"items": [self._public(i, now) for i in items], "next": nxt}, []
+
+        if route == "health":
+            ok = await self.db.run(lambda conn: conn.execute("SELECT 1").fetchone()[0] == 1)
+            return 200, {"ok": ok, "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}, []
+
+        if route == "metrics" and self.expose_metrics:
+            return 200, REGISTRY.to_prometheus(), [(b"content-type", b"text/plain; version=0.0.4")]
+
+        return 404, {"error": "Endpoint tidak ditemukan."}, []
+
+    async def _export(self, scope, send):
+        """Ekspor dialirkan per potongan (chunked) dari koneksi read-only khusus."""
+        from harlur import export
+
+        nama = scope["path"][len("/export/"):]
+        table, _, fmt = nama.rpartition(".")
+        query = _query(scope)
+        filters = {"dari": query.get("dari"), "sampai": query.get("sampai")}
+        for key in ("varian", "gudang", "status"):
+            if query.get(key):
+                filters[key] = [v for v in query[key].split(",") if v]
+        loop = asyncio.get_running_loop()
+        # Kursor ekspor bisa berjalan lama: koneksi sendiri agar pool lookup tidak tertahan
+        conn = sqlite3.connect(self.db.db_uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=1")
+        try:
+            try:
+                chunks = await loop.run_in_executor(
+                    self.db.executor, lambda: export.stream(conn, table, fmt, **filters))
+            except (ValueError, ImportError) as e:
+                return await self._send_json(send, 400, {"error": str(e)}, [])
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", export.FORMATS[fmt].encode()),
+                    (b"content-disposition", f'attachment; filename="{export.filename(table, fmt)}"'.encode()),
+                ],
+            })
+            while True:
+                data = await loop.run_in_executor(self.db.executor, next, chunks, None)
+                if data is None:
+                    break
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            conn.close()
+
+    async def _lookup(self, batch_ids):
+        """Cache dulu; yang belum ada diambil sekaligus dari database (negatif ikut di-cache)."""
+        found, misses = {}, []
+        for b in batch_ids:
+            item = self.cache.get(b, default=False)
+            if item is False:
+                misses.append(b)
+            elif item is not None:
+                found[b] = item
+        if misses:
+            fetched = await self.db.run(lambda conn: _fetch_many(self.db, conn, misses))
+            for b in misses:
+                self.cache.put(b, fetched.get(b))
+            found.update(fetched)
+        return found
+
+    @staticmethod
+    def _public(item, now):
+        # Status dihitung saat respons agar tetap benar walau entri cache berumur
+        out = dict(item)
+        out["status"] = _status(item.get("expired_date"), expiry_bounds(now), now)
+        return out
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY:
+                raise ValueError("Body terlalu besar.")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _send_json(send, status, body, headers):
+        if isinstance(body, str):
+            data = body.encode()
+        else:
+            data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+            headers = [(b"content-type", b"application/json; charset=utf-8")] + headers
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers + [(b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+
+def _query(scope):
+    return dict(parse_qsl(scope.get("query_string", b"").decode()))
+
+
+def create_app(db_path, archive_path=None, **kwargs):
+    return LookupAPI(db_path, archive_path, **kwargs)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="JSON lookup API Harlur Traceability")
+    ap.add_argument("--db", required=True, help="Path data_produksi.db")
+    ap.add_argument("--archive", help="Path arsip_produksi.db")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--pool", type=int, default=8, help="Jumlah koneksi read-only")
+    ap.add_argument("--cache-ttl", type=float, default=5.0, help="Detik; 0 = tanpa cache")
+    ap.add_argument("--cache-size", type=int, default=10_000)
+    ap.add_argument("--no-metrics", action="store_true", help="Matikan endpoint /metrics")
+    args = ap.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn belum terpasang: pip install uvicorn (atau jalankan create_app() di server ASGI lain)")
+
+    app = create_app(args.db, args.archive, pool_size=args.pool, cache_ttl=args.cache_ttl,
+                     cache_size=args.cache_size, expose_metrics=not args.no_metrics)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# =========================================================
+# HARLUR COFFEE - SOFT DELETE & ARSIP BATCH LAMA
+# =========================================================
+# Tabel `produksi` dan folder QR hanya menyimpan batch aktif. Batch yang
+# sudah lama kedaluwarsa dipindah ke file database terpisah (cold storage)
+# beserta gambar QR-nya (zlib) dan tetap bisa dibuka dari Consumer View.
+
+import zlib
+
+import pandas as pd
+
+from harlur.waktu import now_wib
+
+ARCHIVE_SCHEMA = "arsip"
+ARCHIVE_TABLE = f"{ARCHIVE_SCHEMA}.produksi_arsip"
+
+
+def _produksi_columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(produksi)")]
+
+
+def attach_archive(conn, path):
+    """ATTACH file arsip ke koneksi aktif dan samakan skemanya dengan `produksi`."""
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if ARCHIVE_SCHEMA not in attached:
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(path),))
+
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} (
+        batch_id TEXT PRIMARY KEY,
+        qr_png BLOB
+    )
+    """)
+    existing = [row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info(produksi_arsip)")]
+    for col in _produksi_columns(conn):
+        if col not in existing:
+            conn.execute(f"ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN {col}")
+    conn.commit()
+
+
+# ===================== SOFT DELETE =====================
+def soft_delete(conn, batch_id):
+    """Tandai batch sebagai terhapus; data & QR tetap disimpan untuk audit."""
+    ts = now_wib()
+    cur = conn.execute(
+        "UPDATE produksi SET deleted_at=?, updated_at=? WHERE batch_id=? AND deleted_at IS NULL",
+        (ts, ts, batch_id)
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def restore_deleted(conn, batch_id):
+    cur = conn.execute(
+        "UPDATE produksi SET deleted_at=NULL, updated_at=? WHERE batch_id=? AND deleted_at IS NOT NULL",
+        (now_wib(), batch_id)
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def deleted_batches(conn):
+    return pd.read_sql_query(
+        "SELECT * FROM produksi WHERE deleted_at IS NOT NULL ORDER BY deleted_at DESC", conn
+    )
+
+
+# ===================== ARSIP =====================
+def _cutoff_sql(months):
+    return f"date('now', '+7 hours', '-{int(months)} months')"
+
+
+def archive_candidates(conn, months):
+    """Jumlah batch yang kedaluwarsa lebih dari `months` bulan (pakai index expired_date)."""
+    return conn.execute(
+        f"SELECT COUNT(*) FROM produksi WHERE expired_date < {_cutoff_sql(months)}"
+    ).fetchone()[0]
+
+
+def archive_expired(conn, months, qr_path_for):
+    """Pindahkan batch kedaluwarsa > `months` bulan ke database arsip.
+
+    `qr_path_for(batch_id)` mengembalikan path PNG QR batch tersebut. Semua
+    perpindahan terjadi dalam satu transaksi; file QR baru dihapus dari folder
+    aktif setelah commit berhasil. Mengembalikan jumlah batch yang diarsipkan.
+    """
+    ids = [r[0] for r in conn.execute(
+        f"SELECT batch_id FROM produksi WHERE expired_date < {_cutoff_sql(months)}"
+    )]
+    if not ids:
+        return 0
+
+    cols = ", ".join(_produksi_columns(conn))
+    ts = now_wib()
+    try:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _arsip_ids (batch_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _arsip_ids")
+        conn.executemany("INSERT INTO _arsip_ids VALUES (?)", [(b,) for b in ids])
+
+        conn.execute(
+            "UPDATE produksi SET archived_at=? WHERE batch_id IN (SELECT batch_id FROM _arsip_ids)",
+            (ts,)
+        )
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {ARCHIVE_TABLE} ({cols})
+            SELECT {cols} FROM produksi WHERE batch_id IN (SELECT batch_id FROM _arsip_ids)
+        """)
+
+        blobs = []
+        for batch_id in ids:
+            path = qr_path_for(batch_id)
+            if path.exists():
+                blobs.append((zlib.compress(path.read_bytes(), 9), batch_id))
+        conn.executemany(f"UPDATE {ARCHIVE_TABLE} SET qr_png=? WHERE batch_id=?", blobs)
+
+        conn.execute("DELETE FROM produksi WHERE batch_id IN (SELECT batch_id FROM _arsip_ids)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for batch_id in ids:
+        path = qr_path_for(batch_id)
+        if path.exists():
+            path.unlink()
+    return len(ids)
+
+
+def get_archived(conn, batch_id):
+    """Lookup batch arsip lewat primary key; None jika tidak ada."""
+    cols = ", ".join(_produksi_columns(conn))
+    df = pd.read_sql_query(
+        f"SELECT {cols} FROM {ARCHIVE_TABLE} WHERE batch_id=?", conn, params=(batch_id,)
+    )
+    return df if not df.empty else None
+
+
+def archived_qr(conn, batch_id):
+    row = conn.execute(f"SELECT qr_png FROM {ARCHIVE_TABLE} WHERE batch_id=?", (batch_id,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return zlib.decompress(row[0])
+
+
+def list_archived(conn, limit=200):
+    cols = ", ".join(c for c in _produksi_columns(conn) if c != "id")
+    return pd.read_sql_query(
+        f"SELECT {cols} FROM {ARCHIVE_TABLE} ORDER BY archived_at DESC, batch_id LIMIT ?",
+        conn, params=(limit,)
+    )
+
+
+def unarchive(conn, batch_id, qr_store):
+    """Kembalikan satu batch arsip ke tabel aktif beserta file QR-nya (lewat QRStore, atomik)."""
+    cols = _produksi_columns(conn)
+    select = ", ".join(
+        "NULL" if c == "archived_at" else "?" if c == "updated_at" else c for c in cols
+    )
+    qr = archived_qr(conn, batch_id)
+    try:
+        cur = conn.execute(f"""
+            INSERT INTO produksi ({", ".join(cols)})
+            SELECT {select} FROM {ARCHIVE_TABLE} WHERE batch_id=?
+        """, (now_wib(), batch_id))
+        if cur.rowcount == 0:
+            conn.rollback()
+            return False
+        conn.execute(f"DELETE FROM {ARCHIVE_TABLE} WHERE batch_id=?", (batch_id,))
+        if qr is not None:
+            qr_store.write_bytes(batch_id, qr)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
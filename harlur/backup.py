@@ -0,0 +1,104 @@
+# =========================================================
+# HARLUR COFFEE - BACKEND BACKUP (GITHUB / FOLDER LOKAL)
+# =========================================================
+# Backend punya antarmuka sama: put(name, content, msg), get(name), list().
+# LocalDirBackend dipakai sebagai pengganti GitHub untuk benchmark/pengujian
+# lokal tanpa token dan tanpa jaringan.
+
+import base64
+import io
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from harlur.metrics import timed
+from harlur.stok import rebuild_stock
+from harlur.varian import assign_variant_ids
+
+GITHUB_USER = "frozeno24"
+GITHUB_REPO = "harlur-traceability-qr"
+
+
+class BackupError(Exception):
+    pass
+
+
+class GitHubBackend:
+    def __init__(self, token, user=GITHUB_USER, repo=GITHUB_REPO, folder="backup", branch="main"):
+        self.api = f"https://api.github.com/repos/{user}/{repo}/contents/{folder}"
+        self.headers = {"Authorization": f"token {token}"}
+        self.branch = branch
+
+    @timed("backup.github_put")
+    def put(self, name, content: bytes, msg="Auto Backup"):
+        url = f"{self.api}/{name}"
+        r = requests.get(url, headers=self.headers)
+        sha = r.json().get("sha") if r.status_code == 200 else None
+
+        data = {
+            "message": msg,
+            "content": base64.b64encode(content).decode(),
+            "branch": self.branch
+        }
+        if sha:
+            data["sha"] = sha
+
+        res = requests.put(url, headers=self.headers, json=data)
+        if res.status_code not in [200, 201]:
+            raise BackupError(res.text)
+
+    @timed("backup.github_get")
+    def get(self, name):
+        # Media type raw: isi file langsung (tanpa base64 JSON), berlaku juga
+        # untuk file > 1 MB seperti snapshot yang tidak dikirim di field `content`
+        headers = {**self.headers, "Accept": "application/vnd.github.raw+json"}
+        res = requests.get(f"{self.api}/{name}", headers=headers, params={"ref": self.branch})
+        if res.status_code != 200:
+            return None
+        return res.content
+
+    @timed("backup.github_list")
+    def list(self):
+        r = requests.get(self.api, headers=self.headers)
+        if r.status_code != 200:
+            return []
+        return [f["name"] for f in r.json()]
+
+
+class LocalDirBackend:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, name, content: bytes, msg="Auto Backup"):
+        (self.root / name).write_bytes(content)
+
+    def get(self, name):
+        path = self.root / name
+        return path.read_bytes() if path.exists() else None
+
+    def list(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_file())
+
+
+# ===================== CSV PRODUKSI =====================
+@timed("backup.produksi_csv")
+def produksi_csv(conn) -> bytes:
+    df = pd.read_sql_query("SELECT * FROM produksi", conn)
+    return df.to_csv(index=False).encode()
+
+
+def restore_produksi_csv(conn, content: bytes):
+    """Ganti isi `produksi` dengan isi CSV backup; kembalikan jumlah baris."""
+    df = pd.read_csv(io.BytesIO(content))
+
+    conn.execute("DELETE FROM produksi")
+    conn.commit()
+    df.to_sql("produksi", conn, if_exists="append", index=False)
+    # CSV lama belum punya variant_id; CSV baru bisa berasal dari katalog lain
+    assign_variant_ids(conn)
+    conn.commit()
+    # Ringkasan stok mengikuti variant_id hasil restore
+    rebuild_stock(conn)
+    return len(df)
@@ -0,0 +1,260 @@
+# =========================================================
+# HARLUR COFFEE - LOT BAHAN BAKU & TELUSUR RECALL
+# =========================================================
+# Lot bahan dari supplier (matcha, cocoa, gula aren, susu, ...) dicatat di
+# `lot_bahan`. Lot olahan/campuran menunjuk lot asalnya lewat `lot_asal`
+# (banyak-ke-banyak), dan setiap batch produksi menunjuk lot yang dipakai
+# lewat `batch_lot`. Dua pertanyaan recall dijawab dengan recursive CTE
+# yang hanya berjalan di index:
+#
+#   maju   : lot X (dan semua lot turunannya) dipakai di batch mana, di gudang mana
+#   mundur : batch Y memakai lot apa saja, sampai ke lot supplier asalnya
+#
+# Tautan batch_lot memakai batch_id (bukan produksi.id) sehingga tetap
+# berlaku untuk batch yang dihapus, diarsipkan, atau dipulihkan dari CSV.
+
+import pandas as pd
+
+from harlur.arsip import ARCHIVE_SCHEMA, ARCHIVE_TABLE
+from harlur.metrics import timed
+from harlur.waktu import now_wib
+
+# Batas kedalaman rantai lot (jaga-jaga jika data lama mengandung siklus)
+MAX_DEPTH = 20
+LOT_COLUMNS = ["kode", "bahan", "supplier", "asal", "tanggal_terima", "catatan"]
+
+
+def init_bahan(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS lot_bahan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kode TEXT NOT NULL UNIQUE,
+        bahan TEXT NOT NULL,
+        supplier TEXT,
+        asal TEXT,
+        tanggal_terima TEXT,
+        catatan TEXT,
+        updated_at TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS lot_asal (
+        lot_id INTEGER NOT NULL,
+        parent_id INTEGER NOT NULL,
+        PRIMARY KEY (lot_id, parent_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS batch_lot (
+        batch_id TEXT NOT NULL,
+        lot_id INTEGER NOT NULL,
+        jumlah REAL,
+        satuan TEXT,
+        PRIMARY KEY (batch_id, lot_id)
+    ) WITHOUT ROWID
+    """)
+    # PK melayani arah mundur; index kebalikannya melayani arah maju
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lot_asal_parent ON lot_asal (parent_id, lot_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_lot_lot ON batch_lot (lot_id, batch_id)")
+
+
+# ===================== LOT =====================
+def lot_id(conn, kode):
+    row = conn.execute("SELECT id FROM lot_bahan WHERE kode = ?", (str(kode).strip(),)).fetchone()
+    return row[0] if row else None
+
+
+def _lot_ids(conn, kodes):
+    ids, unknown = [], []
+    for kode in kodes:
+        found = lot_id(conn, kode)
+        (ids if found is not None else unknown).append(found if found is not None else kode)
+    if unknown:
+        raise ValueError(f"Lot tidak dikenal: {', '.join(map(str, unknown))}")
+    return ids
+
+
+def _descendants(conn, root_id):
+    rows = conn.execute(f"""
+        WITH RECURSIVE turunan(lot_id, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT a.lot_id, t.depth + 1 FROM lot_asal a JOIN turunan t ON a.parent_id = t.lot_id
+            WHERE t.depth < {MAX_DEPTH}
+        )
+        SELECT DISTINCT lot_id FROM turunan
+    """, (root_id,))
+    return {r[0] for r in rows}
+
+
+def save_lot(conn, kode, bahan, supplier=None, asal=None, tanggal_terima=None, catatan=None, lot_asal=()):
+    """Tambah/ubah lot berdasarkan `kode`; `lot_asal` = kode lot bahan penyusunnya.
+
+    Kembalikan id lot. ValueError jika kode/bahan kosong, lot asal tidak
+    dikenal, atau lot asal ternyata turunan lot ini sendiri (siklus).
+    """
+    kode, bahan = str(kode or "").strip(), str(bahan or "").strip()
+    if not kode or not bahan:
+        raise ValueError("Kode lot dan bahan wajib diisi.")
+    parent_ids = _lot_ids(conn, lot_asal)
+    with conn:
+        conn.execute("""
+            INSERT INTO lot_bahan (kode, bahan, supplier, asal, tanggal_terima, catatan, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kode) DO UPDATE SET bahan = excluded.bahan, supplier = excluded.supplier,
+                asal = excluded.asal, tanggal_terima = excluded.tanggal_terima,
+                catatan = excluded.catatan, updated_at = excluded.updated_at
+        """, (kode, bahan, supplier, asal, tanggal_terima and str(tanggal_terima), catatan, now_wib()))
+        new_id = lot_id(conn, kode)
+        if parent_ids:
+            siklus = _descendants(conn, new_id) & set(parent_ids)
+            if siklus:
+                raise ValueError("Lot asal tidak boleh turunan dari lot ini sendiri.")
+        conn.execute("DELETE FROM lot_asal WHERE lot_id = ?", (new_id,))
+        conn.executemany("INSERT INTO lot_asal (lot_id, parent_id) VALUES (?, ?)",
+                         [(new_id, p) for p in dict.fromkeys(parent_ids)])
+    return new_id
+
+
+def list_lots(conn):
+    """Semua lot + jumlah batch yang memakainya langsung."""
+    return pd.read_sql_query("""
+        SELECT l.kode, l.bahan, l.supplier, l.asal, l.tanggal_terima,
+               (SELECT GROUP_CONCAT(p.kode, ', ') FROM lot_asal a JOIN lot_bahan p ON p.id = a.parent_id
+                WHERE a.lot_id = l.id) AS lot_asal,
+               (SELECT COUNT(*) FROM batch_lot b WHERE b.lot_id = l.id) AS batch
+        FROM lot_bahan l ORDER BY l.tanggal_terima DESC, l.kode
+    """, conn)
+
+
+def lot_codes(conn):
+    return [r[0] for r in conn.execute("SELECT kode FROM lot_bahan ORDER BY kode")]
+
+
+# ===================== TAUTAN BATCH <-> LOT =====================
+def link_batch(conn, batch_id, kodes, jumlah=None, satuan=None):
+    """Catat lot yang dipakai satu batch (tautan lama batch tersebut diganti)."""
+    ids = _lot_ids(conn, kodes)
+    with conn:
+        conn.execute("DELETE FROM batch_lot WHERE batch_id = ?", (batch_id,))
+        conn.executemany("INSERT INTO batch_lot (batch_id, lot_id, jumlah, satuan) VALUES (?, ?, ?, ?)",
+                         [(batch_id, i, jumlah, satuan) for i in dict.fromkeys(ids)])
+    return len(ids)
+
+
+@timed("bahan.import_links")
+def import_links(conn, df):
+    """Tautan massal dari DataFrame kolom batch_id, kode_lot (opsional jumlah, satuan).
+
+    Kode lot dipetakan lewat JOIN ke tabel TEMP, jadi satu statement untuk
+    ratusan ribu baris. ValueError jika ada kode lot yang belum terdaftar.
+    """
+    missing = {"batch_id", "kode_lot"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada: {', '.join(sorted(missing))}")
+    rows = [
+        (str(r.batch_id).strip(), str(r.kode_lot).strip(),
+         None if "jumlah" not in df.columns or pd.isna(r.jumlah) else float(r.jumlah),
+         None if "satuan" not in df.columns or pd.isna(r.satuan) else str(r.satuan))
+        for r in df.itertuples(index=False)
+    ]
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _batch_lot_import (batch_id TEXT, kode TEXT, jumlah REAL, satuan TEXT)")
+    conn.execute("DELETE FROM _batch_lot_import")
+    conn.executemany("INSERT INTO _batch_lot_import VALUES (?, ?, ?, ?)", rows)
+    unknown = [r[0] for r in conn.execute(
+        "SELECT DISTINCT i.kode FROM _batch_lot_import i LEFT JOIN lot_bahan l ON l.kode = i.kode "
+        "WHERE l.id IS NULL LIMIT 20")]
+    if unknown:
+        conn.rollback()
+        raise ValueError(f"Lot tidak dikenal: {', '.join(unknown)}")
+    with conn:
+        n = conn.execute("""
+            INSERT OR REPLACE INTO batch_lot (batch_id, lot_id, jumlah, satuan)
+            SELECT i.batch_id, l.id, i.jumlah, i.satuan
+            FROM _batch_lot_import i JOIN lot_bahan l ON l.kode = i.kode
+        """).rowcount
+        conn.execute("DELETE FROM _batch_lot_import")
+    return n
+
+
+# ===================== TELUSUR =====================
+def _batch_source(conn):
+    """FROM + kolom batch: aktif dulu, lalu arsip jika file arsip di-ATTACH."""
+    cols = ["tanggal", "varian_produksi", "lokasi_gudang", "expired_date"]
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if ARCHIVE_SCHEMA in attached:
+        select = ", ".join(f"COALESCE(p.{c}, a.{c}) AS {c}" for c in cols)
+        join = f"LEFT JOIN produksi p ON p.batch_id = u.batch_id LEFT JOIN {ARCHIVE_TABLE} a ON a.batch_id = u.batch_id"
+        status = ("CASE WHEN p.batch_id IS NOT NULL AND p.deleted_at IS NULL THEN 'aktif' "
+                  "WHEN p.batch_id IS NOT NULL THEN 'dihapus' WHEN a.batch_id IS NOT NULL THEN 'arsip' "
+                  "ELSE 'tidak ada' END")
+    else:
+        select = ", ".join(f"p.{c}" for c in cols)
+        join = "LEFT JOIN produksi p ON p.batch_id = u.batch_id"
+        status = ("CASE WHEN p.batch_id IS NULL THEN 'tidak ada' "
+                  "WHEN p.deleted_at IS NULL THEN 'aktif' ELSE 'dihapus' END")
+    return select, join, status
+
+
+@timed("bahan.trace_forward")
+def trace_forward(conn, kode):
+    """Batch yang memakai lot `kode` atau lot turunannya (langsung maupun lewat campuran).
+
+    Kolom: batch_id, tanggal, varian_produksi, lokasi_gudang, expired_date,
+    status (aktif/dihapus/arsip), via_lot (lot yang langsung dipakai), depth.
+    """
+    root = lot_id(conn, kode)
+    if root is None:
+        raise ValueError(f"Lot tidak dikenal: {kode}")
+    select, join, status = _batch_source(conn)
+    return pd.read_sql_query(f"""
+        WITH RECURSIVE turunan(lot_id, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT a.lot_id, t.depth + 1 FROM lot_asal a JOIN turunan t ON a.parent_id = t.lot_id
+            WHERE t.depth < {MAX_DEPTH}
+        ),
+        u AS (
+            SELECT b.batch_id, MIN(t.depth) AS depth, GROUP_CONCAT(DISTINCT l.kode) AS via_lot
+            FROM turunan t
+            JOIN batch_lot b ON b.lot_id = t.lot_id
+            JOIN lot_bahan l ON l.id = t.lot_id
+            GROUP BY b.batch_id
+        )
+        SELECT u.batch_id, {select}, {status} AS status, u.via_lot, u.depth
+        FROM u {join}
+        ORDER BY lokasi_gudang, u.batch_id
+    """, conn, params=(root,))
+
+
+def forward_summary(df):
+    """Ringkasan trace_forward per lokasi gudang & status (untuk keputusan tarik produk)."""
+    if df.empty:
+        return pd.DataFrame(columns=["lokasi_gudang", "status", "batch"])
+    return (df.fillna({"lokasi_gudang": "-"})
+              .groupby(["lokasi_gudang", "status"]).size()
+              .reset_index(name="batch")
+              .sort_values("batch", ascending=False, ignore_index=True))
+
+
+@timed("bahan.trace_backward")
+def trace_backward(conn, batch_id):
+    """Semua lot yang masuk ke batch `batch_id`, termasuk lot asal dari lot campuran.
+
+    depth 0 = lot yang langsung dipakai, 1 = asal lot tersebut, dst.
+    """
+    return pd.read_sql_query(f"""
+        WITH RECURSIVE leluhur(lot_id, depth) AS (
+            SELECT lot_id, 0 FROM batch_lot WHERE batch_id = ?
+            UNION
+            SELECT a.parent_id, l.depth + 1 FROM lot_asal a JOIN leluhur l ON a.lot_id = l.lot_id
+            WHERE l.depth < {MAX_DEPTH}
+        )
+        SELECT l.kode, l.bahan, l.supplier, l.asal, l.tanggal_terima, MIN(x.depth) AS depth,
+               b.jumlah, b.satuan
+        FROM leluhur x
+        JOIN lot_bahan l ON l.id = x.lot_id
+        LEFT JOIN batch_lot b ON b.batch_id = ? AND b.lot_id = x.lot_id
+        GROUP BY l.id
+        ORDER BY depth, l.bahan, l.kode
+    """, conn, params=(batch_id, batch_id))
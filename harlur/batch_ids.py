@@ -0,0 +1,112 @@
+# =========================================================
+# HARLUR COFFEE - ALOKASI BATCH ID
+# =========================================================
+# Batch ID terstruktur: <SITE>-<VARIAN>-<YYMMDD>-<SEQ>, mis. BAN-ML-251128-0007.
+# Nomor urut diambil dari tabel counter dengan satu statement UPSERT
+# (atomik di SQLite), sehingga beberapa stasiun bisa mendaftarkan batch
+# bersamaan tanpa SELECT COUNT(*) lebih dulu. Duplikat tetap dijaga oleh
+# constraint UNIQUE pada produksi.batch_id.
+
+import re
+
+import pandas as pd
+
+from harlur.waktu import now_wib
+
+SEQ_DIGITS = 4
+
+
+def init_batch_ids(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS batch_id_counter (
+        prefix TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS batch_id_reservasi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT,
+        prefix TEXT,
+        seq_awal INTEGER,
+        seq_akhir INTEGER,
+        keperluan TEXT
+    )
+    """)
+
+
+def _code(text, length):
+    words = re.findall(r"[A-Za-z0-9]+", text or "")
+    if not words:
+        return "X" * length
+    if len(words) == 1:
+        return words[0][:length].upper()
+    return "".join(w[0] for w in words)[:length].upper()
+
+
+def site_code(tempat):
+    """Bandung -> BAN, Arcamanik -> ARC."""
+    return _code(tempat, 3)
+
+
+def variant_code(varian):
+    """Matcha Latte -> ML, Kopi Gula Aren -> KGA, coklat -> COK."""
+    return _code(varian, 3)
+
+
+def make_prefix(tempat, varian, tanggal):
+    tgl = pd.to_datetime(tanggal).strftime("%y%m%d")
+    return f"{site_code(tempat)}-{variant_code(varian)}-{tgl}"
+
+
+def format_batch_id(prefix, seq):
+    return f"{prefix}-{seq:0{SEQ_DIGITS}d}"
+
+
+def allocate(conn, prefix, n=1):
+    """Ambil `n` nomor urut berurutan untuk `prefix`; kembalikan (awal, akhir).
+
+    Counter baru di-seed dari batch_id yang sudah ada (mis. setelah restore)
+    supaya nomor tidak mundur dan bertabrakan dengan data lama.
+    """
+    if n < 1:
+        raise ValueError("Jumlah ID minimal 1.")
+    start = len(prefix) + 2
+    with conn:
+        akhir = conn.execute(
+            """
+            INSERT INTO batch_id_counter (prefix, last_seq)
+            VALUES (?, (
+                SELECT COALESCE(MAX(CAST(substr(batch_id, ?) AS INTEGER)), 0)
+                FROM produksi WHERE batch_id >= ? AND batch_id < ?
+            ) + ?)
+            ON CONFLICT(prefix) DO UPDATE SET last_seq = batch_id_counter.last_seq + ?
+            RETURNING last_seq
+            """,
+            (prefix, start, prefix + "-", prefix + ".", n, n)
+        ).fetchall()[0][0]
+    return akhir - n + 1, akhir
+
+
+def next_batch_id(conn, tempat, varian, tanggal):
+    prefix = make_prefix(tempat, varian, tanggal)
+    seq, _ = allocate(conn, prefix)
+    return format_batch_id(prefix, seq)
+
+
+def reserve_block(conn, tempat, varian, tanggal, n, keperluan=""):
+    """Reservasi blok ID untuk cetak label massal; ID tidak akan dipakai ulang."""
+    prefix = make_prefix(tempat, varian, tanggal)
+    awal, akhir = allocate(conn, prefix, n)
+    with conn:
+        conn.execute(
+            "INSERT INTO batch_id_reservasi (waktu, prefix, seq_awal, seq_akhir, keperluan) VALUES (?, ?, ?, ?, ?)",
+            (now_wib(), prefix, awal, akhir, keperluan)
+        )
+    return [format_batch_id(prefix, seq) for seq in range(awal, akhir + 1)]
+
+
+def list_reservations(conn, limit=50):
+    return pd.read_sql_query(
+        "SELECT * FROM batch_id_reservasi ORDER BY id DESC LIMIT ?", conn, params=(limit,)
+    )
@@ -0,0 +1,202 @@
+# =========================================================
+# HARLUR COFFEE - OPERASI MASSAL (BULK EDIT / BULK HAPUS)
+# =========================================================
+# Edit dan hapus massal dijalankan sebagai satu statement berbasis set di
+# dalam satu transaksi. Kondisi sebelum perubahan disimpan di `bulk_undo`
+# agar operasi bisa dibatalkan selama jendela undo masih terbuka.
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from harlur.varian import assign_variant_ids
+from harlur.waktu import FMT, WIB, now_wib
+
+# Kolom yang boleh diubah lewat bulk edit (sama dengan tab Edit)
+EDITABLE_COLUMNS = ["tempat_produksi", "varian_produksi", "lokasi_gudang", "expired_date"]
+
+# Kolom yang disimpan untuk undo
+SNAPSHOT_COLUMNS = EDITABLE_COLUMNS + ["updated_at", "deleted_at"]
+
+UNDO_WINDOW_MENIT = 30
+
+
+def init_bulk(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bulk_operasi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT,
+        jenis TEXT,
+        keterangan TEXT,
+        jumlah INTEGER,
+        undone_at TEXT
+    )
+    """)
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS bulk_undo (
+        op_id INTEGER,
+        batch_id TEXT,
+        {", ".join(f"{c} TEXT" for c in SNAPSHOT_COLUMNS)},
+        PRIMARY KEY (op_id, batch_id)
+    )
+    """)
+
+
+# ===================== FILTER =====================
+def build_filter(conn, varian=None, gudang=None, tempat=None,
+                 tanggal=None, expired=None, batch_ids=None):
+    """Susun klausa WHERE untuk filter bulk; hanya batch aktif yang ikut.
+
+    `varian`/`gudang`/`tempat` berupa list nilai persis, `tanggal`/`expired`
+    berupa tuple (dari, sampai) string YYYY-MM-DD, dan `batch_ids` daftar ID
+    hasil upload (dimuat ke tabel TEMP agar tetap satu statement JOIN).
+    """
+    clauses = ["deleted_at IS NULL"]
+    params = []
+
+    for col, values in (("varian_produksi", varian), ("lokasi_gudang", gudang), ("tempat_produksi", tempat)):
+        if values:
+            clauses.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+    for col, rng in (("tanggal", tanggal), ("expired_date", expired)):
+        if rng:
+            clauses.append(f"{col} BETWEEN ? AND ?")
+            params.extend([str(rng[0]), str(rng[1])])
+
+    if batch_ids is not None:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _bulk_ids (batch_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _bulk_ids")
+        conn.executemany("INSERT OR IGNORE INTO _bulk_ids VALUES (?)", [(b,) for b in batch_ids])
+        conn.commit()
+        clauses.append("batch_id IN (SELECT batch_id FROM _bulk_ids)")
+
+    return " AND ".join(clauses), params
+
+
+def describe_filter(varian=None, gudang=None, tempat=None,
+                    tanggal=None, expired=None, batch_ids=None, max_values=5):
+    """Ringkasan filter bulk yang bisa dibaca manusia (argumen sama dengan build_filter).
+
+    Dipakai untuk `bulk_operasi.keterangan` dan log aktivitas, jadi yang
+    tercatat adalah nilai pilihan pengguna, bukan klausa SQL tanpa parameter.
+    """
+    bagian = []
+    for label, values in (("varian", varian), ("gudang", gudang), ("tempat", tempat)):
+        if values:
+            teks = ", ".join(map(str, values[:max_values]))
+            if len(values) > max_values:
+                teks += f" (+{len(values) - max_values} lainnya)"
+            bagian.append(f"{label}: {teks}")
+    for label, rng in (("tanggal", tanggal), ("kedaluwarsa", expired)):
+        if rng:
+            bagian.append(f"{label}: {rng[0]} s/d {rng[1]}")
+    if batch_ids is not None:
+        bagian.append(f"{len(set(batch_ids))} batch ID unggahan")
+    return "; ".join(bagian) or "tanpa filter (semua batch aktif)"
+
+
+def preview(conn, where, params, limit=20):
+    """Dry run: jumlah batch yang akan terkena dan contoh barisnya."""
+    count = conn.execute(f"SELECT COUNT(*) FROM produksi WHERE {where}", params).fetchone()[0]
+    sample = pd.read_sql_query(
+        f"SELECT batch_id, tanggal, varian_produksi, tempat_produksi, lokasi_gudang, expired_date "
+        f"FROM produksi WHERE {where} ORDER BY id DESC LIMIT ?",
+        conn, params=(*params, limit)
+    )
+    return count, sample
+
+
+# ===================== EKSEKUSI =====================
+def _run(conn, jenis, keterangan, where, params, set_sql, set_params):
+    ts = now_wib()
+    cols = ", ".join(SNAPSHOT_COLUMNS)
+    with conn:
+        # Bersihkan snapshot undo yang jendelanya sudah lewat
+        batas = (datetime.now(WIB) - timedelta(minutes=UNDO_WINDOW_MENIT)).strftime(FMT)
+        conn.execute(
+            "DELETE FROM bulk_undo WHERE op_id IN (SELECT id FROM bulk_operasi WHERE waktu < ?)", (batas,)
+        )
+
+        op_id = conn.execute(
+            "INSERT INTO bulk_operasi (waktu, jenis, keterangan, jumlah) VALUES (?, ?, ?, 0)",
+            (ts, jenis, keterangan)
+        ).lastrowid
+        conn.execute(
+            f"INSERT INTO bulk_undo (op_id, batch_id, {cols}) "
+            f"SELECT ?, batch_id, {cols} FROM produksi WHERE {where}",
+            (op_id, *params)
+        )
+        n = conn.execute(
+            f"UPDATE produksi SET {set_sql}, updated_at=? WHERE {where}",
+            (*set_params, ts, *params)
+        ).rowcount
+        if "varian_produksi" in set_sql:
+            assign_variant_ids(conn, "batch_id IN (SELECT batch_id FROM bulk_undo WHERE op_id=?)", (op_id,))
+        conn.execute("UPDATE bulk_operasi SET jumlah=? WHERE id=?", (n, op_id))
+    return op_id, n
+
+
+def bulk_update(conn, where, params, changes, keterangan=""):
+    """Ubah kolom `changes` (subset EDITABLE_COLUMNS) untuk semua batch hasil filter."""
+    changes = {k: v for k, v in changes.items() if k in EDITABLE_COLUMNS}
+    if not changes:
+        raise ValueError("Tidak ada kolom yang diubah.")
+    set_sql = ", ".join(f"{col}=?" for col in changes)
+    return _run(conn, "EDIT", keterangan, where, params, set_sql, [str(v) for v in changes.values()])
+
+
+def bulk_delete(conn, where, params, keterangan=""):
+    """Soft delete massal untuk semua batch hasil filter."""
+    return _run(conn, "HAPUS", keterangan, where, params, "deleted_at=?", [now_wib()])
+
+
+def undo(conn, op_id):
+    """Batalkan operasi bulk selama masih dalam jendela undo.
+
+    Batch yang sudah diubah lagi setelah operasi bulk (updated_at berbeda)
+    dilewati agar perubahan yang lebih baru tidak tertimpa. Mengembalikan
+    jumlah batch yang dipulihkan.
+    """
+    op = conn.execute("SELECT waktu, undone_at FROM bulk_operasi WHERE id=?", (op_id,)).fetchone()
+    if op is None:
+        raise ValueError("Operasi tidak ditemukan.")
+    waktu, undone_at = op
+    if undone_at:
+        raise ValueError("Operasi sudah dibatalkan.")
+    batas = (datetime.now(WIB) - timedelta(minutes=UNDO_WINDOW_MENIT)).strftime(FMT)
+    if waktu < batas:
+        raise ValueError("Jendela undo sudah lewat.")
+
+    cols = ", ".join(SNAPSHOT_COLUMNS)
+    with conn:
+        n = conn.execute(
+            f"""
+            UPDATE produksi SET ({cols}) = (
+                SELECT {cols} FROM bulk_undo u WHERE u.op_id=? AND u.batch_id=produksi.batch_id
+            )
+            WHERE batch_id IN (SELECT batch_id FROM bulk_undo WHERE op_id=?) AND updated_at=?
+            """,
+            (op_id, op_id, waktu)
+        ).rowcount
+        assign_variant_ids(conn, "batch_id IN (SELECT batch_id FROM bulk_undo WHERE op_id=?)", (op_id,))
+        conn.execute("UPDATE bulk_operasi SET undone_at=? WHERE id=?", (now_wib(), op_id))
+        conn.execute("DELETE FROM bulk_undo WHERE op_id=?", (op_id,))
+    return n
+
+
+def undoable_operations(conn):
+    """Operasi bulk yang masih bisa dibatalkan, terbaru di atas."""
+    batas = (datetime.now(WIB) - timedelta(minutes=UNDO_WINDOW_MENIT)).strftime(FMT)
+    return pd.read_sql_query(
+        "SELECT id, waktu, jenis, keterangan, jumlah FROM bulk_operasi "
+        "WHERE undone_at IS NULL AND waktu >= ? ORDER BY id DESC",
+        conn, params=(batas,)
+    )
+
+
+def distinct_values(conn, column):
+    rows = conn.execute(
+        f"SELECT DISTINCT {column} FROM produksi WHERE deleted_at IS NULL AND {column} IS NOT NULL ORDER BY 1"
+    ).fetchall()
+    return [r[0] for r in rows]
@@ -0,0 +1,184 @@
+# =========================================================
+# HARLUR COFFEE - CACHE HASIL QUERY BERVERSI DATA
+# =========================================================
+# Setiap INSERT/UPDATE/DELETE pada tabel yang ditampilkan admin menaikkan
+# satu counter `data_versi` lewat trigger, apa pun jalur tulisnya (tambah,
+# edit, hapus, bulk, arsip, restore CSV, tool CLI). Hasil query disimpan per
+# (fungsi/SQL, argumen) dan dipakai ulang selama counter (dan tanggal WIB,
+# untuk status kedaluwarsa) belum berubah. Rerun Streamlit yang tidak
+# mengubah data tidak menyentuh SQLite selain membaca counter.
+#
+#   df = QUERY_CACHE.call(conn, produksi.list_produksi)
+#   logs = QUERY_CACHE.read_sql(conn, "SELECT * FROM log_aktivitas ORDER BY id DESC")
+#
+# Hasil bersifat read-only: DataFrame dikembalikan sebagai salinan dangkal
+# (copy-on-write pandas >= 3, salinan penuh di versi lama), list sebagai
+# tuple. Total ukuran dibatasi `max_bytes`; entri paling lama tidak dipakai
+# dibuang lebih dulu.
+
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from harlur.waktu import WIB
+
+# Tabel yang isinya tampil di halaman admin; riwayat & arsip ikut berubah
+# bersama `produksi` sehingga tidak perlu trigger sendiri.
+VERSIONED_TABLES = [
+    "produksi", "log_aktivitas", "bulk_operasi", "batch_id_reservasi", "varian", "varian_alias",
+    "lot_bahan", "lot_asal", "batch_lot", "stok_mutasi", "stok_batch", "stok_level",
+]
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_COW = int(pd.__version__.split(".")[0]) >= 3
+
+
+def init_data_version(conn):
+    """Counter versi data + trigger penaik di setiap tabel VERSIONED_TABLES yang ada."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS data_versi (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versi INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_versi (id, versi) VALUES (1, 0)")
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in VERSIONED_TABLES:
+        if table not in tables:
+            continue
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_data_versi_{op.lower()} AFTER {op} ON {table} "
+                f"BEGIN UPDATE data_versi SET versi = versi + 1 WHERE id = 1; END"
+            )
+
+
+def data_version(conn):
+    return conn.execute("SELECT versi FROM data_versi WHERE id = 1").fetchone()[0]
+
+
+def _freeze_key(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze_key(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, tuple):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    # Salinan yang aman diubah pemanggil tanpa merusak isi cache
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=not _COW)
+    if isinstance(value, tuple):
+        return tuple(_thaw(v) for v in value)
+    return value
+
+
+def _sizeof(value):
+    """Perkiraan ukuran memori hasil query (byte)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """LRU hasil query untuk satu versi data, dibatasi total ukuran memori."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._versi = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current(self, conn):
+        # Tanggal ikut jadi bagian versi: status Fresh/Near/Expired bergeser tiap hari
+        return data_version(conn), datetime.now(WIB).date()
+
+    def _sync(self, versi):
+        if versi != self._versi:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.bytes = 0
+            self._versi = versi
+
+    def get_or_compute(self, conn, key, compute):
+        versi = self._current(conn)
+        with self._lock:
+            self._sync(versi)
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return _thaw(item[0])
+            self.misses += 1
+
+        value = _freeze(compute())
+        size = _sizeof(value)
+        with self._lock:
+            # Data bisa berubah selama query berjalan: simpan hanya jika versinya masih sama
+            if versi == self._versi and size <= self.max_bytes:
+                old = self._data.pop(key, None)
+                if old is not None:
+                    self.bytes -= old[1]
+                self._data[key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, s) = self._data.popitem(last=False)
+                    self.bytes -= s
+                    self.evictions += 1
+        return _thaw(value)
+
+    def call(self, conn, fn, *args):
+        """Hasil `fn(conn, *args)`, dikunci dengan nama fungsi + argumen."""
+        key = (fn.__module__, fn.__qualname__, _freeze_key(args))
+        return self.get_or_compute(conn, key, lambda: fn(conn, *args))
+
+    def read_sql(self, conn, sql, params=()):
+        key = ("sql", sql, _freeze_key(params))
+        return self.get_or_compute(conn, key, lambda: pd.read_sql_query(sql, conn, params=params))
+
+    def clear(self):
+        """Kosongkan cache (mis. setelah file database diganti dari snapshot)."""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+            self._versi = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "data_versi": self._versi[0] if self._versi else None,
+            }
+
+
+# Satu instance per proses (bertahan di antara rerun Streamlit, seperti REGISTRY)
+QUERY_CACHE = QueryCache()
@@ -0,0 +1,70 @@
+# =========================================================
+# HARLUR COFFEE - KONEKSI & SKEMA DATABASE
+# =========================================================
+
+import sqlite3
+
+from harlur import bahan, batch_ids, bulk, cache, history, search, stok, sync, varian
+
+
+def connect(path):
+    # Beberapa stasiun bisa menulis bersamaan: tunggu lock, jangan langsung gagal
+    return sqlite3.connect(path, timeout=30)
+
+
+def add_column(conn, table, column, decl="TEXT"):
+    """ALTER TABLE ADD COLUMN yang aman dijalankan berulang (migrasi ringan).
+
+    Kembalikan True jika kolom baru saja ditambahkan.
+    """
+    cols = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column in cols:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+def init_db(conn):
+    """Buat tabel inti lalu pasang skema tambahan (riwayat, dst.)."""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS produksi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_id TEXT UNIQUE,
+        tanggal TEXT,
+        pic TEXT,
+        tempat_produksi TEXT,
+        varian_produksi TEXT,
+        lokasi_gudang TEXT,
+        expired_date TEXT,
+        timestamp TEXT,
+        updated_at TEXT
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS log_aktivitas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT,
+        deskripsi TEXT
+    )
+    """)
+
+    # Soft delete & arsip: record tidak lagi dihapus fisik dari tabel aktif
+    add_column(conn, "produksi", "deleted_at")
+    add_column(conn, "produksi", "archived_at")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produksi_expired ON produksi (expired_date)")
+    # Kunci varian ternormalisasi (lihat harlur/varian.py)
+    variant_baru = add_column(conn, "produksi", "variant_id", "INTEGER")
+
+    history.init_history(conn)
+    bulk.init_bulk(conn)
+    search.init_search(conn)
+    batch_ids.init_batch_ids(conn)
+    varian.init_varian(conn, backfill=variant_baru)
+    bahan.init_bahan(conn)
+    stok.init_stok(conn)
+    cache.init_data_version(conn)
+    sync.init_sync(conn)
+    conn.commit()
@@ -0,0 +1,303 @@
+# =========================================================
+# HARLUR COFFEE - EKSPOR DATA PRODUKSI & LOG (CSV / XLSX / JSONL)
+# =========================================================
+# Ekspor untuk integrasi ERP: baris dibaca dari kursor SQLite per potongan
+# (fetchmany) dan langsung diubah jadi bytes, jadi memori tetap konstan
+# berapa pun jumlah barisnya. Sumber yang didukung:
+#
+#   produksi       -> batch aktif + status kedaluwarsa + nama varian katalog
+#   log_aktivitas  -> log aktivitas
+#
+# Filter: rentang tanggal (tanggal produksi / waktu log), varian (lewat
+# katalog, jadi alias ikut tertangkap), lokasi gudang, status kedaluwarsa.
+# XLSX memakai openpyxl mode write_only (opsional, pip install openpyxl).
+#
+#   python -m harlur.export --db data_produksi.db --table produksi --format csv --out produksi.csv
+#   python -m harlur.export --db data_produksi.db --table log_aktivitas --format jsonl \
+#       --dari 2025-11-01 --sampai 2025-11-30 --out log_2025_11.jsonl
+#   python -m harlur.export --db data_produksi.db --format xlsx --status near --gudang Jatinangor --out near.xlsx
+#
+# Nama file tujuan boleh memakai {tanggal} (tanggal WIB hari ini), mis. untuk
+# cron dump malam: --out /srv/erp/produksi_{tanggal}.csv
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from harlur.metrics import incr, timed
+from harlur.render import STATUSES, expiry_bounds
+from harlur.storage import open_temp
+from harlur.varian import catalog
+from harlur.waktu import WIB
+
+CHUNK_ROWS = 2000
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+TABLES = ("produksi", "log_aktivitas")
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+XLSX_AVAILABLE = openpyxl is not None
+
+
+# ===================== QUERY =====================
+def build_query(conn, table, dari=None, sampai=None, varian=None, gudang=None, status=None, now=None):
+    """(sql, params) untuk ekspor `table` dengan filter opsional.
+
+    `dari`/`sampai` tanggal (date atau YYYY-MM-DD, inklusif), `varian` dan
+    `gudang` list nilai, `status` list dari STATUSES. Varian/gudang/status
+    hanya berlaku untuk `produksi`.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Tabel harus salah satu dari: {', '.join(TABLES)}.")
+    clauses, params = [], []
+
+    if table == "log_aktivitas":
+        if varian or gudang or status:
+            raise ValueError("Filter varian/gudang/status hanya untuk tabel produksi.")
+        # waktu berformat 'YYYY-MM-DD HH:MM:SS': batas atas = awal hari berikutnya
+        if dari:
+            clauses.append("waktu >= ?")
+            params.append(str(dari))
+        if sampai:
+            clauses.append("waktu < ?")
+            params.append(str(date.fromisoformat(str(sampai)) + timedelta(days=1)))
+        where = " AND ".join(clauses) or "1"
+        return f"SELECT id, waktu, deskripsi FROM log_aktivitas WHERE {where} ORDER BY id", params
+
+    now = now or datetime.now(WIB).replace(tzinfo=None)
+    expired_upto, near_upto = expiry_bounds(now)
+    clauses.append("p.deleted_at IS NULL")
+    if dari:
+        clauses.append("p.tanggal >= ?")
+        params.append(str(dari))
+    if sampai:
+        clauses.append("p.tanggal <= ?")
+        params.append(str(sampai))
+
+    if varian:
+        # Teks yang dikenal katalog dicocokkan lewat variant_id (semua alias),
+        # sisanya dicocokkan persis dengan varian_produksi
+        kat = catalog(conn)
+        ids = sorted({kat.resolve(v) for v in varian} - {None})
+        teks = [v for v in varian if kat.resolve(v) is None]
+        parts = []
+        if ids:
+            parts.append(f"p.variant_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if teks:
+            parts.append(f"p.varian_produksi IN ({', '.join('?' * len(teks))})")
+            params.extend(teks)
+        clauses.append(f"({' OR '.join(parts)})")
+
+    if gudang:
+        clauses.append(f"p.lokasi_gudang IN ({', '.join('?' * len(gudang))})")
+        params.extend(gudang)
+
+    if status:
+        unknown = set(status) - set(STATUSES)
+        if unknown:
+            raise ValueError(f"status harus salah satu dari: {', '.join(STATUSES)}.")
+        # Batas sama dengan API lookup; expired_date terindeks (idx_produksi_expired)
+        kondisi = {
+            "expired": ("p.expired_date <= ?", [expired_upto]),
+            "near": ("(p.expired_date > ? AND p.expired_date <= ?)", [expired_upto, near_upto]),
+            "fresh": ("p.expired_date > ?", [near_upto]),
+        }
+        clauses.append(f"({' OR '.join(kondisi[s][0] for s in status)})")
+        for s in status:
+            params.extend(kondisi[s][1])
+
+    sql = f"""
+        SELECT p.batch_id, p.tanggal, p.pic, p.tempat_produksi, p.varian_produksi,
+               v.nama AS varian_katalog, p.lokasi_gudang, p.expired_date,
+               CASE WHEN p.expired_date IS NULL OR p.expired_date = '' THEN NULL
+                    WHEN p.expired_date <= ? THEN 'expired'
+                    WHEN p.expired_date <= ? THEN 'near' ELSE 'fresh' END AS status,
+               p.timestamp, p.updated_at
+        FROM produksi p LEFT JOIN varian v ON v.id = p.variant_id
+        WHERE {' AND '.join(clauses)}
+        ORDER BY p.id
+    """
+    return sql, [expired_upto, near_upto] + params
+
+
+def count_rows(conn, table, dari=None, sampai=None, varian=None, gudang=None, status=None):
+    sql, params = build_query(conn, table, dari, sampai, varian, gudang, status)
+    return conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+
+def _chunks(cursor, chunk_rows):
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+# ===================== FORMAT =====================
+def _iter_csv(columns, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM agar Excel membaca UTF-8 dengan benar
+    writer.writerow(columns)
+    yield ("\ufeff" + buf.getvalue()).encode()
+    for rows in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+
+
+def _iter_jsonl(columns, chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+
+
+def _iter_xlsx(columns, chunks, sheet):
+    # write_only menulis baris ke file sementara; ZIP XLSX baru utuh saat save,
+    # jadi hasilnya dialirkan dari file sementara setelah semua baris ditulis
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(columns)
+    for rows in chunks:
+        for row in rows:
+            ws.append(row)
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            data = tmp.read(1 << 20)
+            if not data:
+                return
+            yield data
+
+
+def stream(conn, table, fmt, chunk_rows=CHUNK_ROWS, stats=None, **filters):
+    """Generator bytes file ekspor; `stats["rows"]` diisi jumlah baris jika diberikan.
+
+    Filter divalidasi dan query dijalankan saat dipanggil (error muncul di
+    sini, bukan di tengah unduhan); baris baru dibaca saat generator berjalan.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format harus salah satu dari: {', '.join(FORMATS)}.")
+    if fmt == "xlsx" and openpyxl is None:
+        raise ImportError("openpyxl belum terpasang: pip install openpyxl (dibutuhkan untuk ekspor XLSX)")
+    sql, params = build_query(conn, table, **filters)
+    cursor = conn.execute(sql, params)
+    stats = {} if stats is None else stats
+    stats["rows"] = 0
+    return _generate(cursor, table, fmt, chunk_rows, stats)
+
+
+def _generate(cursor, table, fmt, chunk_rows, stats):
+    columns = [d[0] for d in cursor.description]
+
+    def counted():
+        for rows in _chunks(cursor, chunk_rows):
+            stats["rows"] += len(rows)
+            yield rows
+
+    try:
+        if fmt == "csv":
+            yield from _iter_csv(columns, counted())
+        elif fmt == "jsonl":
+            yield from _iter_jsonl(columns, counted())
+        else:
+            yield from _iter_xlsx(columns, counted(), table)
+    finally:
+        cursor.close()
+        incr(f"export.{table}.rows", stats["rows"])
+
+
+def filename(table, fmt, now=None):
+    now = now or datetime.now(WIB)
+    return f"{table}_{now.strftime('%Y%m%d_%H%M')}.{fmt}"
+
+
+@timed("export.file")
+def export_file(conn, out, table, fmt, **filters):
+    """Tulis ekspor ke path (atomik: file sementara lalu os.replace) atau file-like.
+
+    Kembalikan {"rows", "bytes", "seconds"}.
+    """
+    t = time.perf_counter()
+    stats = {}
+    size = 0
+    if hasattr(out, "write"):
+        for data in stream(conn, table, fmt, stats=stats, **filters):
+            out.write(data)
+            size += len(data)
+    else:
+        out = Path(out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        # open_temp, bukan mkstemp: dump dibaca job ERP / user lain, jadi jangan 0600
+        fd, tmp = open_temp(out.parent, prefix=f".{out.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for data in stream(conn, table, fmt, stats=stats, **filters):
+                    f.write(data)
+                    size += len(data)
+            os.replace(tmp, out)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    return {"rows": stats["rows"], "bytes": size, "seconds": time.perf_counter() - t}
+
+
+def _list(text):
+    return [v.strip() for v in text.split(",") if v.strip()] if text else None
+
+
+def main(argv=None):
+    from harlur.db import connect, init_db
+
+    ap = argparse.ArgumentParser(description="Ekspor data produksi / log aktivitas untuk ERP")
+    ap.add_argument("--db", required=True, help="Path data_produksi.db")
+    ap.add_argument("--table", choices=TABLES, default="produksi")
+    ap.add_argument("--format", choices=list(FORMATS), default="csv")
+    ap.add_argument("--out", required=True, help="File tujuan ('-' = stdout); boleh memakai {tanggal}")
+    ap.add_argument("--dari", help="Tanggal awal (YYYY-MM-DD)")
+    ap.add_argument("--sampai", help="Tanggal akhir (YYYY-MM-DD)")
+    ap.add_argument("--varian", help="Varian, dipisah koma")
+    ap.add_argument("--gudang", help="Lokasi gudang, dipisah koma")
+    ap.add_argument("--status", help="expired,near,fresh (dipisah koma)")
+    args = ap.parse_args(argv)
+
+    conn = connect(args.db)
+    init_db(conn)
+    filters = {"dari": args.dari, "sampai": args.sampai}
+    if args.table == "produksi":
+        filters.update(varian=_list(args.varian), gudang=_list(args.gudang), status=_list(args.status))
+    try:
+        if args.out == "-":
+            hasil = export_file(conn, sys.stdout.buffer, args.table, args.format, **filters)
+            print(f"{hasil['rows']} baris dalam {hasil['seconds']:.1f} s", file=sys.stderr)
+            return
+        out = args.out.format(tanggal=datetime.now(WIB).strftime("%Y%m%d"))
+        hasil = export_file(conn, out, args.table, args.format, **filters)
+    except (ValueError, ImportError) as e:
+        raise SystemExit(str(e))
+    finally:
+        conn.close()
+    print(f"{hasil['rows']} baris ({hasil['bytes'] / 1e6:.1f} MB) dalam {hasil['seconds']:.1f} s -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# =========================================================
+# HARLUR COFFEE - RIWAYAT BATCH (AUDIT TRAIL)
+# =========================================================
+# Setiap INSERT/UPDATE/DELETE pada `produksi` disalin utuh ke
+# `produksi_history` oleh trigger, sehingga isi record pada tanggal
+# berapa pun bisa direkonstruksi tanpa bergantung pada kode aplikasi.
+
+import pandas as pd
+
+from harlur.waktu import SQL_NOW_WIB, now_wib, to_stamp
+
+HISTORY_TABLE = "produksi_history"
+
+# Kolom metadata riwayat; sisanya mengikuti kolom `produksi`
+META_COLUMNS = ["history_id", "operasi", "changed_at"]
+DERIVED_COLUMNS = {"variant_id"}
+
+
+def _produksi_columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(produksi)")]
+
+
+def _history_columns(conn):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({HISTORY_TABLE})")]
+
+
+def _ensure_trigger(conn, name, sql):
+    # Trigger dibuat ulang hanya jika definisinya berubah (mis. kolom baru)
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (name,)
+    ).fetchone()
+    if row and row[0] == sql:
+        return
+    conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute(sql)
+
+
+def init_history(conn):
+    """Siapkan tabel riwayat, index, trigger, dan baseline record lama."""
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+        history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        operasi TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )
+    """)
+
+    # Kolom riwayat mengikuti skema `produksi` (termasuk kolom yang ditambah belakangan)
+    cols = _produksi_columns(conn)
+    existing = set(_history_columns(conn))
+    for col in cols:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE {HISTORY_TABLE} ADD COLUMN {col}")
+
+    # Rekonstruksi satu batch = satu index seek, O(jumlah versi batch tsb.)
+    conn.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_produksi_history_batch
+    ON {HISTORY_TABLE} (batch_id, changed_at, history_id)
+    """)
+
+    col_list = ", ".join(cols)
+    new_vals = ", ".join(f"NEW.{c}" for c in cols)
+    old_vals = ", ".join(f"OLD.{c}" for c in cols)
+    # Kolom turunan (variant_id dari varian_produksi) ikut disalin tapi
+    # pemetaan ulang massal saja tidak dicatat sebagai perubahan
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in cols if c not in DERIVED_COLUMNS)
+
+    _ensure_trigger(conn, "produksi_history_ai", (
+        f"CREATE TRIGGER produksi_history_ai AFTER INSERT ON produksi BEGIN "
+        f"INSERT INTO {HISTORY_TABLE} (operasi, changed_at, {col_list}) "
+        f"VALUES ('INSERT', {SQL_NOW_WIB}, {new_vals}); END"
+    ))
+    _ensure_trigger(conn, "produksi_history_au", (
+        f"CREATE TRIGGER produksi_history_au AFTER UPDATE ON produksi "
+        f"WHEN {changed} BEGIN "
+        f"INSERT INTO {HISTORY_TABLE} (operasi, changed_at, {col_list}) "
+        f"VALUES ('UPDATE', {SQL_NOW_WIB}, {new_vals}); END"
+    ))
+    # Batch yang dipindah ke arsip tetap "ada" secara historis
+    delete_op = (
+        "CASE WHEN OLD.archived_at IS NOT NULL THEN 'ARCHIVE' ELSE 'DELETE' END"
+        if "archived_at" in cols else "'DELETE'"
+    )
+    _ensure_trigger(conn, "produksi_history_ad", (
+        f"CREATE TRIGGER produksi_history_ad AFTER DELETE ON produksi BEGIN "
+        f"INSERT INTO {HISTORY_TABLE} (operasi, changed_at, {col_list}) "
+        f"VALUES ({delete_op}, {SQL_NOW_WIB}, {old_vals}); END"
+    ))
+
+    # Record yang sudah ada sebelum riwayat aktif dicatat sebagai BASELINE
+    # pada updated_at-nya; kondisi sebelum waktu itu memang tidak diketahui.
+    conn.execute(f"""
+    INSERT INTO {HISTORY_TABLE} (operasi, changed_at, {col_list})
+    SELECT 'BASELINE', COALESCE(p.updated_at, p.timestamp, ?), {", ".join(f"p.{c}" for c in cols)}
+    FROM produksi p
+    WHERE NOT EXISTS (SELECT 1 FROM {HISTORY_TABLE} h WHERE h.batch_id = p.batch_id)
+    """, (now_wib(),))
+
+
+def batch_timeline(conn, batch_id):
+    """Semua versi satu batch, urut dari yang paling lama."""
+    return pd.read_sql_query(
+        f"SELECT * FROM {HISTORY_TABLE} WHERE batch_id=? ORDER BY changed_at, history_id",
+        conn, params=(batch_id,)
+    )
+
+
+def batch_as_of(conn, batch_id, as_of):
+    """Isi record batch pada waktu `as_of`; None jika belum ada / sudah dihapus."""
+    df = pd.read_sql_query(
+        f"""
+        SELECT * FROM {HISTORY_TABLE}
+        WHERE batch_id=? AND changed_at<=?
+        ORDER BY changed_at DESC, history_id DESC
+        LIMIT 1
+        """,
+        conn, params=(batch_id, to_stamp(as_of))
+    )
+    if df.empty or df.iloc[0]["operasi"] == "DELETE":
+        return None
+    return df.drop(columns=META_COLUMNS)
+
+
+def produksi_as_of(conn, as_of):
+    """Rekonstruksi seluruh tabel `produksi` seperti pada waktu `as_of`.
+
+    Batch yang sudah diarsipkan tetap ikut; kolom `deleted_at` dibiarkan
+    apa adanya sehingga soft delete terlihat pada hasil rekonstruksi.
+    """
+    cols = ", ".join(_produksi_columns(conn))
+    return pd.read_sql_query(
+        f"""
+        SELECT {cols} FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY batch_id ORDER BY changed_at DESC, history_id DESC
+            ) AS rn
+            FROM {HISTORY_TABLE}
+            WHERE changed_at<=?
+        )
+        WHERE rn=1 AND operasi<>'DELETE'
+        ORDER BY id DESC
+        """,
+        conn, params=(to_stamp(as_of),)
+    )
+
+
+def history_batch_ids(conn, prefix="", limit=50):
+    """Batch yang pernah tercatat (termasuk yang sudah dihapus), via range scan index."""
+    prefix = prefix.strip().upper()
+    rows = conn.execute(
+        f"""
+        SELECT DISTINCT batch_id FROM {HISTORY_TABLE}
+        WHERE batch_id >= ? AND batch_id < ?
+        ORDER BY batch_id LIMIT ?
+        """,
+        (prefix, prefix + "\U0010ffff", limit)
+    ).fetchall()
+    return [r[0] for r in rows]
@@ -0,0 +1,304 @@
+# =========================================================
+# HARLUR COFFEE - LABEL THERMAL ZPL (QR NATIVE PRINTER)
+# =========================================================
+# Label langsung dalam bahasa printer (ZPL II) tanpa PNG/PDF/driver: QR
+# digambar printer sendiri lewat ^BQN dari tautan Consumer View, teks dari
+# kolom `produksi` memakai font internal ^A0. Satu label = satu blok
+# ^XA..^XZ; satu run (banyak batch) cukup digabung dan dikirim sekali.
+#
+# Tujuan: file .zpl atau socket TCP mentah (port 9100, "raw/JetDirect").
+# Printer tiruan untuk pengujian tanpa perangkat: `python -m harlur.labels printer`.
+#
+#   python -m harlur.labels print --db data_produksi.db --batch BAN-ML-251128-0007 --out label.zpl
+#   python -m harlur.labels print --db data_produksi.db --dari 2025-11-28 --sampai 2025-11-28 --printer 10.0.0.50:9100
+#   python -m harlur.labels print --db data_produksi.db --ids-file reservasi_BAN-ML-251128-0001.txt --printer 10.0.0.50
+#   python -m harlur.labels printer --port 9100 --out diterima.zpl
+#
+# Ukuran label default 50 x 30 mm pada 203 dpi; ganti lewat LabelSpec.
+
+import argparse
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from harlur.metrics import incr, timed
+from harlur.qr import consumer_link, modules_count
+
+ENV_LABEL_PRINTER = "HARLUR_LABEL_PRINTER"
+RAW_PORT = 9100
+# Dot per mm untuk resolusi printer umum
+DOTS_PER_MM = {203: 8, 300: 12, 600: 24}
+MAX_MAGNIFICATION = 10
+CHUNK_LABELS = 200
+CHAR_WIDTH = 0.6
+
+
+class LabelSpec:
+    """Ukuran & resolusi label; semua posisi ZPL dihitung dari sini (dalam dot)."""
+
+    def __init__(self, width_mm=50, height_mm=30, dpi=203, margin_mm=2):
+        if dpi not in DOTS_PER_MM:
+            raise ValueError(f"dpi harus salah satu dari: {', '.join(map(str, DOTS_PER_MM))}.")
+        dpmm = DOTS_PER_MM[dpi]
+        self.width = int(width_mm * dpmm)
+        self.height = int(height_mm * dpmm)
+        self.margin = int(margin_mm * dpmm)
+        self.dpmm = dpmm
+
+
+DEFAULT_SPEC = LabelSpec()
+
+
+# ===================== ZPL =====================
+def zpl_escape(text):
+    """Isi field untuk ^FH_: ^ ~ _ dan byte non-ASCII (UTF-8, ^CI28) ditulis _XX."""
+    out = []
+    for b in str(text).encode("utf-8"):
+        if 0x20 <= b < 0x7F and b not in (0x5E, 0x7E, 0x5F):
+            out.append(chr(b))
+        else:
+            out.append(f"_{b:02X}")
+    return "".join(out)
+
+
+def qr_magnification(link, size):
+    """Faktor pembesaran ^BQ terbesar (1..10) agar QR muat di kotak `size` dot.
+
+    Versi QR dihitung dengan encoder yang sama dengan QR PNG (ECC M, tanpa
+    logo) sehingga sama dengan pilihan printer; +4 modul untuk quiet zone.
+    """
+    modules = modules_count(link) + 4
+    return max(1, min(MAX_MAGNIFICATION, size // modules))
+
+
+def _text(value):
+    if value is None or value != value:  # None / NaN pandas
+        return ""
+    return str(value)
+
+
+def _font_height(teks, tinggi, lebar, minimum):
+    # Font ^A0 kira-kira selebar 0,6 x tingginya per karakter: kecilkan agar muat satu baris
+    if not teks:
+        return tinggi
+    return max(minimum, min(tinggi, int(lebar / (len(teks) * CHAR_WIDTH))))
+
+
+def label_zpl(row, spec=DEFAULT_SPEC, copies=1):
+    """ZPL satu label dari satu baris `produksi` (dict/Series; cukup batch_id untuk ID reservasi)."""
+    batch_id = _text(row.get("batch_id"))
+    link = consumer_link(batch_id)
+    # QR di kiri (persegi), teks di kanan; QR paling lebar separuh label
+    qr_size = min(spec.height - 2 * spec.margin, spec.width // 2 - spec.margin)
+    mag = qr_magnification(link, qr_size)
+    x_text = spec.margin * 2 + qr_size
+    w_text = max(spec.width - x_text - spec.margin, spec.dpmm * 5)
+    big, small, minimum = spec.dpmm * 4, spec.dpmm * 3, spec.dpmm * 2
+
+    detail = [label + _text(row.get(key)) for label, key in (
+        ("", "varian_produksi"), ("Prod ", "tanggal"), ("Exp ", "expired_date"), ("", "lokasi_gudang"),
+    ) if _text(row.get(key))]
+    # Baris detail satu ukuran font (yang terpanjang menentukan) agar rapi
+    kecil = min((_font_height(t, small, w_text, minimum) for t in detail), default=small)
+    # Batch ID tidak boleh lebih kecil dari baris detail di bawahnya
+    baris = [(batch_id, max(kecil, _font_height(batch_id, big, w_text, minimum)))] + [(t, kecil) for t in detail]
+
+    parts = [
+        "^XA", "^CI28",
+        f"^PW{spec.width}", f"^LL{spec.height}", "^LH0,0",
+        # ^BQN model 2; data "MA," = ECC M, pilihan mode otomatis (tautan ringkas -> alfanumerik)
+        f"^FO{spec.margin},{spec.margin}^BQN,2,{mag}^FH_^FDMA,{zpl_escape(link)}^FS",
+    ]
+    y = spec.margin
+    for teks, tinggi in baris:
+        if y + tinggi > spec.height - spec.margin:
+            break
+        parts.append(f"^FO{x_text},{y}^A0N,{tinggi},{tinggi}^FB{w_text},1,0,L^FH_^FD{zpl_escape(teks)}^FS")
+        y += tinggi + spec.dpmm
+    if copies > 1:
+        parts.append(f"^PQ{int(copies)}")
+    parts.append("^XZ")
+    return "".join(parts) + "\n"
+
+
+def iter_zpl(rows, spec=DEFAULT_SPEC, copies=1):
+    """Bytes ZPL per potongan CHUNK_LABELS label, untuk file maupun socket."""
+    buf, n = [], 0
+    for row in rows:
+        buf.append(label_zpl(row, spec, copies))
+        n += 1
+        if len(buf) >= CHUNK_LABELS:
+            yield "".join(buf).encode("ascii")
+            buf = []
+    if buf:
+        yield "".join(buf).encode("ascii")
+    incr("labels.zpl", n)
+
+
+# ===================== SUMBER BARIS =====================
+LABEL_COLUMNS = ["batch_id", "tanggal", "varian_produksi", "lokasi_gudang", "expired_date"]
+
+
+def rows_for_ids(conn, batch_ids):
+    """Baris untuk daftar batch_id sesuai urutan; ID yang belum ada di produksi
+    (mis. hasil reservasi) tetap dapat label berisi QR + ID saja."""
+    batch_ids = list(batch_ids)
+    cols = ", ".join(LABEL_COLUMNS)
+    for i in range(0, len(batch_ids), 500):
+        part = batch_ids[i:i + 500]
+        marks = ", ".join("?" * len(part))
+        found = {r[0]: dict(zip(LABEL_COLUMNS, r)) for r in conn.execute(
+            f"SELECT {cols} FROM produksi WHERE deleted_at IS NULL AND batch_id IN ({marks})", part)}
+        for batch_id in part:
+            yield found.get(batch_id, {"batch_id": batch_id})
+
+
+def rows_for_dates(conn, dari, sampai):
+    """Batch aktif dengan tanggal produksi di [dari, sampai], dibaca bertahap dari kursor."""
+    cursor = conn.execute(
+        f"SELECT {', '.join(LABEL_COLUMNS)} FROM produksi "
+        "WHERE deleted_at IS NULL AND tanggal BETWEEN ? AND ? ORDER BY tanggal, batch_id",
+        (str(dari), str(sampai)),
+    )
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            return
+        for r in rows:
+            yield dict(zip(LABEL_COLUMNS, r))
+
+
+# ===================== OUTPUT =====================
+def parse_printer(target):
+    """'host' atau 'host:port' -> (host, port); port default 9100."""
+    host, _, port = str(target).rpartition(":")
+    if not host:
+        return str(target), RAW_PORT
+    return host, int(port)
+
+
+def write_file(path, chunks):
+    """Tulis ZPL ke file; kembalikan jumlah byte."""
+    size = 0
+    with open(path, "wb") as f:
+        for data in chunks:
+            f.write(data)
+            size += len(data)
+    return size
+
+
+@timed("labels.send_tcp")
+def send_tcp(target, chunks, timeout=10):
+    """Kirim ZPL ke printer lewat socket TCP mentah; kembalikan jumlah byte.
+
+    Printer mengeksekusi label begitu blok ^XZ diterima, jadi label pertama
+    sudah tercetak sementara sisanya masih dikirim.
+    """
+    host, port = parse_printer(target)
+    size = 0
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        for data in chunks:
+            sock.sendall(data)
+            size += len(data)
+    return size
+
+
+class DummyPrinter:
+    """Printer tiruan port raw: simpan semua bytes yang diterima (dan ke file jika diberikan)."""
+
+    def __init__(self, host="127.0.0.1", port=0, out=None):
+        self.received = bytearray()
+        self.out = Path(out) if out else None
+        self._lock = threading.Lock()
+        printer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    data = self.request.recv(1 << 16)
+                    if not data:
+                        return
+                    printer._receive(data)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def _receive(self, data):
+        with self._lock:
+            self.received.extend(data)
+            if self.out is not None:
+                with open(self.out, "ab") as f:
+                    f.write(data)
+
+    @property
+    def labels(self):
+        with self._lock:
+            return self.received.count(b"^XZ")
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="harlur-dummy-printer").start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    from harlur.db import connect
+
+    ap = argparse.ArgumentParser(description="Label thermal ZPL Harlur")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("print", help="Buat label untuk batch / rentang tanggal / daftar ID")
+    p.add_argument("--db", required=True)
+    p.add_argument("--batch", action="append", default=[], help="Batch ID (boleh berulang)")
+    p.add_argument("--ids-file", help="File daftar batch ID, satu per baris (mis. hasil reservasi)")
+    p.add_argument("--dari", help="Tanggal produksi awal (YYYY-MM-DD)")
+    p.add_argument("--sampai", help="Tanggal produksi akhir (default = --dari)")
+    p.add_argument("--copies", type=int, default=1)
+    p.add_argument("--width-mm", type=float, default=50)
+    p.add_argument("--height-mm", type=float, default=30)
+    p.add_argument("--dpi", type=int, default=203)
+    p.add_argument("--out", help="File .zpl tujuan")
+    p.add_argument("--printer", default=os.environ.get(ENV_LABEL_PRINTER), help="host[:port] printer (raw 9100)")
+    d = sub.add_parser("printer", help="Printer tiruan: terima ZPL di port raw dan simpan ke file")
+    d.add_argument("--host", default="127.0.0.1")
+    d.add_argument("--port", type=int, default=RAW_PORT)
+    d.add_argument("--out", default="diterima.zpl")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "printer":
+        printer = DummyPrinter(args.host, args.port, args.out)
+        print(f"Printer tiruan di {args.host}:{args.port}, label disimpan ke {args.out}")
+        printer.server.serve_forever()
+        return
+
+    if not (args.out or args.printer):
+        raise SystemExit(f"Isi --out atau --printer (atau env {ENV_LABEL_PRINTER})")
+    ids = list(args.batch)
+    if args.ids_file:
+        ids += [line.strip() for line in Path(args.ids_file).read_text().splitlines() if line.strip()]
+    if not ids and not args.dari:
+        raise SystemExit("Isi --batch, --ids-file, atau --dari")
+
+    conn = connect(args.db)
+    rows = rows_for_ids(conn, ids) if ids else rows_for_dates(conn, args.dari, args.sampai or args.dari)
+    spec = LabelSpec(args.width_mm, args.height_mm, args.dpi)
+    t = time.perf_counter()
+    chunks = iter_zpl(rows, spec, args.copies)
+    if args.out:
+        size = write_file(args.out, chunks)
+        tujuan = args.out
+    else:
+        size = send_tcp(args.printer, chunks)
+        tujuan = args.printer
+    conn.close()
+    print(f"{size / 1e3:.1f} kB ZPL -> {tujuan} dalam {time.perf_counter() - t:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
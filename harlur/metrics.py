@@ -0,0 +1,150 @@
+# =========================================================
+# HARLUR COFFEE - INSTRUMENTASI (SPAN, COUNTER, HISTOGRAM)
+# =========================================================
+# Registry tingkat proses: bertahan di antara rerun Streamlit karena modul
+# yang di-import tidak dieksekusi ulang. Aman dipakai dari thread lain
+# (mis. thread video streamlit-webrtc).
+#
+#   with span("qr.make"):
+#       ...
+#
+#   @timed("export_pdf")
+#   def export_pdf(...): ...
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Batas bucket histogram dalam detik (gaya Prometheus)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 1024
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist = {}
+        self._counters = {}
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            h = self._hist.get(name)
+            if h is None:
+                h = self._hist[name] = _Histogram()
+            h.observe(seconds)
+            if error:
+                h.errors += 1
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """Ringkasan per span: count, mean/p50/p95/p99/max (ms), error."""
+        with self._lock:
+            spans = {}
+            for name, h in self._hist.items():
+                recent = sorted(h.recent)
+
+                def pct(q):
+                    return recent[min(int(q * len(recent)), len(recent) - 1)] * 1000 if recent else 0.0
+
+                spans[name] = {
+                    "count": h.count,
+                    "errors": h.errors,
+                    "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": pct(0.50),
+                    "p95_ms": pct(0.95),
+                    "p99_ms": pct(0.99),
+                    "max_ms": h.max * 1000,
+                    "total_s": h.sum,
+                }
+            return {"spans": spans, "counters": dict(self._counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="harlur"):
+        """Format teks eksposisi Prometheus."""
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Durasi span instrumentasi.",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self._hist.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), h.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {h.sum:.6f}')
+                lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {h.count}')
+
+            lines.append(f"# TYPE {prefix}_span_errors_total counter")
+            for name, h in sorted(self._hist.items()):
+                lines.append(f'{prefix}_span_errors_total{{span="{name}"}} {h.errors}')
+
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def span(name, registry=None):
+    registry = registry or REGISTRY
+    t = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException as e:
+        # Exception kontrol alur Streamlit (stop/rerun) bukan error
+        error = not type(e).__name__.endswith(("StopException", "RerunException"))
+        raise
+    finally:
+        registry.observe(name, time.perf_counter() - t, error)
+
+
+def timed(name):
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def incr(name, value=1):
+    REGISTRY.incr(name, value)
@@ -0,0 +1,54 @@
+# =========================================================
+# HARLUR COFFEE - OPERASI DATA PRODUKSI
+# =========================================================
+# Jalur tulis/baca utama tabel `produksi` tanpa ketergantungan Streamlit,
+# dipakai oleh streamlit_app.py dan tool pendukung (benchmark, API, CLI).
+
+import pandas as pd
+
+from harlur.metrics import timed
+from harlur.varian import resolve_id
+from harlur.waktu import now_wib
+
+
+@timed("db.insert_batch")
+def insert_batch(conn, batch_id, tanggal, pic, tempat, varian, gudang, expired):
+    """INSERT satu batch; duplikat batch_id memunculkan sqlite3.IntegrityError."""
+    ts = now_wib()
+    with conn:
+        conn.execute("""
+            INSERT INTO produksi (
+                batch_id, tanggal, pic, tempat_produksi, varian_produksi,
+                lokasi_gudang, expired_date, timestamp, updated_at, variant_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (batch_id, tanggal, pic, tempat, varian, gudang, expired, ts, ts, resolve_id(conn, varian)))
+    return ts
+
+
+@timed("db.update_batch")
+def update_batch(conn, batch_id, tempat, varian, gudang, expired):
+    with conn:
+        conn.execute("""
+            UPDATE produksi SET tempat_produksi=?, varian_produksi=?, variant_id=?, lokasi_gudang=?,
+                expired_date=?, updated_at=?
+            WHERE batch_id=?
+        """, (tempat, varian, resolve_id(conn, varian), gudang, str(expired), now_wib(), batch_id))
+
+
+@timed("db.get_batch")
+def get_batch(conn, batch_id):
+    df = pd.read_sql_query(
+        "SELECT * FROM produksi WHERE batch_id=? AND deleted_at IS NULL", conn, params=(batch_id,)
+    )
+    return df if not df.empty else None
+
+
+@timed("db.list_produksi")
+def list_produksi(conn):
+    """Semua batch aktif, terbaru di atas (data tab Lihat)."""
+    return pd.read_sql_query("SELECT * FROM produksi WHERE deleted_at IS NULL ORDER BY id DESC", conn)
+
+
+def log_activity(conn, desc):
+    with conn:
+        conn.execute("INSERT INTO log_aktivitas (waktu, deskripsi) VALUES (?, ?)", (now_wib(), desc))
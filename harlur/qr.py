@@ -0,0 +1,190 @@
+# =========================================================
+# HARLUR COFFEE - PEMBUATAN & PEMBACAAN QR
+# =========================================================
+# Format payload:
+#   lama    : https://harlur-traceability.streamlit.app/?batch_id=<ID>  (mode byte)
+#   ringkas : HTTPS://HARLUR-TRACEABILITY.STREAMLIT.APP?B=<TOKEN>
+#
+# Payload ringkas memakai huruf besar agar host & token masuk mode
+# alfanumerik QR (5,5 bit/karakter vs 8 bit di mode byte) dan angka di
+# ujung token masuk mode numerik (3,3 bit/digit), sehingga versi QR lebih
+# kecil, modul lebih besar, dan pemindaian lebih cepat. Skema & host URL
+# tidak peka huruf besar/kecil, jadi tautan tetap bisa dibuka.
+# Consumer View menerima kedua format.
+
+import base64
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+import qrcode
+from PIL import Image
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+from harlur.metrics import span
+
+BASE_URL = "https://harlur-traceability.streamlit.app/"
+COMPACT_BASE_URL = BASE_URL.upper().rstrip("/")
+COMPACT_PARAM = "B"
+LOGO_SIZE = 80
+BOX_SIZE = 10
+BORDER = 2
+
+# Jenis token (dipilih berurutan, harus bisa dibalik persis):
+#   1. ID terstruktur SITE-VAR-YYMMDD-URUT (harlur/batch_ids.py) -> tanpa
+#      tanda hubung, diawali satu digit panjang kode: BAN-ML-251128-0001
+#      -> 7BANML2511280001 (digit di ujung jadi segmen numerik)
+#   2. ID yang semua karakternya aman di mode alfanumerik & query URL -> apa adanya
+#   3. selain itu -> base32 dengan awalan "." (base32 juga murni alfanumerik)
+TOKEN_CHARS = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-.")
+ENCODED_PREFIX = "."
+STRUCTURED_ID = re.compile(r"([A-Z0-9]{1,3})-([A-Z0-9]{1,3})-(\d{6})-(\d{4,})")
+
+# Kapasitas pemulihan codeword tiap level koreksi error
+ECC_RECOVERY = (
+    (ERROR_CORRECT_L, 0.07),
+    (ERROR_CORRECT_M, 0.15),
+    (ERROR_CORRECT_Q, 0.25),
+    (ERROR_CORRECT_H, 0.30),
+)
+# Kapasitas pemulihan minimal = LOGO_MARGIN x fraksi modul yang tertutup logo
+# (logo jarang sejajar grid modul dan codeword yang tersentuh sebagian ikut
+# rusak). 2.5 dipilih dari hasil benchmarks/qr_payload.py: 2.0 memberi ECC M
+# yang sering gagal dibaca pada label kecil yang sedikit blur.
+LOGO_MARGIN = 2.5
+# Panjang minimum segmen alfanumerik sebelum qrcode memecah payload campuran
+OPTIMIZE_MIN = 3
+
+
+def _structured_token(batch_id):
+    m = STRUCTURED_ID.fullmatch(batch_id)
+    if not m:
+        return None
+    site, var, tgl, seq = m.groups()
+    return f"{(len(site) - 1) * 3 + len(var) - 1}{site}{var}{tgl}{seq}"
+
+
+def _structured_id(token):
+    if len(token) < 13 or not token[0].isdigit() or int(token[0]) > 8:
+        return None
+    ls, lv = int(token[0]) // 3 + 1, int(token[0]) % 3 + 1
+    site, var, digits = token[1:1 + ls], token[1 + ls:1 + ls + lv], token[1 + ls + lv:]
+    if len(digits) < 10 or not digits.isdigit():
+        return None
+    return f"{site}-{var}-{digits[:6]}-{digits[6:]}"
+
+
+def batch_token(batch_id):
+    batch_id = str(batch_id)
+    for token in (_structured_token(batch_id), batch_id):
+        if token and set(token) <= TOKEN_CHARS and token_batch_id(token) == batch_id:
+            return token
+    encoded = base64.b32encode(batch_id.encode("utf-8")).decode("ascii").rstrip("=")
+    return ENCODED_PREFIX + encoded
+
+
+def token_batch_id(token):
+    token = str(token).strip().upper()
+    if token.startswith(ENCODED_PREFIX):
+        encoded = token[len(ENCODED_PREFIX):]
+        try:
+            return base64.b32decode(encoded + "=" * (-len(encoded) % 8)).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            return None
+    return _structured_id(token) or token or None
+
+
+def consumer_link(batch_id):
+    """Tautan Consumer View ringkas (mode alfanumerik) untuk dicetak di QR."""
+    return f"{COMPACT_BASE_URL}?{COMPACT_PARAM}={batch_token(batch_id)}"
+
+
+def legacy_consumer_link(batch_id):
+    """Format tautan lama (?batch_id=) yang masih tercetak di label lama."""
+    return f"{BASE_URL}?batch_id={batch_id}"
+
+
+def batch_id_from_params(params):
+    """batch_id dari query param Streamlit (`batch_id` lama atau `B` ringkas)."""
+    batch_id = params.get("batch_id")
+    if batch_id:
+        return batch_id
+    token = params.get(COMPACT_PARAM) or params.get(COMPACT_PARAM.lower())
+    return token_batch_id(token) if token else None
+
+
+def batch_id_from_payload(text):
+    """batch_id dari isi QR hasil scan (kedua format URL); None jika bukan QR Harlur."""
+    if not text:
+        return None
+    query = parse_qs(urlsplit(text.strip()).query)
+    return batch_id_from_params({k: v[0] for k, v in query.items()})
+
+
+@lru_cache(maxsize=4)
+def _logo(path, mtime):
+    # Logo dibuka & di-resize sekali per proses, bukan setiap QR dibuat
+    return Image.open(path).resize((LOGO_SIZE, LOGO_SIZE))
+
+
+def _build(link, error_correction):
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(link, optimize=OPTIMIZE_MIN)
+    qr.make(fit=True)
+    return qr
+
+
+def modules_count(link, error_correction=ERROR_CORRECT_M):
+    """Jumlah modul per sisi QR untuk `link` tanpa menggambar matriksnya (cukup best_fit)."""
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(link, optimize=OPTIMIZE_MIN)
+    return qr.best_fit() * 4 + 17
+
+
+def logo_coverage(modules_count, logo_size=LOGO_SIZE, box_size=BOX_SIZE):
+    # +1 modul tiap sisi karena tepi logo memotong modul di sekitarnya
+    covered = (math.ceil(logo_size / box_size) + 1) ** 2
+    return covered / (modules_count ** 2)
+
+
+def build_qr(link, with_logo=True):
+    """QRCode dengan level koreksi error terkecil yang masih tahan logo tengah.
+
+    Level lebih tinggi menaikkan versi (modul makin rapat), jadi dicoba dari
+    L ke H dan diambil yang pertama cukup; tanpa logo dipakai M (default lama).
+    """
+    if not with_logo:
+        return _build(link, ERROR_CORRECT_M)
+    for level, recovery in ECC_RECOVERY:
+        qr = _build(link, level)
+        if recovery >= LOGO_MARGIN * logo_coverage(qr.modules_count):
+            return qr
+    return qr
+
+
+def make_qr_image(link, logo_path=None):
+    """QR (RGB) untuk `link` dengan logo di tengah jika tersedia."""
+    has_logo = logo_path is not None and Path(logo_path).exists()
+    with span("qr.encode"):
+        qr = build_qr(link, with_logo=has_logo)
+        img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+
+    if has_logo:
+        with span("qr.logo"):
+            logo = _logo(str(logo_path), Path(logo_path).stat().st_mtime)
+            pos = ((img.size[0]-LOGO_SIZE)//2, (img.size[1]-LOGO_SIZE)//2)
+            img.paste(logo, pos)
+    return img
+
+
+def decode_qr(img):
+    """Baca isi QR dari PIL Image atau array BGR; string kosong jika gagal."""
+    with span("qr.decode"):
+        if isinstance(img, Image.Image):
+            img = cv2.cvtColor(np.array(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+        data, _, _ = cv2.QRCodeDetector().detectAndDecode(img)
+    return data
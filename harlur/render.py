@@ -0,0 +1,189 @@
+# =========================================================
+# HARLUR COFFEE - RENDER HTML (TABEL LIHAT & KARTU CONSUMER)
+# =========================================================
+
+import base64
+import html
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from harlur.metrics import timed
+from harlur.waktu import WIB
+
+# ========== DEFAULT VARIAN ==========
+# Detail per varian ada di katalog database (harlur/varian.py); nilai di
+# bawah dipakai untuk varian yang belum terdaftar atau kolom yang kosong.
+DEFAULT_DESKRIPSI = "Varian dengan standar kualitas Harlur Coffee."
+DEFAULT_ASAL_BAHAN = "Bahan baku berasal dari distributor tersertifikasi."
+DEFAULT_TASTE = {"Sweetness": 3, "Aroma": 3, "Body": 3}
+DEFAULT_SERVING = "Dapat dinikmati panas atau dingin."
+
+
+# ===================== TABEL LIHAT =====================
+def status_expired(date_str):
+    days = (pd.to_datetime(date_str) - datetime.now()).days
+    if days < 0:
+        return "<span style='color:red;font-weight:bold;'>Expired</span>"
+    elif days <= 30:
+        return "<span style='color:orange;font-weight:bold;'>Near Expired</span>"
+    else:
+        return "<span style='color:green;font-weight:bold;'>Fresh</span>"
+
+
+@timed("render.qr_base64")
+def load_qr_base64(path):
+    if path.exists():
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    return None
+
+
+@timed("render.listing_html")
+def listing_html(df, qr_path_for):
+    """Tabel HTML tab Lihat: status kedaluwarsa + thumbnail QR inline."""
+    df = df.copy()
+    df["Status"] = df["expired_date"].apply(status_expired)
+
+    def qr_cell(batch):
+        b64 = load_qr_base64(qr_path_for(batch))
+        return f"<img src='data:image/png;base64,{b64}' width='70'>" if b64 else "❌"
+
+    df["QR"] = df["batch_id"].apply(qr_cell)
+    # Tabel dirender dengan escape=False (untuk badge & QR), jadi isi data di-escape di sini
+    teks = ["timestamp", "batch_id", "tanggal", "pic", "tempat_produksi",
+            "varian_produksi", "lokasi_gudang", "expired_date"]
+    df[teks] = df[teks].apply(lambda col: col.map(_esc))
+
+    df_view = df[[
+        "timestamp", "batch_id", "tanggal", "pic", "tempat_produksi",
+        "varian_produksi", "lokasi_gudang", "expired_date", "Status", "QR"
+    ]]
+    return df_view.to_html(escape=False, index=False)
+
+
+# ===================== KARTU CONSUMER =====================
+NEAR_EXPIRED_DAYS = 30
+STATUSES = ("expired", "near", "fresh")
+
+
+def expiry_status(expired_date, now=None):
+    """'expired' / 'near' / 'fresh' — satu-satunya bagian kartu yang berubah seiring waktu."""
+    # Hitung Expired (Fix Timezone issue)
+    now = now or datetime.now(WIB).replace(tzinfo=None)
+    days_left = (pd.to_datetime(expired_date) - now).days
+
+    if days_left < 0:
+        return "expired"
+    elif days_left <= NEAR_EXPIRED_DAYS:
+        return "near"
+    return "fresh"
+
+
+def expiry_bounds(now):
+    """Batas tanggal (inklusif) untuk status expired/near, sama dengan expiry_status."""
+    # (exp - now).days < 0 <=> tanggal <= hari ini ; <= 30 <=> tanggal <= hari ini + 31
+    today = now.date()
+    return str(today), str(today + timedelta(days=NEAR_EXPIRED_DAYS + 1))
+
+
+def expiry_status_series(expired_dates, now=None):
+    """Versi vektor `expiry_status` untuk banyak batch sekaligus (ambang yang sama)."""
+    now = now or datetime.now(WIB).replace(tzinfo=None)
+    exp = pd.to_datetime(expired_dates, errors="coerce")
+    # (exp - now).days < 0  <=>  exp < now ;  .days <= 30  <=>  exp < now + 31 hari
+    status = np.where(exp < now, "expired",
+                      np.where(exp < now + timedelta(days=NEAR_EXPIRED_DAYS + 1), "near", "fresh"))
+    return pd.Series(status, index=getattr(expired_dates, "index", None))
+
+
+def expiry_badge(expired_date, now=None):
+    status = expiry_status(expired_date, now)
+    if status == "expired":
+        return "<span style='color:#d32f2f; font-weight:bold; background:#ffebee; padding:2px 8px; border-radius:4px; border:1px solid #ffcdd2;'>🔴 Expired</span>"
+    elif status == "near":
+        return "<span style='color:#f57c00; font-weight:bold; background:#fff3e0; padding:2px 8px; border-radius:4px; border:1px solid #ffe0b2;'>🟡 Near Expired</span>"
+    else:
+        return "<span style='color:#2e7d32; font-weight:bold; background:#e8f5e9; padding:2px 8px; border-radius:4px; border:1px solid #c8e6c9;'>🟢 Fresh</span>"
+
+
+def dots(score):
+    # Visualisasi Dots
+    return "<span style='color:#795548; font-size:16px;'>" + "●" * score + "</span>" + "<span style='color:#e0e0e0; font-size:16px;'>" + "○" * (5 - score) + "</span>"
+
+
+def _esc(value):
+    """Teks data/katalog aman untuk disisipkan ke HTML (None/NaN -> kosong)."""
+    return "" if value is None or (not isinstance(value, str) and pd.isna(value)) else html.escape(str(value))
+
+
+def _score(value, default):
+    return default if value is None or pd.isna(value) else max(0, min(5, int(value)))
+
+
+def consumer_card_html(data, batch_id, qr_base64=None, qr_src=None, now=None, info=None):
+    """Kartu informasi produk untuk Consumer View (`data` = satu baris produksi).
+
+    `info` = detail varian dari katalog (harlur.varian.info_for), None jika
+    varian belum terdaftar. `qr_src` (URL/relatif) dipakai halaman statis
+    agar QR tidak di-inline.
+    """
+    info = info or {}
+    # Semua nilai data & katalog di-escape: PIC/gudang/deskripsi diisi bebas oleh pengguna
+    deskripsi = _esc(info.get("deskripsi") or DEFAULT_DESKRIPSI)
+    asal = _esc(info.get("asal_bahan") or DEFAULT_ASAL_BAHAN)
+    taste = {k: _score(info.get(k.lower()), v) for k, v in DEFAULT_TASTE.items()}
+    serving = _esc(info.get("serving") or DEFAULT_SERVING)
+
+    badge = expiry_badge(data["expired_date"], now)
+
+    # Pastikan string QR ini juga satu baris agar aman
+    if qr_base64:
+        qr_src = f"data:image/png;base64,{qr_base64}"
+    qr_html = f"<img src='{_esc(qr_src)}' width='150' style='display:block; margin: 10px auto; border-radius:8px;'>" if qr_src else "<i>QR Missing</i>"
+
+    taste_sweet = dots(taste["Sweetness"])
+    taste_aroma = dots(taste["Aroma"])
+    taste_body  = dots(taste["Body"])
+
+    # Semua tag HTML di bawah ini MENTOK KIRI (tidak ada spasi di awal baris)
+    return f"""
+<div style="padding: 24px; border-radius: 16px; border: 1px solid #e0e0e0; box-shadow: 0 4px 12px rgba(0,0,0,0.08); background: #ffffff; font-family: sans-serif; color: #333; max-width: 500px; margin: auto;">
+<div style="text-align:center; margin-bottom:15px; border-bottom: 2px dashed #eee; padding-bottom: 15px;">
+<h2 style="margin:0; color:#4e342e; font-size: 26px;">{_esc(data['varian_produksi'])}</h2>
+<p style="margin:10px 0 0 0; font-size:14px; color:#666;">BATCH: <b>{_esc(batch_id)}</b> &nbsp;|&nbsp; {badge}</p>
+</div>
+<div style="text-align:center; margin-bottom:20px;">
+{qr_html}
+</div>
+<div style="margin-bottom:15px;">
+<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🍹 Deskripsi</div>
+<div style="font-size:14px; line-height:1.5;">{deskripsi}</div>
+</div>
+<div style="margin-bottom:15px;">
+<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🌱 Asal Bahan</div>
+<div style="font-size:14px; line-height:1.5;">{asal}</div>
+</div>
+<div style="margin-bottom:15px; background:#f5f5f5; padding:15px; border-radius:10px;">
+<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:10px; text-align:center;">🎯 Taste Notes</div>
+<div style="display:flex; justify-content:space-between; font-size:13px; text-align:center;">
+<div>Sweetness<br>{taste_sweet}</div>
+<div>Aroma<br>{taste_aroma}</div>
+<div>Body<br>{taste_body}</div>
+</div>
+</div>
+<div style="margin-bottom:15px;">
+<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🏭 Detail Produksi</div>
+<ul style="font-size:14px; margin:0; padding-left:20px; color:#444;">
+<li><b>Tempat:</b> {_esc(data['tempat_produksi'])}</li>
+<li><b>PIC:</b> {_esc(data['pic'])}</li>
+<li><b>Gudang:</b> {_esc(data['lokasi_gudang'])}</li>
+<li><b>Saran Penyajian:</b> {serving}</li>
+</ul>
+</div>
+<div style="margin-top:20px; font-size:11px; color:#aaa; text-align:center; border-top:1px solid #eee; padding-top:10px;">
+✅ Terverifikasi oleh Harlur Coffee Traceability System
+</div>
+</div>
+"""
@@ -0,0 +1,232 @@
+# =========================================================
+# HARLUR COFFEE - LAPORAN PDF PER BATCH
+# =========================================================
+# Laporan satu batch (tab Lihat) dan ekspor massal untuk audit: PDF
+# seluruh batch dalam rentang tanggal produksi di-render paralel di process
+# pool lalu langsung ditulis ke ZIP (file atau BytesIO) tanpa file antara.
+# PDF disimpan di cache disk per (batch_id, updated_at), jadi batch yang
+# tidak berubah sejak ekspor sebelumnya tidak di-render ulang.
+#
+#   python -m harlur.report --db data_produksi.db --qr-dir qr_codes --dari 2025-11-01 --sampai 2025-11-30 --out audit_2025_11.zip
+
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from harlur.arsip import ARCHIVE_SCHEMA, ARCHIVE_TABLE, archived_qr
+from harlur.metrics import incr, timed
+from harlur.storage import write_atomic
+
+# Naikkan jika tata letak laporan berubah agar cache lama tidak dipakai
+REPORT_VERSION = 1
+# Di bawah jumlah ini render langsung; start process pool tidak sebanding
+POOL_MIN = 8
+
+
+@timed("report.render_pdf")
+def render_pdf(info, out, qr_path=None, logo_path=None, qr_png=None):
+    """Tulis laporan satu batch ke `out` (path atau file-like, mis. BytesIO).
+
+    QR dari file `qr_path` atau bytes PNG `qr_png` (batch arsip).
+    """
+    c = canvas.Canvas(str(out) if isinstance(out, Path) else out, pagesize=A4)
+    w, h = A4
+
+    if logo_path is not None and Path(logo_path).exists():
+        c.drawImage(ImageReader(str(logo_path)), 40, h-120, width=100, height=100)
+
+    c.setFont("Helvetica-Bold", 20)
+    c.drawString(150, h-60, "Harlur Coffee - Product Report")
+
+    y = h - 150
+    details = [
+        ("Batch ID", info["batch_id"]),
+        ("Tanggal Produksi", info["tanggal"]),
+        ("Varian", info["varian_produksi"]),
+        ("Tempat", info["tempat_produksi"]),
+        ("Gudang", info["lokasi_gudang"]),
+        ("Expired", info["expired_date"]),
+        ("PIC", info["pic"]),
+    ]
+
+    c.setFont("Helvetica", 12)
+    for label, val in details:
+        c.drawString(50, y, f"{label}: {val}")
+        y -= 22
+
+    if qr_png is not None:
+        c.drawImage(ImageReader(io.BytesIO(qr_png)), w-220, h-300, width=150, height=150)
+    elif qr_path is not None and Path(qr_path).exists():
+        c.drawImage(ImageReader(str(qr_path)), w-220, h-300, width=150, height=150)
+
+    c.showPage()
+    c.save()
+    return out
+
+
+def pdf_bytes(info, qr_path=None, logo_path=None, qr_png=None):
+    buf = io.BytesIO()
+    render_pdf(info, buf, qr_path, logo_path, qr_png)
+    return buf.getvalue()
+
+
+def _render_job(job):
+    # Dijalankan di proses worker: argumen & hasil harus bisa di-pickle
+    info, qr_path, qr_png, logo_path = job
+    return pdf_bytes(info, qr_path, logo_path, qr_png)
+
+
+# ===================== CACHE =====================
+class ReportCache:
+    """PDF per (batch_id, updated_at) di disk; versi lama batch yang sama dibuang saat diganti."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, batch_id, updated_at):
+        b = hashlib.sha1(str(batch_id).encode("utf-8")).hexdigest()[:20]
+        v = hashlib.sha1(f"{REPORT_VERSION}|{updated_at}".encode("utf-8")).hexdigest()[:12]
+        return self.root / b[:2] / f"{b}_{v}.pdf"
+
+    def get(self, batch_id, updated_at):
+        path = self._path(batch_id, updated_at)
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, batch_id, updated_at, data):
+        path = self._path(batch_id, updated_at)
+        write_atomic(path, data)
+        prefix = path.name.split("_")[0]
+        for old in path.parent.glob(f"{prefix}_*.pdf"):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+
+def cached_pdf(cache, info, qr_path=None, logo_path=None, qr_png=None):
+    """PDF satu batch lewat cache (dipakai ekspor satu batch di tab Lihat)."""
+    data = cache.get(info["batch_id"], info["updated_at"]) if cache is not None else None
+    if data is None:
+        data = pdf_bytes(info, qr_path, logo_path, qr_png)
+        if cache is not None:
+            cache.put(info["batch_id"], info["updated_at"], data)
+    return data
+
+
+# ===================== EKSPOR MASSAL =====================
+def select_batches(conn, dari, sampai, include_archived=True):
+    """Batch dengan tanggal produksi di [dari, sampai], termasuk arsip jika di-ATTACH."""
+    cols = ", ".join(row[1] for row in conn.execute("PRAGMA table_info(produksi)") if row[1] != "id")
+    sql = f"SELECT 'produksi' AS sumber, {cols} FROM produksi WHERE deleted_at IS NULL AND tanggal BETWEEN ? AND ?"
+    params = [str(dari), str(sampai)]
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if include_archived and ARCHIVE_SCHEMA in attached:
+        sql += (
+            f" UNION ALL SELECT 'arsip', {cols} FROM {ARCHIVE_TABLE} a WHERE tanggal BETWEEN ? AND ?"
+            f" AND NOT EXISTS (SELECT 1 FROM produksi p WHERE p.batch_id = a.batch_id AND p.deleted_at IS NULL)"
+        )
+        params += [str(dari), str(sampai)]
+    return pd.read_sql_query(sql + " ORDER BY tanggal, batch_id", conn, params=params)
+
+
+def _zip_name(batch_id):
+    return str(batch_id).replace("/", "_").replace("\\", "_") + ".pdf"
+
+
+def _plain(row):
+    return {k: (None if pd.isna(v) else v) for k, v in row.items()}
+
+
+@timed("report.export_zip")
+def export_zip(conn, rows, out, qr_path_for, logo_path=None, cache=None, workers=None, progress=None):
+    """Tulis PDF setiap baris `rows` (hasil select_batches) ke ZIP `out` (path/file-like).
+
+    PDF yang ada di cache langsung ditulis; sisanya di-render di process
+    pool dan masuk ZIP begitu selesai. `progress(selesai, total)` dipanggil
+    per PDF. Kembalikan ringkasan jumlah & waktu.
+    """
+    t = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    total, hits, jobs, keys = len(rows), 0, [], []
+    logo = str(logo_path) if logo_path is not None and Path(logo_path).exists() else None
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for _, row in rows.iterrows():
+            info = _plain(row)
+            data = cache.get(info["batch_id"], info["updated_at"]) if cache is not None else None
+            if data is not None:
+                zf.writestr(_zip_name(info["batch_id"]), data)
+                hits += 1
+                if progress:
+                    progress(hits, total)
+                continue
+            if info.pop("sumber", "produksi") == "arsip":
+                qr_path, qr_png = None, archived_qr(conn, info["batch_id"])
+            else:
+                path = qr_path_for(info["batch_id"])
+                qr_path, qr_png = (str(path) if path.exists() else None), None
+            jobs.append((info, qr_path, qr_png, logo))
+            keys.append((info["batch_id"], info["updated_at"]))
+
+        if len(jobs) < POOL_MIN or workers == 1:
+            results = map(_render_job, jobs)
+            pool = None
+        else:
+            # spawn: aman dipanggil dari proses ber-thread (Streamlit)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            results = pool.map(_render_job, jobs, chunksize=max(1, min(32, len(jobs) // (workers * 4))))
+        try:
+            for done, ((batch_id, updated_at), data) in enumerate(zip(keys, results), start=hits + 1):
+                zf.writestr(_zip_name(batch_id), data)
+                if cache is not None:
+                    cache.put(batch_id, updated_at, data)
+                if progress:
+                    progress(done, total)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    incr("report.cache_hit", hits)
+    incr("report.cache_miss", len(jobs))
+    return {"total": total, "cached": hits, "rendered": len(jobs), "seconds": time.perf_counter() - t}
+
+
+def main(argv=None):
+    from harlur.arsip import attach_archive
+    from harlur.db import connect, init_db
+    from harlur.storage import QRStore
+
+    ap = argparse.ArgumentParser(description="Ekspor laporan PDF banyak batch ke ZIP")
+    ap.add_argument("--db", required=True, help="Path data_produksi.db")
+    ap.add_argument("--qr-dir", required=True, help="Folder gambar QR")
+    ap.add_argument("--dari", required=True, help="Tanggal produksi awal (YYYY-MM-DD)")
+    ap.add_argument("--sampai", required=True, help="Tanggal produksi akhir (YYYY-MM-DD)")
+    ap.add_argument("--out", required=True, help="File ZIP tujuan")
+    ap.add_argument("--archive", help="Path arsip_produksi.db (batch arsip ikut diekspor)")
+    ap.add_argument("--cache", help="Folder cache PDF (default <folder db>/report_cache)")
+    ap.add_argument("--logo", default=str(Path(__file__).resolve().parents[1] / "logo_harlur.png"))
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    conn = connect(args.db)
+    init_db(conn)
+    if args.archive:
+        attach_archive(conn, args.archive)
+    rows = select_batches(conn, args.dari, args.sampai)
+    cache = ReportCache(args.cache or Path(args.db).resolve().parent / "report_cache")
+    stats = export_zip(conn, rows, args.out, QRStore(args.qr_dir).locate, args.logo, cache, args.workers)
+    print(f"{stats['total']} laporan ({stats['rendered']} di-render, {stats['cached']} dari cache) "
+          f"dalam {stats['seconds']:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
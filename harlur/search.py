@@ -0,0 +1,128 @@
+# =========================================================
+# HARLUR COFFEE - PENCARIAN BATCH (TYPE-AHEAD)
+# =========================================================
+# Indeks FTS5 (external content) atas batch_id, PIC, varian dan gudang
+# dijaga sinkron dengan `produksi` lewat trigger. Pencarian mengembalikan
+# top-k batch tanpa memuat seluruh daftar ID ke memori / browser.
+
+import re
+import sqlite3
+
+FTS_TABLE = "produksi_fts"
+FTS_COLUMNS = ["batch_id", "pic", "varian_produksi", "lokasi_gudang"]
+
+
+def _has_fts5(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_enabled(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def init_search(conn):
+    """Buat indeks FTS5 + trigger sinkronisasi; tanpa FTS5 pencarian jatuh ke LIKE."""
+    if fts_enabled(conn) or not _has_fts5(conn):
+        return
+
+    cols = ", ".join(FTS_COLUMNS)
+    new_vals = ", ".join(f"NEW.{c}" for c in FTS_COLUMNS)
+    old_vals = ", ".join(f"OLD.{c}" for c in FTS_COLUMNS)
+
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {cols},
+        content='produksi', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS produksi_fts_ai AFTER INSERT ON produksi BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {cols}) VALUES (NEW.id, {new_vals});
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS produksi_fts_ad AFTER DELETE ON produksi BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {cols}) VALUES ('delete', OLD.id, {old_vals});
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS produksi_fts_au AFTER UPDATE OF id, {cols} ON produksi BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {cols}) VALUES ('delete', OLD.id, {old_vals});
+        INSERT INTO {FTS_TABLE} (rowid, {cols}) VALUES (NEW.id, {new_vals});
+    END
+    """)
+    # Isi awal dari data yang sudah ada
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts_query(text):
+    # Setiap kata jadi prefix query: "hc 00" -> "hc"* AND "00"*
+    tokens = re.findall(r"\w+", text.lower())
+    return " AND ".join(f'"{t}"*' for t in tokens)
+
+
+def search_batches(conn, text, limit=20, include_deleted=False):
+    """Top-k batch_id yang cocok dengan `text`.
+
+    Urutan hasil: prefix batch_id (range scan pada index UNIQUE), lalu hasil
+    FTS dari yang terbaru. Urutan rowid dipakai alih-alih bm25 karena FTS5
+    bisa berhenti di k hasil pertama, sedangkan rank harus menilai semua
+    dokumen yang cocok. Query kosong mengembalikan batch terbaru.
+    """
+    active = "" if include_deleted else "AND deleted_at IS NULL"
+    active_p = "" if include_deleted else "AND p.deleted_at IS NULL"
+    text = (text or "").strip()
+    if not text:
+        rows = conn.execute(
+            f"SELECT batch_id FROM produksi p WHERE 1=1 {active_p} ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    prefix = text.upper()
+    results = [r[0] for r in conn.execute(
+        f"SELECT batch_id FROM produksi WHERE batch_id >= ? AND batch_id < ? {active} "
+        f"ORDER BY batch_id LIMIT ?",
+        (prefix, prefix + "\U0010ffff", limit)
+    )]
+    if len(results) >= limit:
+        return results
+
+    query = _fts_query(text)
+    if not query:
+        return results
+
+    if fts_enabled(conn):
+        rows = conn.execute(
+            f"""
+            SELECT p.batch_id FROM {FTS_TABLE} f JOIN produksi p ON p.id = f.rowid
+            WHERE {FTS_TABLE} MATCH ? {active_p}
+            ORDER BY f.rowid DESC LIMIT ?
+            """,
+            (query, limit * 2)
+        ).fetchall()
+    else:
+        like = f"%{text}%"
+        rows = conn.execute(
+            "SELECT batch_id FROM produksi WHERE ("
+            + " OR ".join(f"{c} LIKE ?" for c in FTS_COLUMNS)
+            + f") {active} ORDER BY id DESC LIMIT ?",
+            (*([like] * len(FTS_COLUMNS)), limit * 2)
+        ).fetchall()
+
+    seen = set(results)
+    for (batch_id,) in rows:
+        if batch_id not in seen:
+            results.append(batch_id)
+            seen.add(batch_id)
+        if len(results) >= limit:
+            break
+    return results
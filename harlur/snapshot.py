@@ -0,0 +1,322 @@
+# =========================================================
+# HARLUR COFFEE - SNAPSHOT DATABASE + QR & BOOTSTRAP COLD START
+# =========================================================
+# Satu snapshot = satu file ZIP:
+#
+#   manifest.json          -> waktu, jumlah batch, ukuran
+#   data_produksi.db       -> image ringkas hasil VACUUM INTO (deflate)
+#   arsip_produksi.db      -> idem, jika ada
+#   qr/<shard>/<id>.png    -> bundel QR (stored, PNG sudah terkompresi)
+#
+# Saat start, jika database belum ada, app memulihkan snapshot terbaru dari
+# folder lokal lalu dari remote (backend backup) sebelum melayani halaman:
+# cukup ekstrak file, tanpa replay CSV baris demi baris.
+#
+#   python -m harlur.snapshot create --data-dir ~/harlur_traceability
+#   python -m harlur.snapshot restore --data-dir /srv/harlur --snapshot snapshot_20251128_101500.zip
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from harlur.metrics import incr, timed
+from harlur.storage import ARCHIVE_NAME, DB_NAME, QR_DIR_NAME, make_temp_dir, open_temp, write_atomic
+from harlur.waktu import WIB
+
+ENV_SNAPSHOT_DIR = "HARLUR_SNAPSHOT_DIR"
+PREFIX = "snapshot_"
+SUFFIX = ".zip"
+KEEP_LOCAL = 5
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def snapshot_dir(data_dir):
+    path = Path(os.environ.get(ENV_SNAPSHOT_DIR) or Path(data_dir) / "snapshots")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def snapshot_name(now=None):
+    now = now or datetime.now(WIB)
+    return f"{PREFIX}{now.strftime('%Y%m%d_%H%M%S')}{SUFFIX}"
+
+
+def is_snapshot(name):
+    return name.startswith(PREFIX) and name.endswith(SUFFIX)
+
+
+def _db_image(src_path, dest_path):
+    """Image database ringkas & konsisten: VACUUM INTO, fallback ke online backup API."""
+    src = sqlite3.connect(src_path)
+    try:
+        try:
+            src.execute("VACUUM INTO ?", (str(dest_path),))
+        except sqlite3.OperationalError:
+            dst = sqlite3.connect(dest_path)
+            with dst:
+                src.backup(dst)
+            dst.close()
+    finally:
+        src.close()
+
+
+@timed("snapshot.create")
+def create_snapshot(data_dir, out_dir=None, now=None):
+    """Buat snapshot dari `data_dir`; kembalikan path file ZIP di `out_dir`."""
+    data_dir = Path(data_dir)
+    out_dir = Path(out_dir) if out_dir else snapshot_dir(data_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / snapshot_name(now)
+
+    with tempfile.TemporaryDirectory(dir=out_dir, prefix=".snap_") as work:
+        work = Path(work)
+        manifest = {"created_at": (now or datetime.now(WIB)).strftime("%Y-%m-%d %H:%M:%S"), "files": {}}
+        for name in (DB_NAME, ARCHIVE_NAME):
+            if (data_dir / name).exists():
+                _db_image(data_dir / name, work / name)
+                manifest["files"][name] = (work / name).stat().st_size
+        conn = sqlite3.connect(work / DB_NAME)
+        manifest["batches"] = conn.execute("SELECT COUNT(*) FROM produksi").fetchone()[0]
+        conn.close()
+
+        tmp = work / path.name
+        n_qr = 0
+        with zipfile.ZipFile(tmp, "w") as zf:
+            for name in manifest["files"]:
+                zf.write(work / name, name, compress_type=zipfile.ZIP_DEFLATED)
+            qr_root = data_dir / QR_DIR_NAME
+            if qr_root.exists():
+                for png in qr_root.rglob("*.png"):
+                    zf.write(png, f"qr/{png.relative_to(qr_root).as_posix()}", compress_type=zipfile.ZIP_STORED)
+                    n_qr += 1
+            manifest["qr_files"] = n_qr
+            zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        os.replace(tmp, path)
+
+    prune_local(out_dir)
+    return path
+
+
+def prune_local(out_dir, keep=KEEP_LOCAL):
+    for old in list_local(out_dir)[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def list_local(out_dir):
+    """Snapshot lokal, terbaru dulu (nama mengandung timestamp)."""
+    out_dir = Path(out_dir)
+    if not out_dir.exists():
+        return []
+    return sorted((p for p in out_dir.iterdir() if is_snapshot(p.name)), reverse=True)
+
+
+def read_manifest(path):
+    with zipfile.ZipFile(path) as zf:
+        return json.loads(zf.read("manifest.json"))
+
+
+def _move_files(src, dest, since=None):
+    """Pindahkan file di bawah `src` ke posisi yang sama di `dest` (menimpa); opsional hanya mtime >= since."""
+    for path in list(src.rglob("*")):
+        if path.is_file() and (since is None or path.stat().st_mtime >= since):
+            target = dest / path.relative_to(src)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+
+
+def _swap_in(tmp, qr_root, attempts=5):
+    """os.replace(tmp, qr_root) yang tahan terhadap qr_root dibuat ulang oleh app.
+
+    Di antara memindahkan folder lama dan menukar folder baru, QRStore /
+    write_atomic bisa membuat qr_root lagi dan menulis QR batch baru ke sana;
+    replace lalu gagal (ENOTEMPTY). File tersebut dipindahkan ke `tmp`,
+    folder yang sudah kosong dihapus, lalu penukaran diulang.
+    """
+    for _ in range(attempts):
+        try:
+            os.replace(tmp, qr_root)
+            return
+        except OSError:
+            if not qr_root.is_dir():
+                raise
+        _move_files(qr_root, tmp)
+        for folder in sorted((p for p in qr_root.rglob("*") if p.is_dir()), key=lambda p: len(p.parts),
+                             reverse=True) + [qr_root]:
+            try:
+                folder.rmdir()
+            except OSError:
+                pass  # ada file baru lagi; ditangani percobaan berikutnya
+    os.replace(tmp, qr_root)
+
+
+def _extract_qr(zf_path, qr_root):
+    """Ganti folder QR dengan isi snapshot: ekstrak ke folder sementara lalu tukar.
+
+    QR batch yang tidak ada di snapshot ikut hilang, sama seperti database.
+    File yang ditulis app selama ekstraksi (mtime setelah restore mulai)
+    dipindahkan ke folder baru agar batch yang baru ditambah tidak hilang.
+    """
+    mulai = time.time()
+    tmp = make_temp_dir(qr_root.parent, prefix=".qr_restore_")
+    try:
+        with zipfile.ZipFile(zf_path) as zf:
+            for info in zf.infolist():
+                if info.filename.startswith("qr/") and not info.is_dir():
+                    target = tmp / info.filename[len("qr/"):]
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with zf.open(info) as src, open(target, "wb") as out:
+                        shutil.copyfileobj(src, out)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    old = None
+    if qr_root.exists():
+        old = make_temp_dir(qr_root.parent, prefix=".qr_old_") / QR_DIR_NAME
+        os.replace(qr_root, old)
+    _swap_in(tmp, qr_root)
+    if old is not None:
+        _move_files(old, qr_root, since=mulai)
+        shutil.rmtree(old.parent, ignore_errors=True)
+
+
+class QRRestoreThread(threading.Thread):
+    """Thread ekstraksi QR di background; kegagalan disimpan di `error` (lihat qr_restore_error)."""
+
+    def __init__(self, zf_path, qr_root):
+        super().__init__(target=_extract_qr, args=(zf_path, qr_root), daemon=True, name="harlur-snapshot-qr")
+        self.error = None
+
+    def run(self):
+        try:
+            super().run()
+        except BaseException as e:
+            self.error = e
+            incr("snapshot.qr_restore_failed")
+            raise
+
+
+_qr_thread = None
+
+
+def qr_restore_error():
+    """Exception dari ekstraksi QR background terakhir (None jika belum/sedang jalan atau sukses)."""
+    return _qr_thread.error if _qr_thread is not None else None
+
+
+@timed("snapshot.restore")
+def restore_snapshot(path, data_dir, background_qr=False):
+    """Pulihkan database (+ arsip) lalu bundel QR dari snapshot ZIP.
+
+    Database ditulis ke file sementara lalu os.replace, jadi koneksi lain
+    tidak pernah melihat file setengah jadi; folder QR ditukar utuh dengan
+    isi snapshot (lihat _extract_qr). Dengan `background_qr=True`
+    ekstraksi QR berjalan di thread terpisah (QRRestoreThread, dikembalikan)
+    agar app bisa langsung melayani; QR yang belum ada tampil sebagai
+    "QR Missing" dan kegagalannya bisa dicek lewat qr_restore_error().
+    """
+    global _qr_thread
+    path, data_dir = Path(path), Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path) as zf:
+        names = set(zf.namelist())
+        if DB_NAME not in names:
+            raise ValueError(f"{path.name} bukan snapshot Harlur (tidak ada {DB_NAME}).")
+        for name in (DB_NAME, ARCHIVE_NAME):
+            if name not in names:
+                continue
+            # open_temp, bukan mkstemp: database hasil restore bermode biasa, bukan 0600
+            fd, tmp = open_temp(data_dir, prefix=".restore_")
+            try:
+                with os.fdopen(fd, "wb") as out, zf.open(name) as src:
+                    shutil.copyfileobj(src, out, 1 << 20)
+                with open(tmp, "rb") as f:
+                    if f.read(len(SQLITE_HEADER)) != SQLITE_HEADER:
+                        raise ValueError(f"{name} di {path.name} bukan database SQLite.")
+                os.replace(tmp, data_dir / name)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+    qr_root = data_dir / QR_DIR_NAME
+    if background_qr:
+        _qr_thread = QRRestoreThread(path, qr_root)
+        _qr_thread.start()
+        return _qr_thread
+    _extract_qr(path, qr_root)
+    return None
+
+
+# ===================== REMOTE =====================
+def upload_snapshot(path, backend):
+    backend.put(Path(path).name, Path(path).read_bytes(), msg=f"Snapshot {Path(path).name}")
+
+
+def latest_remote(backend):
+    names = sorted((n for n in backend.list() if is_snapshot(n)), reverse=True)
+    return names[0] if names else None
+
+
+def bootstrap(data_dir, remote=None, background_qr=True):
+    """Dipanggil saat start jika database belum ada: snapshot lokal terbaru, lalu remote.
+
+    Kembalikan (sumber, nama_snapshot, detik) atau None jika tidak ada snapshot.
+    Kegagalan remote (jaringan/token) tidak menggagalkan start: app mulai kosong.
+    """
+    t = time.perf_counter()
+    data_dir = Path(data_dir)
+    local = list_local(snapshot_dir(data_dir))
+    if local:
+        restore_snapshot(local[0], data_dir, background_qr)
+        return "lokal", local[0].name, time.perf_counter() - t
+
+    if remote is None:
+        return None
+    try:
+        name = latest_remote(remote)
+        content = remote.get(name) if name else None
+    except Exception:
+        return None
+    if content is None:
+        return None
+    path = snapshot_dir(data_dir) / name
+    write_atomic(path, content)
+    restore_snapshot(path, data_dir, background_qr)
+    return "remote", name, time.perf_counter() - t
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Snapshot database + QR Harlur")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("create", help="Buat snapshot dari data dir")
+    c.add_argument("--data-dir", required=True)
+    c.add_argument("--out", help="Folder snapshot (default <data-dir>/snapshots)")
+    r = sub.add_parser("restore", help="Pulihkan snapshot ke data dir")
+    r.add_argument("--data-dir", required=True)
+    r.add_argument("--snapshot", help="File snapshot (default: terbaru di folder snapshot)")
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    if args.cmd == "create":
+        path = create_snapshot(args.data_dir, args.out)
+        m = read_manifest(path)
+        print(f"{path} ({path.stat().st_size / 1e6:.1f} MB, {m['batches']} batch, "
+              f"{m['qr_files']} QR) dalam {time.perf_counter() - t:.1f} s")
+    else:
+        path = args.snapshot or next(iter(list_local(snapshot_dir(args.data_dir))), None)
+        if path is None:
+            raise SystemExit("Tidak ada snapshot.")
+        restore_snapshot(path, args.data_dir)
+        print(f"{path} dipulihkan ke {args.data_dir} dalam {time.perf_counter() - t:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
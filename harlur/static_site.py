@@ -0,0 +1,238 @@
+# =========================================================
+# HARLUR COFFEE - EKSPOR HALAMAN CONSUMER STATIS
+# =========================================================
+# Pre-render kartu Consumer View setiap batch ke folder statis agar lonjakan
+# scan (launching, promo) dilayani web server statis apa pun tanpa membuka
+# sesi Streamlit:
+#
+#   out/index.html          -> redirect ?B=<token> / ?batch_id=<id> ke halaman batch
+#   out/b/<token>.html      -> kartu consumer (token = harlur.qr.batch_token)
+#   out/qr/<token>.png      -> gambar QR (mode "link"; mode "inline" = base64 di HTML)
+#   out/manifest.json       -> updated_at + status kedaluwarsa per batch saat build
+#
+# Isi kartu hanya berubah saat batch diedit atau status kedaluwarsanya
+# bergeser (Fresh -> Near Expired -> Expired), jadi build berikutnya hanya
+# me-render ulang batch yang berubah sejak manifest terakhir.
+#
+#   python -m harlur.static_site --db data_produksi.db --qr-dir qr_codes --out site/
+
+import argparse
+import base64
+import html
+import json
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from harlur.arsip import ARCHIVE_SCHEMA, ARCHIVE_TABLE, archived_qr
+from harlur.metrics import timed
+from harlur.qr import batch_token
+from harlur.render import consumer_card_html, expiry_status_series
+from harlur.storage import write_atomic
+from harlur.varian import catalog
+from harlur.waktu import WIB
+
+MANIFEST = "manifest.json"
+# Naikkan jika tampilan kartu/halaman berubah agar build berikutnya render ulang semua
+TEMPLATE_VERSION = 2
+CHUNK = 500
+
+PAGE = """<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+</head>
+<body style="margin:0; padding:16px; background:#fafafa;">
+{card}
+</body>
+</html>
+"""
+
+# Mengikuti harlur.qr.batch_token untuk ID terstruktur & ID alfanumerik;
+# ID lain (token base32) hanya bisa dibuka lewat ?B= dari QR baru.
+INDEX = """<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Harlur Coffee Traceability</title>
+<script>
+(function () {
+  var q = new URLSearchParams(location.search);
+  var t = q.get("B") || q.get("b");
+  var id = q.get("batch_id");
+  if (!t && id) {
+    var m = /^([A-Z0-9]{1,3})-([A-Z0-9]{1,3})-(\\d{6})-(\\d{4,})$/.exec(id);
+    t = m ? String((m[1].length - 1) * 3 + m[2].length - 1) + m[1] + m[2] + m[3] + m[4] : id;
+  }
+  if (t) location.replace("b/" + encodeURIComponent(t.toUpperCase()) + ".html");
+})();
+</script>
+</head>
+<body style="font-family:sans-serif; text-align:center; padding:40px;">
+<h2>Harlur Coffee Traceability</h2>
+<p>Scan QR pada kemasan untuk melihat informasi produk.</p>
+</body>
+</html>
+"""
+
+
+def load_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST
+    if not path.exists():
+        return {"template_version": None, "qr_mode": None, "catalog_version": None, "batches": {}}
+    return json.loads(path.read_text())
+
+
+def _sources(conn, include_archived):
+    sources = [("produksi", "produksi", "deleted_at IS NULL")]
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if include_archived and ARCHIVE_SCHEMA in attached:
+        sources.append(("arsip", ARCHIVE_TABLE, "1"))
+    return sources
+
+
+def _fetch_rows(conn, table, batch_ids):
+    """Baris lengkap untuk batch yang perlu di-render ulang, per potongan IN (...)."""
+    cols = ", ".join(row[1] for row in conn.execute("PRAGMA table_info(produksi)"))
+    for i in range(0, len(batch_ids), CHUNK):
+        part = batch_ids[i:i + CHUNK]
+        marks = ", ".join("?" * len(part))
+        yield from pd.read_sql_query(
+            f"SELECT {cols} FROM {table} WHERE batch_id IN ({marks})", conn, params=part
+        ).iterrows()
+
+
+def page_html(row, batch_id, qr_base64=None, qr_src=None, now=None, info=None):
+    card = consumer_card_html(row, batch_id, qr_base64=qr_base64, qr_src=qr_src, now=now, info=info)
+    title = html.escape(f"{row['varian_produksi']} — {batch_id} | Harlur Coffee")
+    return PAGE.format(title=title, card=card)
+
+
+@timed("static_site.build")
+def build_site(conn, out_dir, qr_path_for, qr_mode="link", full=False, include_archived=True, now=None):
+    """Build (inkremental) halaman statis; kembalikan ringkasan jumlah halaman.
+
+    Batch di-render ulang jika: baru, `updated_at` berubah, status
+    kedaluwarsa bergeser, file halaman hilang, atau `full`/versi template/
+    mode QR/versi katalog varian berbeda dari build sebelumnya.
+    """
+    if qr_mode not in ("link", "inline"):
+        raise ValueError("qr_mode harus 'link' atau 'inline'")
+    t = time.perf_counter()
+    out_dir = Path(out_dir)
+    now = now or datetime.now(WIB).replace(tzinfo=None)
+
+    kat = catalog(conn)
+    old = load_manifest(out_dir)
+    full = (full or old["template_version"] != TEMPLATE_VERSION or old["qr_mode"] != qr_mode
+            or old.get("catalog_version") != kat.versi)
+    old_batches = {} if full else old["batches"]
+
+    # Tahap 1: kolom ringan saja untuk menentukan batch yang berubah
+    batches = {}
+    todo = []
+    for source, table, where in _sources(conn, include_archived):
+        light = pd.read_sql_query(
+            f"SELECT batch_id, updated_at, expired_date FROM {table} WHERE {where}", conn
+        )
+        light["status"] = expiry_status_series(light["expired_date"], now)
+        stale = []
+        for batch_id, updated_at, status in zip(light["batch_id"], light["updated_at"], light["status"]):
+            if batch_id in batches:
+                continue  # sama seperti Consumer View: data aktif menang atas arsip
+            token = batch_token(batch_id)
+            entry = {
+                "token": token,
+                "updated_at": updated_at if pd.notna(updated_at) else None,
+                "status": status,
+                "source": source,
+            }
+            batches[batch_id] = entry
+            if old_batches.get(batch_id) != entry or not (out_dir / "b" / f"{token}.html").exists():
+                stale.append(batch_id)
+        todo.append((source, table, stale))
+
+    # Tahap 2: render ulang hanya batch yang berubah
+    rendered = 0
+    for source, table, stale in todo:
+        for _, row in _fetch_rows(conn, table, stale):
+            batch_id = row["batch_id"]
+            token = batches[batch_id]["token"]
+
+            qr_bytes = None
+            if source == "arsip":
+                qr_bytes = archived_qr(conn, batch_id)
+            else:
+                path = qr_path_for(batch_id)
+                if path.exists():
+                    qr_bytes = path.read_bytes()
+
+            qr_base64 = qr_src = None
+            if qr_bytes is not None and qr_mode == "inline":
+                qr_base64 = base64.b64encode(qr_bytes).decode()
+            elif qr_bytes is not None:
+                write_atomic(out_dir / "qr" / f"{token}.png", qr_bytes)
+                qr_src = f"../qr/{token}.png"
+
+            info = kat.get(row.get("variant_id"), row["varian_produksi"])
+            write_atomic(out_dir / "b" / f"{token}.html", page_html(row, batch_id, qr_base64, qr_src, now, info))
+            rendered += 1
+
+    # Batch yang dihapus/di-soft-delete sejak build terakhir -> hapus halamannya
+    removed = 0
+    for batch_id, entry in old["batches"].items():
+        if batch_id not in batches:
+            for path in (out_dir / "b" / f"{entry['token']}.html", out_dir / "qr" / f"{entry['token']}.png"):
+                path.unlink(missing_ok=True)
+            removed += 1
+    if full and qr_mode == "inline" and (out_dir / "qr").exists():
+        shutil.rmtree(out_dir / "qr")
+
+    write_atomic(out_dir / "index.html", INDEX)
+    write_atomic(out_dir / MANIFEST, json.dumps({
+        "template_version": TEMPLATE_VERSION,
+        "qr_mode": qr_mode,
+        "catalog_version": kat.versi,
+        "built_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "batches": batches,
+    }))
+    return {
+        "total": len(batches),
+        "rendered": rendered,
+        "unchanged": len(batches) - rendered,
+        "removed": removed,
+        "seconds": time.perf_counter() - t,
+    }
+
+
+def main(argv=None):
+    from harlur.arsip import attach_archive
+    from harlur.db import connect, init_db
+    from harlur.storage import QRStore
+
+    ap = argparse.ArgumentParser(description="Ekspor halaman Consumer View statis")
+    ap.add_argument("--db", required=True, help="Path data_produksi.db")
+    ap.add_argument("--qr-dir", required=True, help="Folder gambar QR")
+    ap.add_argument("--out", required=True, help="Folder tujuan situs statis")
+    ap.add_argument("--archive", help="Path arsip_produksi.db (batch arsip ikut diekspor)")
+    ap.add_argument("--inline", action="store_true", help="QR di-inline base64 di tiap halaman")
+    ap.add_argument("--full", action="store_true", help="Render ulang semua batch")
+    args = ap.parse_args(argv)
+
+    conn = connect(args.db)
+    init_db(conn)
+    if args.archive:
+        attach_archive(conn, args.archive)
+    stats = build_site(conn, args.out, QRStore(args.qr_dir).locate, "inline" if args.inline else "link", args.full)
+    print(f"{stats['rendered']} halaman di-render, {stats['unchanged']} tetap, "
+          f"{stats['removed']} dihapus ({stats['total']} batch, {stats['seconds']:.1f} s) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# =========================================================
+# HARLUR COFFEE - BUKU MUTASI STOK GUDANG
+# =========================================================
+# Barang masuk, pindah gudang, dan keluar dicatat per scan QR di buku mutasi
+# `stok_mutasi` (hanya ditambah, tidak pernah diubah). Dua tabel ringkasan
+# dijaga trigger SQLite di transaksi yang sama dengan INSERT mutasinya, jadi
+# stok tidak perlu dijumlah ulang dari seluruh buku:
+#
+#   stok_batch  (batch_id, gudang) -> jumlah   : stok per batch, untuk FEFO
+#   stok_level  (gudang, variant_id) -> jumlah : stok per gudang & varian
+#
+# Stok keluar/pindah yang melebihi stok gudang asal ditolak oleh trigger
+# (aman walau beberapa stasiun scan bersamaan). variant_id 0 = teks varian
+# yang belum dikenali katalog; jika varian batch berubah (edit, bulk,
+# pemetaan alias), stoknya ikut dipindah ke varian baru.
+#
+#   record_movement(conn, "ARC-0001", "masuk", "Jatinangor", jumlah=24)
+#   record_movement(conn, "ARC-0001", "pindah", "Jatinangor", ke="Cikarang", jumlah=6)
+#   fefo(conn, "Cikarang", variant_id=2)   # ambil yang paling cepat kedaluwarsa dulu
+#
+# produksi.lokasi_gudang tetap label gudang saat produksi; posisi stok
+# sebenarnya ada di buku mutasi ini.
+
+import sqlite3
+
+import pandas as pd
+
+from harlur.metrics import timed
+from harlur.waktu import now_wib
+
+JENIS = ("masuk", "pindah", "keluar")
+UNKNOWN_VARIANT = "(belum dikenali)"
+_STOK_KURANG = "Stok tidak cukup"
+
+
+def init_stok(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS stok_mutasi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT NOT NULL,
+        batch_id TEXT NOT NULL,
+        jenis TEXT NOT NULL CHECK (jenis IN ('masuk', 'pindah', 'keluar')),
+        dari TEXT,
+        ke TEXT,
+        jumlah INTEGER NOT NULL CHECK (jumlah > 0),
+        catatan TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stok_mutasi_batch ON stok_mutasi (batch_id, id)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS stok_batch (
+        batch_id TEXT NOT NULL,
+        gudang TEXT NOT NULL,
+        variant_id INTEGER NOT NULL DEFAULT 0,
+        jumlah INTEGER NOT NULL,
+        PRIMARY KEY (batch_id, gudang)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stok_batch_gudang ON stok_batch (gudang, variant_id)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS stok_level (
+        gudang TEXT NOT NULL,
+        variant_id INTEGER NOT NULL,
+        jumlah INTEGER NOT NULL,
+        PRIMARY KEY (gudang, variant_id)
+    ) WITHOUT ROWID
+    """)
+
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS stok_mutasi_cek BEFORE INSERT ON stok_mutasi
+    WHEN NEW.dari IS NOT NULL
+    BEGIN
+        SELECT RAISE(ABORT, '{_STOK_KURANG}')
+        WHERE COALESCE((SELECT jumlah FROM stok_batch
+                        WHERE batch_id = NEW.batch_id AND gudang = NEW.dari), 0) < NEW.jumlah;
+    END
+    """)
+    # Kurangi gudang asal (jika ada), lalu tambah gudang tujuan (jika ada)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS stok_mutasi_ai AFTER INSERT ON stok_mutasi
+    BEGIN
+        UPDATE stok_level SET jumlah = jumlah - NEW.jumlah
+        WHERE gudang = NEW.dari AND variant_id = (
+            SELECT variant_id FROM stok_batch WHERE batch_id = NEW.batch_id AND gudang = NEW.dari);
+        UPDATE stok_batch SET jumlah = jumlah - NEW.jumlah
+        WHERE batch_id = NEW.batch_id AND gudang = NEW.dari;
+        DELETE FROM stok_batch WHERE batch_id = NEW.batch_id AND gudang = NEW.dari AND jumlah = 0;
+        DELETE FROM stok_level WHERE gudang = NEW.dari AND jumlah = 0;
+
+        INSERT INTO stok_batch (batch_id, gudang, variant_id, jumlah)
+        SELECT NEW.batch_id, NEW.ke,
+               COALESCE((SELECT variant_id FROM produksi WHERE batch_id = NEW.batch_id), 0), NEW.jumlah
+        WHERE NEW.ke IS NOT NULL
+        ON CONFLICT (batch_id, gudang) DO UPDATE SET jumlah = jumlah + excluded.jumlah;
+        INSERT INTO stok_level (gudang, variant_id, jumlah)
+        SELECT gudang, variant_id, NEW.jumlah FROM stok_batch
+        WHERE batch_id = NEW.batch_id AND gudang = NEW.ke
+        ON CONFLICT (gudang, variant_id) DO UPDATE SET jumlah = jumlah + excluded.jumlah;
+    END
+    """)
+    # Varian batch berubah: pindahkan stoknya dari varian lama ke varian baru
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS produksi_stok_varian AFTER UPDATE OF variant_id ON produksi
+    WHEN COALESCE(OLD.variant_id, 0) != COALESCE(NEW.variant_id, 0)
+    BEGIN
+        UPDATE stok_level SET jumlah = jumlah - (
+            SELECT s.jumlah FROM stok_batch s WHERE s.batch_id = NEW.batch_id AND s.gudang = stok_level.gudang)
+        WHERE variant_id = COALESCE(OLD.variant_id, 0)
+          AND gudang IN (SELECT gudang FROM stok_batch WHERE batch_id = NEW.batch_id);
+        DELETE FROM stok_level WHERE variant_id = COALESCE(OLD.variant_id, 0) AND jumlah = 0;
+        UPDATE stok_batch SET variant_id = COALESCE(NEW.variant_id, 0) WHERE batch_id = NEW.batch_id;
+        INSERT INTO stok_level (gudang, variant_id, jumlah)
+        SELECT gudang, variant_id, jumlah FROM stok_batch WHERE batch_id = NEW.batch_id
+        ON CONFLICT (gudang, variant_id) DO UPDATE SET jumlah = jumlah + excluded.jumlah;
+    END
+    """)
+
+
+# ===================== MUTASI =====================
+@timed("stok.record")
+def record_movement(conn, batch_id, jenis, gudang, ke=None, jumlah=1, catatan=None):
+    """Catat satu mutasi; kembalikan id mutasi.
+
+    `gudang` = gudang tujuan untuk "masuk", gudang asal untuk "pindah" dan
+    "keluar"; `ke` = gudang tujuan "pindah". ValueError jika batch tidak
+    aktif, input tidak lengkap, atau stok gudang asal tidak cukup.
+    """
+    if jenis not in JENIS:
+        raise ValueError(f"Jenis mutasi harus salah satu dari: {', '.join(JENIS)}.")
+    gudang, ke = str(gudang or "").strip(), str(ke or "").strip()
+    if not gudang:
+        raise ValueError("Gudang wajib diisi.")
+    if jenis == "pindah" and (not ke or ke == gudang):
+        raise ValueError("Gudang tujuan wajib diisi dan berbeda dari gudang asal.")
+    jumlah = int(jumlah)
+    if jumlah <= 0:
+        raise ValueError("Jumlah harus lebih dari 0.")
+
+    dari, ke = {"masuk": (None, gudang), "pindah": (gudang, ke), "keluar": (gudang, None)}[jenis]
+    try:
+        with conn:
+            aktif = conn.execute(
+                "SELECT 1 FROM produksi WHERE batch_id = ? AND deleted_at IS NULL", (batch_id,)
+            ).fetchone()
+            if not aktif:
+                raise ValueError(f"Batch {batch_id} tidak ada di data aktif.")
+            cur = conn.execute(
+                "INSERT INTO stok_mutasi (waktu, batch_id, jenis, dari, ke, jumlah, catatan) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (now_wib(), batch_id, jenis, dari, ke, jumlah, catatan or None)
+            )
+    except sqlite3.IntegrityError as e:
+        if _STOK_KURANG not in str(e):
+            raise
+        sisa = batch_stock(conn, batch_id)
+        ada = int(sisa.loc[sisa["gudang"] == dari, "jumlah"].sum())
+        raise ValueError(f"{_STOK_KURANG}: stok {batch_id} di {dari} hanya {ada}.") from None
+    return cur.lastrowid
+
+
+def movements(conn, batch_id=None, limit=200):
+    """Mutasi terbaru (semua batch atau satu batch)."""
+    where, params = ("WHERE batch_id = ?", [batch_id]) if batch_id else ("", [])
+    return pd.read_sql_query(
+        f"SELECT id, waktu, batch_id, jenis, dari, ke, jumlah, catatan FROM stok_mutasi {where} "
+        f"ORDER BY id DESC LIMIT ?", conn, params=params + [limit]
+    )
+
+
+def rebuild_stock(conn):
+    """Hitung ulang stok_batch & stok_level dari seluruh buku mutasi (mis. setelah restore CSV).
+
+    Batch yang sudah tidak ada di tabel produksi masuk ke variant_id 0.
+    """
+    with conn:
+        conn.execute("DELETE FROM stok_batch")
+        conn.execute("DELETE FROM stok_level")
+        conn.execute("""
+            INSERT INTO stok_batch (batch_id, gudang, variant_id, jumlah)
+            SELECT m.batch_id, m.gudang, COALESCE(p.variant_id, 0), SUM(m.delta)
+            FROM (SELECT batch_id, ke AS gudang, jumlah AS delta FROM stok_mutasi WHERE ke IS NOT NULL
+                  UNION ALL
+                  SELECT batch_id, dari, -jumlah FROM stok_mutasi WHERE dari IS NOT NULL) m
+            LEFT JOIN produksi p ON p.batch_id = m.batch_id
+            GROUP BY m.batch_id, m.gudang
+            HAVING SUM(m.delta) != 0
+        """)
+        conn.execute("""
+            INSERT INTO stok_level (gudang, variant_id, jumlah)
+            SELECT gudang, variant_id, SUM(jumlah) FROM stok_batch GROUP BY gudang, variant_id
+        """)
+
+
+# ===================== STOK =====================
+def stock_level(conn, gudang, variant_id):
+    """Stok satu gudang & varian (lookup primary key)."""
+    row = conn.execute(
+        "SELECT jumlah FROM stok_level WHERE gudang = ? AND variant_id = ?", (gudang, variant_id or 0)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def stock_levels(conn):
+    """Stok per gudang & varian: kolom gudang, variant_id, varian, jumlah."""
+    return pd.read_sql_query(f"""
+        SELECT s.gudang, s.variant_id, COALESCE(v.nama, '{UNKNOWN_VARIANT}') AS varian, s.jumlah
+        FROM stok_level s LEFT JOIN varian v ON v.id = s.variant_id
+        ORDER BY s.gudang, varian
+    """, conn)
+
+
+def batch_stock(conn, batch_id):
+    """Stok satu batch per gudang."""
+    return pd.read_sql_query(
+        "SELECT gudang, jumlah FROM stok_batch WHERE batch_id = ? ORDER BY gudang", conn, params=(batch_id,)
+    )
+
+
+def gudang_list(conn):
+    """Gudang yang dikenal: yang pernah menerima stok + lokasi_gudang di data produksi."""
+    return [row[0] for row in conn.execute("""
+        SELECT gudang FROM stok_level
+        UNION
+        SELECT lokasi_gudang FROM produksi WHERE lokasi_gudang IS NOT NULL AND TRIM(lokasi_gudang) != ''
+        ORDER BY 1
+    """)]
+
+
+@timed("stok.fefo")
+def fefo(conn, gudang, variant_id=None, limit=20, today=None):
+    """Saran ambil FEFO: batch yang ada stoknya di `gudang`, kedaluwarsa paling awal dulu.
+
+    Batch yang sudah kedaluwarsa (expired_date <= hari ini) tidak disarankan;
+    lihat expired_stock. Urutan dibaca langsung dari idx_produksi_expired
+    sehingga berhenti setelah `limit` batch ditemukan.
+    """
+    today = today or now_wib()[:10]
+    clauses, params = ["p.expired_date > ?", "p.deleted_at IS NULL"], [gudang, str(today)]
+    if variant_id is not None:
+        clauses.append("s.variant_id = ?")
+        params.append(variant_id)
+    return pd.read_sql_query(f"""
+        SELECT p.batch_id, p.varian_produksi, p.tanggal, p.expired_date,
+               CAST(julianday(p.expired_date) - julianday(?) AS INTEGER) AS sisa_hari, s.jumlah
+        FROM produksi p INDEXED BY idx_produksi_expired
+        JOIN stok_batch s ON s.batch_id = p.batch_id AND s.gudang = ?
+        WHERE {' AND '.join(clauses)}
+        ORDER BY p.expired_date
+        LIMIT ?
+    """, conn, params=[str(today)] + params + [limit])
+
+
+def expired_stock(conn, gudang, today=None):
+    """Batch kedaluwarsa yang masih tercatat ada di `gudang` (perlu dikeluarkan)."""
+    today = today or now_wib()[:10]
+    return pd.read_sql_query("""
+        SELECT p.batch_id, p.varian_produksi, p.expired_date, s.jumlah
+        FROM stok_batch s JOIN produksi p ON p.batch_id = s.batch_id
+        WHERE s.gudang = ? AND p.expired_date != '' AND p.expired_date <= ?
+        ORDER BY p.expired_date
+    """, conn, params=(gudang, str(today)))
@@ -0,0 +1,215 @@
+# =========================================================
+# HARLUR COFFEE - LOKASI DATA PERSISTEN & PENYIMPANAN QR
+# =========================================================
+# Root data dibaca dari env HARLUR_DATA_DIR (mis. volume yang di-mount),
+# default ~/harlur_traceability, bukan lagi folder temp yang hilang setiap
+# container restart. Struktur:
+#
+#   <root>/data_produksi.db
+#   <root>/arsip_produksi.db
+#   <root>/qr_codes/ab/<batch_id>.png    (ab = 2 hex awal sha1 batch_id)
+#
+# 256 shard membagi rata file (500 ribu batch ~ 2 ribu file per folder)
+# tanpa ribuan folder nyaris kosong yang masing-masing memakan satu blok
+# disk seperti pada shard 2 level. File QR lama yang masih datar di qr_codes/ tetap
+# terbaca (fallback) dan bisa dipindahkan dengan:
+#
+#   python -m harlur.storage --qr-dir <root>/qr_codes --migrate-flat
+
+import argparse
+import hashlib
+import io
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from harlur.metrics import timed
+
+ENV_DATA_DIR = "HARLUR_DATA_DIR"
+DEFAULT_DATA_DIR = Path.home() / "harlur_traceability"
+# Lokasi lama (sebelum root persisten) untuk migrasi otomatis
+LEGACY_DATA_DIR = Path(tempfile.gettempdir()) / "harlur_traceability" / "app_data"
+
+DB_NAME = "data_produksi.db"
+ARCHIVE_NAME = "arsip_produksi.db"
+QR_DIR_NAME = "qr_codes"
+# Warna palet untuk QR berlogo; QR tanpa logo disimpan 1-bit
+PALETTE_COLORS = 16
+SHARD_CHARS = 2
+SAFE_NAME = re.compile(r"[A-Za-z0-9._-]+")
+
+
+
+def data_root(override=None):
+    root = Path(override or os.environ.get(ENV_DATA_DIR) or DEFAULT_DATA_DIR).expanduser()
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def _temp_name(folder, prefix):
+    return Path(folder) / f"{prefix}{secrets.token_hex(8)}"
+
+
+def open_temp(folder, prefix=".tmp_"):
+    """Buat file sementara baru di `folder` (untuk ditulis lalu os.replace); kembalikan (fd, path).
+
+    Beda dengan mkstemp (selalu 0600): file dibuat dengan mode 0666 dan
+    kernel yang menerapkan umask proses, jadi hasil akhirnya bermode biasa
+    (umumnya 0644) dan bisa dibaca web server / user lain.
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp = _temp_name(folder, prefix)
+        try:
+            return os.open(tmp, flags, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def make_temp_dir(folder, prefix=".tmp_"):
+    """Seperti open_temp tetapi folder (mode 0777 dikurangi umask, bukan 0700 seperti mkdtemp)."""
+    while True:
+        tmp = _temp_name(folder, prefix)
+        try:
+            os.mkdir(tmp, 0o777)
+            return tmp
+        except FileExistsError:
+            continue
+
+
+def write_atomic(path, data):
+    """Tulis bytes/str ke file sementara di folder yang sama lalu os.replace (atomik).
+
+    File akhir bermode biasa (lihat open_temp); file sementara dihapus jika penulisan gagal.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = open_temp(path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def encode_png(img):
+    """PNG sekecil mungkin tanpa mengubah tampilan QR: 1-bit jika hitam-putih, palet jika berlogo."""
+    if img.mode not in ("1", "P"):
+        colors = img.convert("RGB").getcolors(2)
+        img = img.convert("1") if colors is not None else img.convert("RGB").quantize(colors=PALETTE_COLORS)
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+class QRStore:
+    """Penyimpanan gambar QR ber-shard awalan hash dengan fallback ke layout datar lama."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, batch_id) -> Path:
+        digest = hashlib.sha1(str(batch_id).encode("utf-8")).hexdigest()
+        name = batch_id if SAFE_NAME.fullmatch(str(batch_id)) else digest
+        return self.root / digest[:SHARD_CHARS] / f"{name}.png"
+
+    def legacy_path(self, batch_id) -> Path:
+        return self.root / f"{batch_id}.png"
+
+    def locate(self, batch_id) -> Path:
+        """Path file QR yang ada (shard, lalu datar); path shard jika belum ada sama sekali."""
+        path = self.path(batch_id)
+        if path.exists():
+            return path
+        legacy = self.legacy_path(batch_id)
+        return legacy if legacy.exists() else path
+
+    def exists(self, batch_id):
+        return self.locate(batch_id).exists()
+
+    @timed("qr_store.save")
+    def save(self, batch_id, img):
+        path = self.path(batch_id)
+        write_atomic(path, encode_png(img))
+        return path
+
+    def write_bytes(self, batch_id, data):
+        path = self.path(batch_id)
+        write_atomic(path, data)
+        return path
+
+    def read_bytes(self, batch_id):
+        path = self.locate(batch_id)
+        return path.read_bytes() if path.exists() else None
+
+    def delete(self, batch_id):
+        for path in (self.path(batch_id), self.legacy_path(batch_id)):
+            path.unlink(missing_ok=True)
+
+    def migrate_flat(self, src_dir=None, recompress=True, move=True):
+        """Pindahkan/salin PNG datar (default: root store ini) ke shard; kembalikan (jumlah, byte_lama, byte_baru)."""
+        src_dir = Path(src_dir or self.root)
+        n = before = after = 0
+        for path in src_dir.glob("*.png"):
+            data = path.read_bytes()
+            before += len(data)
+            if recompress:
+                with Image.open(io.BytesIO(data)) as img:
+                    data = encode_png(img)
+            dest = self.write_bytes(path.stem, data)
+            after += len(data)
+            if move and path != dest:
+                path.unlink()
+            n += 1
+        return n, before, after
+
+
+def migrate_legacy_root(root, legacy=LEGACY_DATA_DIR):
+    """Sekali jalan: salin database & QR dari folder temp lama ke root persisten.
+
+    Hanya jika root belum punya database; database disalin lewat backup API
+    SQLite supaya konsisten walau sedang dibuka proses lain.
+    """
+    root, legacy = Path(root), Path(legacy)
+    if root.resolve() == legacy.resolve() or (root / DB_NAME).exists() or not (legacy / DB_NAME).exists():
+        return False
+    for name in (DB_NAME, ARCHIVE_NAME):
+        if (legacy / name).exists():
+            src, dst = sqlite3.connect(legacy / name), sqlite3.connect(root / name)
+            with dst:
+                src.backup(dst)
+            src.close()
+            dst.close()
+    if (legacy / QR_DIR_NAME).exists():
+        QRStore(root / QR_DIR_NAME).migrate_flat(legacy / QR_DIR_NAME, move=False)
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Utilitas penyimpanan QR Harlur")
+    ap.add_argument("--qr-dir", required=True, help="Folder qr_codes")
+    ap.add_argument("--migrate-flat", action="store_true", help="Pindahkan PNG datar ke shard")
+    ap.add_argument("--no-recompress", action="store_true", help="Salin apa adanya tanpa konversi palet/1-bit")
+    args = ap.parse_args(argv)
+
+    store = QRStore(args.qr_dir)
+    if args.migrate_flat:
+        n, before, after = store.migrate_flat(recompress=not args.no_recompress)
+        print(f"{n} file dipindah: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    else:
+        shards = [p for p in store.root.iterdir() if p.is_dir()]
+        flat = sum(1 for _ in store.root.glob("*.png"))
+        files = sum(1 for _ in store.root.glob("*/*.png"))
+        print(f"{files} file di {len(shards)} shard, {flat} file datar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+# =========================================================
+# HARLUR COFFEE - SINKRONISASI ANTAR LOKASI PRODUKSI (OFFLINE-FIRST)
+# =========================================================
+# Setiap stasiun (Bandung, Jakarta, Arcamanik, ...) punya database lokal
+# sendiri dan tetap bisa mendaftarkan batch saat koneksi putus. Trigger
+# mencatat batch_id yang berubah ke `sync_outbox`; saat sinkron, stasiun:
+#
+#   push -> isi terkini batch di outbox dikirim ke hub sebagai satu change set
+#           berkunci (site, seq), seq = nomor outbox terakhir yang ikut
+#   pull -> change set stasiun lain setelah kursor masing-masing diterapkan
+#
+# Biaya sebanding dengan jumlah batch yang berubah, bukan ukuran tabel.
+# Konflik per batch_id diselesaikan deterministik (last writer wins) dengan
+# versi (changed_at, tick, site): perubahan lokal selalu menaikkan versi di
+# atas versi yang sudah dikenal, seri diputus nama site. Semua stasiun yang
+# sudah menerima change set yang sama berakhir dengan isi batch yang sama.
+#
+# Hub cukup menyimpan dan mendaftar file: DirHub (folder lokal / share)
+# atau HttpHub (server kecil `python -m harlur.sync hub`).
+#
+#   python -m harlur.sync enable --db data_produksi.db --site BAN
+#   python -m harlur.sync run --db data_produksi.db --hub /mnt/share/harlur_sync
+#   python -m harlur.sync run --db data_produksi.db --hub http://hub:8765 --interval 60
+#   python -m harlur.sync hub --dir /srv/harlur_sync --port 8765
+
+import argparse
+import json
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from harlur.arsip import ARCHIVE_SCHEMA, ARCHIVE_TABLE
+from harlur.history import _ensure_trigger, _produksi_columns, DERIVED_COLUMNS
+from harlur.metrics import incr, timed
+from harlur.storage import write_atomic
+from harlur.varian import assign_variant_ids
+from harlur.waktu import SQL_NOW_WIB, now_wib
+
+ENV_SYNC_SITE = "HARLUR_SYNC_SITE"
+ENV_SYNC_HUB = "HARLUR_SYNC_HUB"
+# Kolom lokal yang tidak dikirim: id autoincrement per stasiun, variant_id
+# dipetakan ulang dari katalog masing-masing stasiun, archived_at hanya
+# penanda perpindahan ke arsip lokal (bukan perubahan isi batch)
+LOCAL_COLUMNS = {"id", "archived_at"} | DERIVED_COLUMNS
+SITE_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+SEQ_DIGITS = 12
+CHUNK = 500
+
+
+class SyncError(Exception):
+    pass
+
+
+# ===================== SKEMA & TRIGGER =====================
+def enabled(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sync_config'"
+    ).fetchone() is not None
+
+
+def local_site(conn):
+    if not enabled(conn):
+        return None
+    row = conn.execute("SELECT site FROM sync_config WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def enable_sync(conn, site):
+    """Aktifkan sinkron untuk stasiun `site` (aman dipanggil berulang).
+
+    Saat pertama kali, semua batch yang sudah ada masuk outbox agar ikut
+    terkirim pada push berikutnya.
+    """
+    if not SITE_RE.match(site or ""):
+        raise ValueError("Kode site hanya boleh huruf, angka, '-' atau '_' (maks. 32).")
+    current = local_site(conn)
+    if current is not None and current != site:
+        raise SyncError(f"Database ini sudah terdaftar sebagai site {current}.")
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_config (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            site TEXT NOT NULL,
+            pushed_seq INTEGER NOT NULL DEFAULT 0,
+            sync_apply INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL
+        )
+        """)
+        # Versi pemenang per batch yang dikenal stasiun ini (termasuk tombstone)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_versi (
+            batch_id TEXT PRIMARY KEY,
+            changed_at TEXT NOT NULL,
+            tick INTEGER NOT NULL,
+            site TEXT NOT NULL
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_cursor (
+            site TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            synced_at TEXT
+        )
+        """)
+        if current is None:
+            conn.execute("INSERT INTO sync_config (id, site) VALUES (1, ?)", (site,))
+            conn.execute("INSERT INTO sync_outbox (batch_id) SELECT batch_id FROM produksi ORDER BY id")
+            conn.execute(f"""
+            INSERT OR IGNORE INTO sync_versi (batch_id, changed_at, tick, site)
+            SELECT batch_id, COALESCE(updated_at, timestamp, {SQL_NOW_WIB}), 0, ? FROM produksi
+            """, (site,))
+        init_sync(conn)
+
+
+def init_sync(conn):
+    """(Re)buat trigger outbox; tidak melakukan apa pun jika sinkron belum diaktifkan."""
+    if not enabled(conn):
+        return
+    cols = [c for c in _produksi_columns(conn) if c not in LOCAL_COLUMNS]
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in cols)
+    lokal = "(SELECT sync_apply FROM sync_config WHERE id = 1) = 0"
+
+    def catat(ref):
+        # Versi baru selalu di atas versi yang dikenal: jam lebih baru -> tick 0,
+        # jam sama/mundur (clock skew) -> changed_at lama dengan tick + 1
+        return (
+            f"INSERT INTO sync_outbox (batch_id) VALUES ({ref}.batch_id); "
+            f"INSERT INTO sync_versi (batch_id, changed_at, tick, site) "
+            f"SELECT {ref}.batch_id, "
+            f"CASE WHEN v.changed_at IS NULL OR {SQL_NOW_WIB} > v.changed_at THEN {SQL_NOW_WIB} ELSE v.changed_at END, "
+            f"CASE WHEN v.changed_at IS NULL OR {SQL_NOW_WIB} > v.changed_at THEN 0 ELSE v.tick + 1 END, "
+            f"(SELECT site FROM sync_config WHERE id = 1) "
+            f"FROM (SELECT 1) LEFT JOIN sync_versi v ON v.batch_id = {ref}.batch_id WHERE 1 "
+            f"ON CONFLICT(batch_id) DO UPDATE SET changed_at = excluded.changed_at, "
+            f"tick = excluded.tick, site = excluded.site;"
+        )
+
+    _ensure_trigger(conn, "produksi_sync_ai", (
+        f"CREATE TRIGGER produksi_sync_ai AFTER INSERT ON produksi WHEN {lokal} BEGIN {catat('NEW')} END"
+    ))
+    _ensure_trigger(conn, "produksi_sync_au", (
+        f"CREATE TRIGGER produksi_sync_au AFTER UPDATE ON produksi WHEN {lokal} AND ({changed}) "
+        f"BEGIN {catat('NEW')} END"
+    ))
+    # Pindah ke arsip adalah urusan lokal, bukan penghapusan batch
+    _ensure_trigger(conn, "produksi_sync_ad", (
+        f"CREATE TRIGGER produksi_sync_ad AFTER DELETE ON produksi WHEN {lokal} AND OLD.archived_at IS NULL "
+        f"BEGIN {catat('OLD')} END"
+    ))
+
+
+# ===================== HUB =====================
+def _check_site(site):
+    if not SITE_RE.match(site or ""):
+        raise ValueError(f"Kode site tidak valid: {site!r}")
+    return site
+
+
+class DirHub:
+    """Hub berupa folder: <root>/<site>/<seq>.json, satu file per change set."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, site, seq, content: bytes):
+        write_atomic(self.root / _check_site(site) / f"{seq:0{SEQ_DIGITS}d}.json", content)
+
+    def sites(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and SITE_RE.match(p.name))
+
+    def seqs(self, site, after=0):
+        folder = self.root / _check_site(site)
+        if not folder.exists():
+            return []
+        return sorted(int(p.stem) for p in folder.glob("*.json") if p.stem.isdigit() and int(p.stem) > after)
+
+    def get(self, site, seq):
+        return (self.root / _check_site(site) / f"{seq:0{SEQ_DIGITS}d}.json").read_bytes()
+
+
+class HttpHub:
+    """Klien hub HTTP (lihat serve_hub); antarmuka sama dengan DirHub."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _req(self, method, path, **kwargs):
+        res = requests.request(method, f"{self.url}{path}", timeout=self.timeout, **kwargs)
+        if res.status_code != 200:
+            raise SyncError(f"Hub {method} {path}: HTTP {res.status_code} {res.text[:200]}")
+        return res
+
+    def put(self, site, seq, content: bytes):
+        self._req("PUT", f"/changes/{_check_site(site)}/{seq}", data=content)
+
+    def sites(self):
+        return self._req("GET", "/sites").json()
+
+    def seqs(self, site, after=0):
+        return self._req("GET", f"/changes/{_check_site(site)}", params={"after": after}).json()
+
+    def get(self, site, seq):
+        return self._req("GET", f"/changes/{_check_site(site)}/{seq}").content
+
+
+def open_hub(target):
+    """DirHub untuk path folder, HttpHub untuk URL http(s)://."""
+    if str(target).startswith(("http://", "https://")):
+        return HttpHub(target)
+    return DirHub(target)
+
+
+def serve_hub(root, host="127.0.0.1", port=8765):
+    """Server hub HTTP sederhana di atas DirHub (untuk pengujian / jaringan lokal)."""
+    hub = DirHub(root)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body, ctype="application/json"):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _parts(self):
+            url = urlsplit(self.path)
+            return [p for p in url.path.split("/") if p], dict(parse_qsl(url.query))
+
+        def do_GET(self):
+            parts, query = self._parts()
+            try:
+                if parts == ["sites"]:
+                    return self._reply(200, hub.sites())
+                if len(parts) == 2 and parts[0] == "changes":
+                    return self._reply(200, hub.seqs(parts[1], int(query.get("after", 0))))
+                if len(parts) == 3 and parts[0] == "changes" and parts[2].isdigit():
+                    return self._reply(200, hub.get(parts[1], int(parts[2])))
+            except (ValueError, FileNotFoundError) as e:
+                return self._reply(404, {"error": str(e)})
+            self._reply(404, {"error": "Endpoint tidak ditemukan."})
+
+        def do_PUT(self):
+            parts, _ = self._parts()
+            if len(parts) != 3 or parts[0] != "changes" or not parts[2].isdigit():
+                return self._reply(404, {"error": "Endpoint tidak ditemukan."})
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                json.loads(body)
+                hub.put(parts[1], int(parts[2]), body)
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            self._reply(200, {"ok": True})
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+# ===================== PUSH / PULL =====================
+def _chunks(items, size=CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def pending(conn):
+    """Jumlah batch berbeda yang menunggu dikirim."""
+    if not enabled(conn):
+        return 0
+    return conn.execute(
+        "SELECT COUNT(DISTINCT batch_id) FROM sync_outbox WHERE seq > (SELECT pushed_seq FROM sync_config WHERE id = 1)"
+    ).fetchone()[0]
+
+
+@timed("sync.push")
+def push(conn, hub):
+    """Kirim isi terkini batch yang berubah sejak push terakhir; kembalikan jumlah batch."""
+    site, pushed = conn.execute("SELECT site, pushed_seq FROM sync_config WHERE id = 1").fetchone()
+    rows = conn.execute(
+        "SELECT batch_id, MAX(seq) FROM sync_outbox WHERE seq > ? GROUP BY batch_id ORDER BY MAX(seq)", (pushed,)
+    ).fetchall()
+    if not rows:
+        return 0
+    upto = max(r[1] for r in rows)
+    cols = [c for c in _produksi_columns(conn) if c not in LOCAL_COLUMNS]
+
+    changes = []
+    for part in _chunks([r[0] for r in rows]):
+        marks = ", ".join("?" * len(part))
+        current = {r[0]: r for r in conn.execute(
+            f"SELECT {', '.join(cols)} FROM produksi WHERE batch_id IN ({marks})", part)}
+        versi = {r[0]: r[1:] for r in conn.execute(
+            f"SELECT batch_id, changed_at, tick, site FROM sync_versi WHERE batch_id IN ({marks})", part)}
+        # Batch yang sudah pindah ke arsip lokal tidak boleh jadi tombstone di stasiun lain
+        archived = _archived(conn, part)
+        for batch_id in part:
+            if batch_id not in versi or batch_id in archived:
+                continue
+            row = current.get(batch_id)
+            changes.append({
+                "batch_id": batch_id,
+                "versi": list(versi[batch_id]),
+                "row": dict(zip(cols, row)) if row else None,
+            })
+
+    payload = {"site": site, "seq": upto, "from_seq": pushed, "changes": changes}
+    # Hub lebih dulu: jika gagal (offline) outbox tetap utuh dan dicoba lagi nanti
+    hub.put(site, upto, json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode())
+    with conn:
+        conn.execute("UPDATE sync_config SET pushed_seq = ? WHERE id = 1", (upto,))
+        conn.execute("DELETE FROM sync_outbox WHERE seq <= ?", (upto,))
+    incr("sync.pushed", len(changes))
+    return len(changes)
+
+
+def _archived(conn, batch_ids):
+    if ARCHIVE_SCHEMA not in [r[1] for r in conn.execute("PRAGMA database_list")]:
+        return set()
+    marks = ", ".join("?" * len(batch_ids))
+    return {r[0] for r in conn.execute(
+        f"SELECT batch_id FROM {ARCHIVE_TABLE} WHERE batch_id IN ({marks})", batch_ids)}
+
+
+def apply_changes(conn, payload):
+    """Terapkan satu change set; kembalikan (diterapkan, dilewati).
+
+    Perubahan hanya menang jika versinya lebih tinggi dari versi lokal.
+    Trigger outbox dimatikan lewat sync_apply di dalam transaksi yang sama,
+    jadi koneksi lain tidak pernah melihat flag tersebut menyala.
+    """
+    local_cols = set(_produksi_columns(conn))
+    applied = skipped = 0
+    with conn:
+        conn.execute("UPDATE sync_config SET sync_apply = 1 WHERE id = 1")
+        try:
+            for part in _chunks(payload["changes"]):
+                ids = [c["batch_id"] for c in part]
+                marks = ", ".join("?" * len(ids))
+                known = {r[0]: tuple(r[1:]) for r in conn.execute(
+                    f"SELECT batch_id, changed_at, tick, site FROM sync_versi WHERE batch_id IN ({marks})", ids)}
+                archived = _archived(conn, ids)
+                menang = []
+                for change in part:
+                    versi = tuple(change["versi"])
+                    lokal = known.get(change["batch_id"])
+                    if change["batch_id"] in archived or (lokal is not None and versi <= lokal):
+                        skipped += 1
+                        continue
+                    row = change["row"]
+                    if row is None:
+                        conn.execute("DELETE FROM produksi WHERE batch_id = ?", (change["batch_id"],))
+                    else:
+                        cols = [c for c in row if c in local_cols and c not in LOCAL_COLUMNS]
+                        conn.execute(
+                            f"INSERT INTO produksi ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                            f"ON CONFLICT(batch_id) DO UPDATE SET "
+                            f"{', '.join(f'{c} = excluded.{c}' for c in cols if c != 'batch_id')}",
+                            [row[c] for c in cols],
+                        )
+                        menang.append(change["batch_id"])
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sync_versi (batch_id, changed_at, tick, site) VALUES (?, ?, ?, ?)",
+                        (change["batch_id"], *versi),
+                    )
+                    applied += 1
+                if menang:
+                    assign_variant_ids(conn, f"batch_id IN ({', '.join('?' * len(menang))})", menang)
+        finally:
+            conn.execute("UPDATE sync_config SET sync_apply = 0 WHERE id = 1")
+    return applied, skipped
+
+
+@timed("sync.pull")
+def pull(conn, hub):
+    """Terapkan change set stasiun lain setelah kursor masing-masing."""
+    site = local_site(conn)
+    cursors = dict(conn.execute("SELECT site, seq FROM sync_cursor"))
+    hasil = {"changesets": 0, "applied": 0, "skipped": 0}
+    for other in hub.sites():
+        if other == site:
+            continue
+        for seq in hub.seqs(other, cursors.get(other, 0)):
+            payload = json.loads(hub.get(other, seq))
+            applied, skipped = apply_changes(conn, payload)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_cursor (site, seq, synced_at) VALUES (?, ?, ?)",
+                    (other, seq, now_wib()),
+                )
+            hasil["changesets"] += 1
+            hasil["applied"] += applied
+            hasil["skipped"] += skipped
+    incr("sync.applied", hasil["applied"])
+    return hasil
+
+
+def sync(conn, hub):
+    """Push lalu pull; kembalikan ringkasan."""
+    if not enabled(conn):
+        raise SyncError("Sinkron belum diaktifkan (enable_sync).")
+    t = time.perf_counter()
+    pushed = push(conn, hub)
+    hasil = pull(conn, hub)
+    hasil.update(pushed=pushed, seconds=time.perf_counter() - t)
+    return hasil
+
+
+def status(conn):
+    """Site lokal, jumlah menunggu kirim, dan kursor per stasiun lain."""
+    if not enabled(conn):
+        return None
+    site, pushed = conn.execute("SELECT site, pushed_seq FROM sync_config WHERE id = 1").fetchone()
+    return {
+        "site": site,
+        "pushed_seq": pushed,
+        "pending": pending(conn),
+        "cursors": [dict(zip(("site", "seq", "synced_at"), r))
+                    for r in conn.execute("SELECT site, seq, synced_at FROM sync_cursor ORDER BY site")],
+    }
+
+
+def main(argv=None):
+    from harlur.db import connect, init_db
+
+    ap = argparse.ArgumentParser(description="Sinkronisasi antar lokasi produksi Harlur")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("enable", help="Daftarkan database lokal sebagai satu site")
+    e.add_argument("--db", required=True)
+    e.add_argument("--site", required=True, help="Kode site, mis. BAN")
+    r = sub.add_parser("run", help="Push + pull sekali (atau berkala dengan --interval)")
+    r.add_argument("--db", required=True)
+    r.add_argument("--hub", default=os.environ.get(ENV_SYNC_HUB), help="Folder hub atau URL http(s)://")
+    r.add_argument("--interval", type=float, default=0, help="Detik antar sinkron; 0 = sekali")
+    s = sub.add_parser("status", help="Tampilkan status sinkron")
+    s.add_argument("--db", required=True)
+    h = sub.add_parser("hub", help="Jalankan hub HTTP di atas folder")
+    h.add_argument("--dir", required=True)
+    h.add_argument("--host", default="127.0.0.1")
+    h.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "hub":
+        server = serve_hub(args.dir, args.host, args.port)
+        print(f"Hub sinkron di http://{args.host}:{args.port} (folder {args.dir})")
+        server.serve_forever()
+        return
+
+    conn = connect(args.db)
+    init_db(conn)
+    if args.cmd == "enable":
+        enable_sync(conn, args.site)
+        print(f"Site {args.site}: {pending(conn)} batch menunggu dikirim")
+    elif args.cmd == "status":
+        print(json.dumps(status(conn), indent=2))
+    else:
+        if not args.hub:
+            raise SystemExit(f"--hub atau {ENV_SYNC_HUB} wajib diisi")
+        hub = open_hub(args.hub)
+        while True:
+            try:
+                h = sync(conn, hub)
+                print(f"push {h['pushed']} batch, pull {h['changesets']} change set "
+                      f"({h['applied']} diterapkan, {h['skipped']} kalah versi) dalam {h['seconds']:.2f} s")
+            except (requests.RequestException, OSError, SyncError) as err:
+                # Offline: perubahan tetap di outbox, dicoba lagi pada putaran berikutnya
+                print(f"Sinkron gagal: {err}")
+                if not args.interval:
+                    raise SystemExit(1)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# =========================================================
+# HARLUR COFFEE - KATALOG VARIAN PRODUK
+# =========================================================
+# Deskripsi, asal bahan, taste notes, dan saran penyajian tiap varian
+# disimpan di database (tabel `varian`) dan bisa diedit dari admin UI.
+# Penulisan varian yang berbeda-beda ("Matcha Latte", "matcha", "MATCHA ")
+# dipetakan ke satu varian lewat `varian_alias` berdasarkan kunci
+# ternormalisasi, lalu disimpan sebagai `produksi.variant_id` (integer) saat
+# batch ditulis. Analitik cukup GROUP BY variant_id, bukan teks bebas.
+#
+# Katalog dimuat sekali per proses dan dipakai ulang selama `varian_versi`
+# (dinaikkan trigger setiap kali katalog/alias berubah) tidak berubah, jadi
+# render Consumer View hanya lookup dict.
+
+import re
+import threading
+import unicodedata
+
+import pandas as pd
+
+from harlur.waktu import now_wib
+
+DETAIL_COLUMNS = ["deskripsi", "asal_bahan", "sweetness", "aroma", "body", "serving"]
+
+# Isi awal katalog (sebelumnya hard-code di harlur/render.py)
+SEED = [
+    {
+        "nama": "Coklat",
+        "deskripsi": "Bubuk coklat premium dengan rasa rich dan creamy.",
+        "asal_bahan": "Kakao lokal dari Jawa Timur.",
+        "sweetness": 4, "aroma": 2, "body": 4,
+        "serving": "Cocok panas atau dingin. Ideal 60–70°C jika disajikan hangat.",
+        "alias": ["cokelat", "chocolate", "choco", "chocolate latte"],
+    },
+    {
+        "nama": "Matcha",
+        "deskripsi": "Matcha hijau berkualitas dengan aroma natural dan lembut.",
+        "asal_bahan": "Serbuk matcha impor dari Jepang.",
+        "sweetness": 3, "aroma": 3, "body": 2,
+        "serving": "Paling nikmat disajikan dengan es dan susu.",
+        "alias": ["matcha latte", "green tea latte"],
+    },
+    {
+        "nama": "Kopi Gula Aren",
+        "deskripsi": "Espresso dengan gula aren asli, manis alami & beraroma kompleks.",
+        "asal_bahan": "Kopi arabika Malabar + Gula aren Garut.",
+        "sweetness": 4, "aroma": 5, "body": 4,
+        "serving": "Sajikan dingin (0–4°C).",
+        "alias": ["kopi aren", "aren latte", "kopi susu gula aren"],
+    },
+    {
+        "nama": "Thai Tea",
+        "deskripsi": "Teh Thailand klasik dengan rempah lembut dan creamy finish.",
+        "asal_bahan": "Daun teh Thailand dengan proses CTC.",
+        "sweetness": 4, "aroma": 3, "body": 3,
+        "serving": "Sajikan dengan es untuk aroma terbaik.",
+        "alias": ["thai tea latte", "teh thailand", "thaitea"],
+    },
+]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_key(text):
+    """Kunci pencocokan varian: huruf kecil, tanpa aksen, tanda baca/spasi jadi satu spasi."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+# ===================== SKEMA =====================
+def init_varian(conn, backfill=False):
+    """Tabel katalog + trigger versi; isi SEED jika katalog masih kosong.
+
+    `backfill=True` (kolom produksi.variant_id baru ditambahkan) memetakan
+    seluruh batch lama; selain itu hanya batch yang belum punya variant_id.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS varian (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nama TEXT UNIQUE NOT NULL,
+        deskripsi TEXT,
+        asal_bahan TEXT,
+        sweetness INTEGER,
+        aroma INTEGER,
+        body INTEGER,
+        serving TEXT,
+        updated_at TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS varian_alias (
+        alias_key TEXT PRIMARY KEY,
+        varian_id INTEGER NOT NULL REFERENCES varian (id)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_varian_alias_varian ON varian_alias (varian_id)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS varian_versi (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versi INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO varian_versi (id, versi) VALUES (1, 0)")
+    for table in ("varian", "varian_alias"):
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_versi_{op.lower()} AFTER {op} ON {table} "
+                f"BEGIN UPDATE varian_versi SET versi = versi + 1 WHERE id = 1; END"
+            )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produksi_variant ON produksi (variant_id)")
+
+    if conn.execute("SELECT COUNT(*) FROM varian").fetchone()[0] == 0:
+        for item in SEED:
+            save_varian(conn, None, {k: item[k] for k in ["nama"] + DETAIL_COLUMNS}, item["alias"],
+                        assign=False)
+        backfill = True
+
+    assign_variant_ids(conn, "1" if backfill else "variant_id IS NULL")
+
+
+# ===================== CACHE KATALOG =====================
+class Katalog:
+    """Snapshot katalog satu versi: varian per id dan alias_key -> id."""
+
+    def __init__(self, versi, varian, alias):
+        self.versi = versi
+        self.varian = varian
+        self.alias = alias
+
+    def resolve(self, teks):
+        """variant_id untuk teks varian bebas, None jika belum ada di katalog."""
+        return self.alias.get(normalize_key(teks))
+
+    def get(self, variant_id=None, teks=None):
+        if variant_id is not None and not pd.isna(variant_id):
+            info = self.varian.get(int(variant_id))
+            if info is not None:
+                return info
+        variant_id = self.resolve(teks)
+        return self.varian.get(variant_id) if variant_id is not None else None
+
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _db_key(conn):
+    row = conn.execute("PRAGMA database_list").fetchone()
+    return row[2] or f"memory:{id(conn)}"
+
+
+def _load(conn, versi):
+    varian = {}
+    for row in conn.execute(f"SELECT id, nama, {', '.join(DETAIL_COLUMNS)} FROM varian"):
+        varian[row[0]] = dict(zip(["id", "nama"] + DETAIL_COLUMNS, row))
+    alias = dict(conn.execute("SELECT alias_key, varian_id FROM varian_alias"))
+    # Nama varian selalu cocok dengan dirinya sendiri walau aliasnya terhapus
+    for variant_id, info in varian.items():
+        alias.setdefault(normalize_key(info["nama"]), variant_id)
+    return Katalog(versi, varian, alias)
+
+
+def catalog(conn):
+    """Katalog untuk database `conn`; dimuat ulang hanya jika versinya berubah."""
+    versi = conn.execute("SELECT versi FROM varian_versi WHERE id = 1").fetchone()[0]
+    key = _db_key(conn)
+    cached = _CACHE.get(key)
+    if cached is not None and cached.versi == versi:
+        return cached
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+        if cached is None or cached.versi != versi:
+            cached = _CACHE[key] = _load(conn, versi)
+    return cached
+
+
+def clear_cache():
+    """Buang cache (mis. setelah file database diganti dari snapshot)."""
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def resolve_id(conn, teks):
+    return catalog(conn).resolve(teks)
+
+
+def info_for(conn, data):
+    """Detail varian untuk satu baris produksi (variant_id dulu, lalu teks varian)."""
+    return catalog(conn).get(data.get("variant_id"), data.get("varian_produksi"))
+
+
+# ===================== PEMETAAN BATCH =====================
+def assign_variant_ids(conn, where="1", params=()):
+    """Set ulang produksi.variant_id untuk baris `where`; kembalikan jumlah baris yang berubah.
+
+    Teks varian yang berbeda hanya segelintir, jadi pemetaan dihitung di
+    Python per teks unik lalu diterapkan dengan satu UPDATE berbasis set.
+    Perubahan variant_id saja tidak tercatat di riwayat (kolom turunan).
+    """
+    teks = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT varian_produksi FROM produksi WHERE {where}", params
+    )]
+    if not teks:
+        return 0
+    kat = catalog(conn)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _varian_map (teks TEXT PRIMARY KEY, varian_id INTEGER)")
+    conn.execute("DELETE FROM _varian_map")
+    conn.executemany("INSERT OR IGNORE INTO _varian_map VALUES (?, ?)",
+                     [(t, kat.resolve(t)) for t in teks if t is not None])
+    lookup = "(SELECT varian_id FROM _varian_map m WHERE m.teks = produksi.varian_produksi)"
+    return conn.execute(
+        f"UPDATE produksi SET variant_id = {lookup} WHERE ({where}) AND variant_id IS NOT {lookup}",
+        params
+    ).rowcount
+
+
+# ===================== EDIT KATALOG =====================
+def _alias_conflicts(conn, variant_id, keys):
+    marks = ", ".join("?" * len(keys))
+    return conn.execute(
+        f"SELECT a.alias_key, v.nama FROM varian_alias a JOIN varian v ON v.id = a.varian_id "
+        f"WHERE a.alias_key IN ({marks}) AND a.varian_id IS NOT ?",
+        (*keys, variant_id)
+    ).fetchall()
+
+
+def save_varian(conn, variant_id, fields, aliases=None, assign=True):
+    """Tambah (variant_id None) atau ubah satu varian beserta daftar aliasnya.
+
+    Alias yang sudah dipakai varian lain memunculkan ValueError. Setelah
+    katalog berubah, variant_id batch dipetakan ulang (`assign`).
+    """
+    fields = {k: v for k, v in fields.items() if k == "nama" or k in DETAIL_COLUMNS}
+    nama = str(fields.get("nama") or "").strip()
+    if variant_id is None and not nama:
+        raise ValueError("Nama varian wajib diisi.")
+    if "nama" in fields:
+        if not nama:
+            raise ValueError("Nama varian wajib diisi.")
+        fields["nama"] = nama
+
+    keys = None
+    if aliases is not None:
+        keys = {normalize_key(a) for a in aliases} | {normalize_key(nama)}
+        keys = sorted(keys - {""})
+
+    with conn:
+        if variant_id is None:
+            cols = list(fields) + ["updated_at"]
+            variant_id = conn.execute(
+                f"INSERT INTO varian ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                (*fields.values(), now_wib())
+            ).lastrowid
+        else:
+            conn.execute(
+                f"UPDATE varian SET {', '.join(f'{c}=?' for c in fields)}, updated_at=? WHERE id=?",
+                (*fields.values(), now_wib(), variant_id)
+            )
+        if keys is not None:
+            conflicts = _alias_conflicts(conn, variant_id, keys) if keys else []
+            if conflicts:
+                raise ValueError("Alias sudah dipakai varian lain: " +
+                                 ", ".join(f"'{k}' ({v})" for k, v in conflicts))
+            conn.execute("DELETE FROM varian_alias WHERE varian_id=?", (variant_id,))
+            conn.executemany("INSERT INTO varian_alias (alias_key, varian_id) VALUES (?, ?)",
+                             [(k, variant_id) for k in keys])
+        if assign:
+            assign_variant_ids(conn)
+    return variant_id
+
+
+def add_alias(conn, variant_id, teks):
+    """Petakan satu teks varian (mis. yang belum dikenali) ke varian yang ada."""
+    key = normalize_key(teks)
+    if not key:
+        raise ValueError("Alias kosong.")
+    with conn:
+        conflicts = _alias_conflicts(conn, variant_id, [key])
+        if conflicts:
+            raise ValueError(f"Alias '{key}' sudah dipakai varian {conflicts[0][1]}.")
+        conn.execute("INSERT OR IGNORE INTO varian_alias (alias_key, varian_id) VALUES (?, ?)", (key, variant_id))
+        return assign_variant_ids(conn, "variant_id IS NULL")
+
+
+def delete_varian(conn, variant_id):
+    with conn:
+        conn.execute("DELETE FROM varian_alias WHERE varian_id=?", (variant_id,))
+        conn.execute("DELETE FROM varian WHERE id=?", (variant_id,))
+        conn.execute("UPDATE produksi SET variant_id = NULL WHERE variant_id=?", (variant_id,))
+
+
+# ===================== DATA ADMIN & ANALITIK =====================
+def list_varian(conn):
+    """Katalog lengkap + alias (dipisah koma) untuk editor admin."""
+    return pd.read_sql_query(f"""
+        SELECT v.id, v.nama, {', '.join(f'v.{c}' for c in DETAIL_COLUMNS)},
+               (SELECT group_concat(alias_key, ', ') FROM varian_alias a WHERE a.varian_id = v.id) AS alias,
+               v.updated_at
+        FROM varian v ORDER BY v.nama
+    """, conn)
+
+
+def varian_counts(conn):
+    """Jumlah batch aktif per varian (GROUP BY kunci integer)."""
+    return pd.read_sql_query("""
+        SELECT COALESCE(v.nama, '(belum dipetakan)') AS varian, COUNT(*) AS jumlah_batch
+        FROM produksi p LEFT JOIN varian v ON v.id = p.variant_id
+        WHERE p.deleted_at IS NULL
+        GROUP BY p.variant_id
+        ORDER BY jumlah_batch DESC
+    """, conn)
+
+
+def unmapped_texts(conn):
+    """Teks varian_produksi yang belum cocok dengan katalog."""
+    return pd.read_sql_query("""
+        SELECT varian_produksi, COUNT(*) AS jumlah_batch
+        FROM produksi
+        WHERE variant_id IS NULL AND deleted_at IS NULL AND varian_produksi IS NOT NULL
+        GROUP BY varian_produksi
+        ORDER BY jumlah_batch DESC
+    """, conn)
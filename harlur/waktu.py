@@ -0,0 +1,31 @@
+# =========================================================
+# HARLUR COFFEE - UTILITAS WAKTU (WIB)
+# =========================================================
+
+from datetime import datetime
+
+import pytz
+
+WIB = pytz.timezone("Asia/Jakarta")
+
+# Ekspresi SQL waktu WIB, dipakai di trigger (Asia/Jakarta tidak mengenal DST)
+SQL_NOW_WIB = "strftime('%Y-%m-%d %H:%M:%S', 'now', '+7 hours')"
+
+FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def now_wib():
+    return datetime.now(WIB).strftime(FMT)
+
+
+def to_stamp(value):
+    """Normalisasi datetime/date/string ke format timestamp aplikasi."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(WIB).replace(tzinfo=None)
+        return value.strftime(FMT)
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d") + " 23:59:59"
+    value = str(value)
+    # Tanggal tanpa jam dianggap akhir hari tersebut
+    return value + " 23:59:59" if len(value) == 10 else value
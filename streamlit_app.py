@@ -12,84 +12,141 @@
 # =========================================================
 
 import streamlit as st
+import cProfile
+import functools
+import pstats
 import sqlite3
-import qrcode
-import numpy as np
 from PIL import Image
 import os
 import pandas as pd
 import base64
 from datetime import datetime, timedelta
-import pytz
-import cv2
 from streamlit_webrtc import webrtc_streamer, VideoProcessorBase, WebRtcMode
 from pathlib import Path
 import tempfile
-import requests
-import time
-import zipfile
 import io
-import textwrap
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+
+from harlur import produksi
+from harlur.arsip import (
+    attach_archive, soft_delete, restore_deleted, deleted_batches,
+    archive_candidates, archive_expired, get_archived, archived_qr, list_archived, unarchive,
+)
+from harlur.bahan import (
+    forward_summary, import_links, link_batch, list_lots, lot_codes, save_lot, trace_backward, trace_forward,
+)
+from harlur.batch_ids import next_batch_id, reserve_block, list_reservations
+from harlur.backup import GitHubBackend, BackupError, produksi_csv, restore_produksi_csv
+from harlur.bulk import (
+    build_filter, describe_filter, preview, bulk_update, bulk_delete, undo, undoable_operations,
+    distinct_values, UNDO_WINDOW_MENIT,
+)
+from harlur.cache import QUERY_CACHE
+from harlur.db import connect, init_db
+from harlur.export import (
+    FORMATS as EXPORT_FORMATS, XLSX_AVAILABLE, count_rows, filename as export_filename, stream as export_stream,
+)
+from harlur.labels import ENV_LABEL_PRINTER, iter_zpl, rows_for_ids, send_tcp
+from harlur.metrics import REGISTRY, span, timed
+from harlur.history import batch_timeline, batch_as_of, produksi_as_of, history_batch_ids
+from harlur.qr import consumer_link, make_qr_image, decode_qr, batch_id_from_params, batch_id_from_payload
+from harlur.render import listing_html, consumer_card_html
+from harlur.report import ReportCache, cached_pdf, export_zip, select_batches
+from harlur.search import search_batches
+from harlur.snapshot import (
+    bootstrap, create_snapshot, list_local, qr_restore_error, read_manifest, restore_snapshot, snapshot_dir,
+    upload_snapshot,
+)
+from harlur.static_site import build_site
+from harlur.stok import (
+    JENIS, batch_stock, expired_stock, fefo, gudang_list, movements, rebuild_stock, record_movement, stock_levels,
+)
+from harlur.storage import ARCHIVE_NAME, DB_NAME, QR_DIR_NAME, QRStore, data_root, migrate_legacy_root
+from harlur.sync import ENV_SYNC_HUB, ENV_SYNC_SITE, enable_sync, open_hub, status as sync_status, sync as run_sync
+from harlur.varian import (
+    add_alias, clear_cache, delete_varian, info_for, list_varian, save_varian, unmapped_texts, varian_counts,
+)
+from harlur.waktu import WIB, now_wib
 
 # ===================== KONFIGURASI DASAR =====================
 st.set_page_config(page_title="Harlur Coffee QR Traceability", layout="wide")
 
-BASE_DIR = Path(tempfile.gettempdir()) / "harlur_traceability"
-DATA_DIR = BASE_DIR / "app_data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+# Profil cProfile satu rerun, diminta dari halaman Performance
+profiler = None
+if st.session_state.pop("_profile_next", False):
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+# Root data persisten: env HARLUR_DATA_DIR (volume), default ~/harlur_traceability.
+# Data di folder temp lama disalin sekali saat root baru masih kosong.
+DATA_DIR = data_root()
+migrate_legacy_root(DATA_DIR)
+
+DB_PATH = DATA_DIR / DB_NAME
+# QR ber-shard awalan hash; file datar lama tetap terbaca (lihat harlur/storage.py)
+QR_DIR = DATA_DIR / QR_DIR_NAME
+QR_STORE = QRStore(QR_DIR)
+
+# Cold storage untuk batch lama (lihat harlur/arsip.py)
+ARCHIVE_PATH = DATA_DIR / ARCHIVE_NAME
+
+# Halaman Consumer View statis untuk web server statis (lihat harlur/static_site.py)
+STATIC_DIR = DATA_DIR / "static_site"
+REPORT_CACHE = ReportCache(DATA_DIR / "report_cache")
 
-DB_PATH = DATA_DIR / "data_produksi.db"
-QR_DIR = DATA_DIR / "qr_codes"
-QR_DIR.mkdir(parents=True, exist_ok=True)
+# Sinkron antar lokasi produksi (opsional): kode site stasiun ini + folder/URL hub
+# (lihat harlur/sync.py)
+SYNC_SITE = os.environ.get(ENV_SYNC_SITE)
+SYNC_HUB = os.environ.get(ENV_SYNC_HUB)
+
+# Printer label thermal ZPL di jaringan, host[:port] raw 9100 (lihat harlur/labels.py)
+LABEL_PRINTER = os.environ.get(ENV_LABEL_PRINTER)
 
 LOGO_PATH = DATA_DIR / "logo_harlur.png"
 if not LOGO_PATH.exists():
     LOGO_PATH = Path("logo_harlur.png")
 
-WIB = pytz.timezone("Asia/Jakarta")
-
 # ===================== DATABASE =====================
-conn = sqlite3.connect(DB_PATH)
+# Cold start: database belum ada -> pulihkan snapshot terbaru (lokal, lalu GitHub)
+# sebelum melayani halaman; QR diekstrak di background (lihat harlur/snapshot.py)
+hasil_bootstrap = None
+if not DB_PATH.exists():
+    try:
+        remote = GitHubBackend(st.secrets["GITHUB_TOKEN"])
+    except Exception:
+        remote = None
+    with st.spinner("Memulihkan data dari snapshot..."):
+        hasil_bootstrap = bootstrap(DATA_DIR, remote)
+
+conn = connect(DB_PATH)
+init_db(conn)
+attach_archive(conn, ARCHIVE_PATH)
+if SYNC_SITE:
+    enable_sync(conn, SYNC_SITE)
 cursor = conn.cursor()
 
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS produksi (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    batch_id TEXT UNIQUE,
-    tanggal TEXT,
-    pic TEXT,
-    tempat_produksi TEXT,
-    varian_produksi TEXT,
-    lokasi_gudang TEXT,
-    expired_date TEXT,
-    timestamp TEXT,
-    updated_at TEXT
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS log_aktivitas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    waktu TEXT,
-    deskripsi TEXT
-)
-""")
-conn.commit()
+if hasil_bootstrap:
+    sumber, nama, detik = hasil_bootstrap
+    produksi.log_activity(conn, f"Bootstrap dari snapshot {sumber} {nama} ({detik:.1f} s)")
+# Ekstraksi QR bootstrap berjalan di background; kegagalannya jangan sampai tidak terlihat
+if qr_restore_error():
+    st.warning(f"Ekstraksi QR dari snapshot gagal: {qr_restore_error()}. "
+               f"QR yang sudah diekstrak tersimpan di folder .qr_restore_* di {DATA_DIR}.")
 
 # ===================== UTILITAS =====================
-def now_wib():
-    return datetime.now(WIB).strftime("%Y-%m-%d %H:%M:%S")
-
 def log_activity(desc):
-    cursor.execute("INSERT INTO log_aktivitas (waktu, deskripsi) VALUES (?, ?)", (now_wib(), desc))
-    conn.commit()
+    produksi.log_activity(conn, desc)
+
+def qr_file(batch_id) -> Path:
+    return QR_STORE.locate(batch_id)
+
+def cached(fn, *args):
+    """fn(conn, *args) lewat cache hasil query; dihitung ulang hanya setelah ada penulisan data."""
+    return QUERY_CACHE.call(conn, fn, *args)
 
-def safe_path(path: Path):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    return path
+def lihat_html(c):
+    """Tabel HTML tab Lihat (QR inline), None jika belum ada data."""
+    df = produksi.list_produksi(c)
+    return listing_html(df, qr_file) if not df.empty else None
 
 # Utility: generate unique widget keys to avoid StreamlitDuplicateElementId
 def widget_key(prefix: str, name: str) -> str:
@@ -99,151 +156,134 @@ def widget_key(prefix: str, name: str) -> str:
     """
     return f"{prefix}_{name}".replace(" ", "_").lower()
 
+def batch_picker(label: str, prefix: str, limit: int = 20):
+    """
+    Pemilih batch berbasis pencarian: hanya top-k hasil yang dikirim ke browser,
+    bukan seluruh daftar batch_id. Mengembalikan batch_id terpilih atau None.
+    """
+    q = st.text_input(f"Cari {label}", key=widget_key(prefix, "cari"),
+                      placeholder="Batch ID, PIC, varian, atau gudang")
+    hasil = cached(search_batches, q, limit)
+    if not hasil:
+        st.info("Batch tidak ditemukan.")
+        return None
+    return st.selectbox(label, hasil, key=widget_key(prefix, "pilih_batch"))
+
 # ===================== QR & DATABASE =====================
+@timed("tambah_data")
 def tambah_data(batch_id, tanggal, pic, tempat, varian, gudang, expired):
-    cursor.execute("SELECT COUNT(*) FROM produksi WHERE batch_id=?", (batch_id,))
-    if cursor.fetchone()[0] > 0:
+    # Batch ID kosong -> alokasi otomatis dari counter (lihat harlur/batch_ids.py)
+    if not batch_id:
+        batch_id = next_batch_id(conn, tempat, varian, tanggal)
+
+    # ID yang sudah pindah ke arsip tidak lagi dijaga UNIQUE tabel aktif
+    if get_archived(conn, batch_id) is not None:
         st.error("Batch ID sudah ada.")
-        return None, None
-
-    ts = now_wib()
-    cursor.execute("""
-        INSERT INTO produksi (
-            batch_id, tanggal, pic, tempat_produksi, varian_produksi,
-            lokasi_gudang, expired_date, timestamp, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (batch_id, tanggal, pic, tempat, varian, gudang, expired, ts, ts))
-    conn.commit()
-    log_activity(f"Tambah data {batch_id}")
+        return None, None, None
 
-    params = st.query_params
-    if "batch_id" in params:
-        menu = "Consumer View"
+    try:
+        produksi.insert_batch(conn, batch_id, tanggal, pic, tempat, varian, gudang, expired)
+    except sqlite3.IntegrityError:
+        st.error("Batch ID sudah ada.")
+        return None, None, None
+    log_activity(f"Tambah data {batch_id}")
 
     # Generate QR
-    link = f"https://harlur-traceability.streamlit.app/?batch_id={batch_id}"
-    qr = qrcode.QRCode(box_size=10, border=2)
-    qr.add_data(link)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-
-    if LOGO_PATH.exists():
-        logo = Image.open(LOGO_PATH)
-        logo = logo.resize((80, 80))
-        pos = ((img.size[0]-80)//2, (img.size[1]-80)//2)
-        img.paste(logo, pos)
+    link = consumer_link(batch_id)
+    img = make_qr_image(link, LOGO_PATH)
 
-    qr_path = safe_path(QR_DIR / f"{batch_id}.png")
-    img.save(qr_path)
+    qr_path = QR_STORE.save(batch_id, img)
 
     # === AUTO BACKUP SETIAP TAMBAH DATA ===
     try:
-        df_backup = pd.read_sql_query("SELECT * FROM produksi", conn)
-        csv_bytes = df_backup.to_csv(index=False).encode()
+        csv_bytes = produksi_csv(conn)
         stamp = datetime.now(WIB).strftime('%Y%m%d_%H%M%S')
         backup_name = f"auto_backup_{stamp}.csv"
         backup_to_github(backup_name, csv_bytes, msg=f"Auto-backup batch {batch_id}")
     except Exception as e:
         st.error(f"Auto-backup gagal: {e}")
 
-    return str(qr_path), link
+    return str(qr_path), link, batch_id
+
+def label_zpl_bytes(batch_ids):
+    """ZPL label untuk daftar batch (ID reservasi tanpa data tetap dapat QR + ID)."""
+    return b"".join(iter_zpl(rows_for_ids(conn, batch_ids)))
 
+def kirim_label(zpl: bytes):
+    try:
+        send_tcp(LABEL_PRINTER, [zpl])
+        st.success(f"Label terkirim ke printer {LABEL_PRINTER}.")
+    except OSError as e:
+        st.error(f"Printer label tidak bisa dihubungi: {e}")
+
+@timed("get_batch")
 def get_batch(batch_id):
-    df = pd.read_sql_query("SELECT * FROM produksi WHERE batch_id=?", conn, params=(batch_id,))
-    return df if not df.empty else None
+    return cached(produksi.get_batch, batch_id)
 
 # ===================== BACKUP & RESTORE =====================
+def backup_backend():
+    return GitHubBackend(st.secrets["GITHUB_TOKEN"])
+
+@timed("backup_to_github")
 def backup_to_github(filename: str, content: bytes, msg="Auto Backup"):
-    GITHUB_USER = "frozeno24"
-    GITHUB_REPO = "harlur-traceability-qr"
-    TOKEN = st.secrets["GITHUB_TOKEN"]
-
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/backup/{filename}"
-    headers = {"Authorization": f"token {TOKEN}"}
-
-    r = requests.get(url, headers=headers)
-    sha = r.json().get("sha") if r.status_code == 200 else None
-
-    data = {
-        "message": msg,
-        "content": base64.b64encode(content).decode(),
-        "branch": "main"
-    }
-    if sha:
-        data["sha"] = sha
-
-    res = requests.put(url, headers=headers, json=data)
-    if res.status_code not in [200, 201]:
-        st.error(f"Gagal backup: {res.text}")
+    try:
+        backup_backend().put(filename, content, msg)
+    except BackupError as e:
+        st.error(f"Gagal backup: {e}")
     else:
         st.success(f"Backup berhasil: {filename}")
         log_activity(f"Backup ke GitHub {filename}")
 
+@timed("restore_from_github")
 def restore_from_github(csv_filename, zip_filename=None):
-    GITHUB_USER = "frozeno24"
-    GITHUB_REPO = "harlur-traceability-qr"
-    TOKEN = st.secrets["GITHUB_TOKEN"]
-    headers = {"Authorization": f"token {TOKEN}"}
-
     # Restore CSV
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/backup/{csv_filename}"
-    res = requests.get(url, headers=headers)
-    if res.status_code != 200:
+    content = backup_backend().get(csv_filename)
+    if content is None:
         st.error("CSV tidak ditemukan di GitHub.")
         return
 
-    content = base64.b64decode(res.json()["content"])
-    df = pd.read_csv(io.BytesIO(content))
-
-    cursor.execute("DELETE FROM produksi")
-    conn.commit()
-    df.to_sql("produksi", conn, if_exists="append", index=False)
-    conn.commit()
+    restore_produksi_csv(conn, content)
 
     st.success("Restore database selesai.")
     log_activity(f"Restore dari {csv_filename}")
 
 # ===================== PDF EXPORT =====================
+@timed("export_pdf")
 def export_pdf(batch_id: str):
     data = get_batch(batch_id)
     if data is None:
         st.error("Batch tidak ditemukan.")
         return
 
-    info = data.iloc[0]
-    pdf_path = DATA_DIR / f"{batch_id}.pdf"
-    c = canvas.Canvas(str(pdf_path), pagesize=A4)
-    w, h = A4
-
-    if LOGO_PATH.exists():
-        c.drawImage(ImageReader(str(LOGO_PATH)), 40, h-120, width=100, height=100)
-
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(150, h-60, "Harlur Coffee - Product Report")
-
-    y = h - 150
-    details = [
-        ("Batch ID", info["batch_id"]),
-        ("Tanggal Produksi", info["tanggal"]),
-        ("Varian", info["varian_produksi"]),
-        ("Tempat", info["tempat_produksi"]),
-        ("Gudang", info["lokasi_gudang"]),
-        ("Expired", info["expired_date"]),
-        ("PIC", info["pic"]),
-    ]
-
-    c.setFont("Helvetica", 12)
-    for label, val in details:
-        c.drawString(50, y, f"{label}: {val}")
-        y -= 22
-
-    qr_path = QR_DIR / f"{batch_id}.png"
-    if qr_path.exists():
-        c.drawImage(ImageReader(str(qr_path)), w-220, h-300, width=150, height=150)
-
-    c.showPage()
-    c.save()
-    return pdf_path
+    # Langsung ke bytes (tanpa file di DATA_DIR), lewat cache per (batch_id, updated_at)
+    return cached_pdf(REPORT_CACHE, data.iloc[0], qr_file(batch_id), LOGO_PATH)
+
+
+def export_zip_bytes(dari, sampai):
+    """ZIP laporan PDF semua batch dengan tanggal produksi di [dari, sampai].
+
+    Dipanggil download_button di thread terpisah, jadi memakai koneksi sendiri.
+    """
+    c = connect(DB_PATH)
+    try:
+        attach_archive(c, ARCHIVE_PATH)
+        buf = io.BytesIO()
+        export_zip(c, select_batches(c, dari, sampai), buf, qr_file, LOGO_PATH, REPORT_CACHE)
+        return buf.getvalue()
+    finally:
+        c.close()
+
+def export_data_bytes(table, fmt, filters):
+    """File ekspor CSV/XLSX/JSONL untuk download_button (koneksi sendiri, seperti ZIP laporan).
+
+    Baris dibaca per potongan; download_button tetap menampung hasil akhirnya
+    di memori, jadi dump besar sebaiknya lewat CLI harlur.export atau API /export.
+    """
+    c = connect(DB_PATH)
+    try:
+        return b"".join(export_stream(c, table, fmt, **filters))
+    finally:
+        c.close()
 
 # ===================== SIDEBAR =====================
 if LOGO_PATH.exists():
@@ -254,178 +294,574 @@ st.sidebar.markdown("### Harlur Coffee Traceability")
 # Navigasi default
 menu = st.sidebar.radio(
     "Navigasi",
-    ["Manajemen Data", "Scan QR", "Log Aktivitas", "Consumer View"]
+    ["Manajemen Data", "Katalog Varian", "Lot & Recall", "Scan QR", "Stok Gudang", "Riwayat Batch", "Log Aktivitas", "Consumer View", "Performance"]
 )
 
 # === AUTO ROUTE QR — langsung masuk ke Consumer View jika URL mengandung batch_id ===
+# (format lama ?batch_id= maupun format ringkas ?B=, lihat harlur/qr.py)
 params = st.query_params
-batch_id_param = params.get("batch_id")
+batch_id_param = batch_id_from_params(params)
 
 if batch_id_param:  
     menu = "Consumer View"   # Force override tanpa merusak radio
 
 
 # ===================== MANAJEMEN DATA =====================
-if menu == "Manajemen Data":
-    st.title("📦 Manajemen Data Produksi")
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "➕ Tambah",
-        "📋 Lihat",
-        "✏️ Edit",
-        "🗑️ Hapus",
-        "💾 Backup & Restore"
-    ])
-
-    # ---------- Tambah ----------
-    with tab1:
-        st.subheader("Tambah Data Produksi")
-        with st.form("form_tambah"):
+MANAJEMEN_TABS = ["➕ Tambah", "📋 Lihat", "✏️ Edit", "🗑️ Hapus", "🧰 Bulk", "🗄️ Arsip", "💾 Backup & Restore"]
+
+
+def bagian(nama):
+    """Tab Manajemen Data sebagai st.fragment: interaksi di dalamnya hanya me-rerun tab itu."""
+    def deco(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def wrapper():
+            with span(f"manajemen.{nama}"):
+                fn()
+        return wrapper
+    return deco
+
+
+# ---------- Tambah ----------
+@bagian("tambah")
+def section_tambah():
+    st.subheader("Tambah Data Produksi")
+    with st.form("form_tambah"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            batch_id = st.text_input("Batch ID", help="Kosongkan untuk dibuat otomatis (SITE-VARIAN-YYMMDD-URUT)").upper().strip()
+            tanggal = st.date_input("Tanggal Produksi", datetime.now(WIB))
+            pic = st.text_input("PIC")
+        with col2:
+            tempat = st.text_input("Tempat Produksi")
+            varian = st.text_input("Varian Produk")
+            lots = st.multiselect("Lot Bahan Baku", cached(lot_codes), help="Untuk telusur recall (halaman Lot & Recall)")
+        with col3:
+            gudang = st.text_input("Lokasi Gudang")
+            expired = st.date_input("Kedaluwarsa", datetime.now(WIB)+timedelta(days=180))
+            cetak = st.checkbox("Cetak label ke printer", value=bool(LABEL_PRINTER), disabled=not LABEL_PRINTER,
+                                help=f"Printer ZPL dari env {ENV_LABEL_PRINTER}")
+
+        submit = st.form_submit_button("Simpan & Buat QR")
+
+    if submit:
+        qr, link, batch_baru = tambah_data(batch_id, str(tanggal), pic, tempat, varian, gudang, str(expired))
+        if qr:
+            if lots:
+                link_batch(conn, batch_baru, lots)
+            st.success(f"Data tersimpan: {batch_baru}")
+            st.image(qr, width=200)
+            st.markdown(f"[Lihat Consumer View]({link})")
+            zpl = label_zpl_bytes([batch_baru])
+            if cetak:
+                kirim_label(zpl)
+            st.download_button("Download Label ZPL", zpl, f"label_{batch_baru}.zpl", "application/octet-stream")
+
+    with st.expander("Reservasi Blok Batch ID (cetak label massal)"):
+        with st.form("form_reservasi"):
             col1, col2, col3 = st.columns(3)
             with col1:
-                batch_id = st.text_input("Batch ID").upper().strip()
-                tanggal = st.date_input("Tanggal Produksi", datetime.now(WIB))
-                pic = st.text_input("PIC")
+                r_tempat = st.text_input("Tempat Produksi", key=widget_key("reservasi","tempat"))
+                r_varian = st.text_input("Varian Produk", key=widget_key("reservasi","varian"))
             with col2:
-                tempat = st.text_input("Tempat Produksi")
-                varian = st.text_input("Varian Produk")
+                r_tanggal = st.date_input("Tanggal Produksi", datetime.now(WIB), key=widget_key("reservasi","tanggal"))
+                r_jumlah = st.number_input("Jumlah ID", min_value=1, max_value=10000, value=50, step=1)
             with col3:
-                gudang = st.text_input("Lokasi Gudang")
-                expired = st.date_input("Kedaluwarsa", datetime.now(WIB)+timedelta(days=180))
-
-            submit = st.form_submit_button("Simpan & Buat QR")
-
-        if submit and batch_id:
-            qr, link = tambah_data(batch_id, str(tanggal), pic, tempat, varian, gudang, str(expired))
-            if qr:
-                st.success("Data tersimpan.")
-                st.image(qr, width=200)
-                st.markdown(f"[Lihat Consumer View]({link})")
-
-    # ---------- Lihat ----------
-    with tab2:
-        st.subheader("Data Produksi")
-        df = pd.read_sql_query("SELECT * FROM produksi ORDER BY id DESC", conn)
-        if not df.empty:
-            # ===== STATUS KEDALUWARSA =====
-            def status_expired(date_str):
-                days = (pd.to_datetime(date_str) - datetime.now()).days
-                if days < 0:
-                    return "<span style='color:red;font-weight:bold;'>Expired</span>"
-                elif days <= 30:
-                    return "<span style='color:orange;font-weight:bold;'>Near Expired</span>"
-                else:
-                    return "<span style='color:green;font-weight:bold;'>Fresh</span>"
-
-            df["Status"] = df["expired_date"].apply(status_expired)
-
-            # ===== QR CODE THUMBNAIL =====
-            def load_qr_base64(batch):
-                path = QR_DIR / f"{batch}.png"
-                if path.exists():
-                    return base64.b64encode(open(path, "rb").read()).decode()
-                return None
-
-            df["QR"] = df["batch_id"].apply(
-                lambda x: f"<img src='data:image/png;base64,{load_qr_base64(x)}' width='70'>" if load_qr_base64(x) else "❌"
+                r_keperluan = st.text_input("Keperluan", key=widget_key("reservasi","keperluan"))
+                r_cetak = st.checkbox("Cetak label ke printer", value=bool(LABEL_PRINTER), disabled=not LABEL_PRINTER,
+                                      key=widget_key("reservasi","cetak"))
+            reservasi = st.form_submit_button("Reservasi")
+
+        if reservasi:
+            ids = reserve_block(conn, r_tempat, r_varian, str(r_tanggal), int(r_jumlah), r_keperluan)
+            st.success(f"{len(ids)} ID direservasi: {ids[0]} s/d {ids[-1]}")
+            log_activity(f"Reservasi {len(ids)} batch ID {ids[0]}..{ids[-1]}")
+            st.download_button("Download Daftar ID", "\n".join(ids).encode(), f"reservasi_{ids[0]}.txt")
+            zpl = label_zpl_bytes(ids)
+            if r_cetak:
+                kirim_label(zpl)
+            st.download_button("Download Label ZPL", zpl, f"label_{ids[0]}.zpl", "application/octet-stream")
+
+        st.dataframe(cached(list_reservations), hide_index=True)
+
+
+# ---------- Lihat ----------
+@bagian("lihat")
+def section_lihat():
+    st.subheader("Data Produksi")
+    html_lihat = cached(lihat_html)
+    if html_lihat is not None:
+        st.markdown(html_lihat, unsafe_allow_html=True)
+
+        # ===== EXPORT PDF =====
+        pilih = batch_picker("Ekspor PDF Batch", "lihat_data")
+        if pilih and st.button("Ekspor PDF"):
+            pdf = export_pdf(pilih)
+            if pdf:
+                st.download_button("Download PDF", pdf, f"{pilih}.pdf", "application/pdf")
+
+        with st.expander("Ekspor Laporan PDF Banyak Batch (ZIP)"):
+            awal_bulan = datetime.now(WIB).date().replace(day=1)
+            col1, col2 = st.columns(2)
+            with col1:
+                dari = st.date_input("Produksi dari", awal_bulan, key=widget_key("lihat","zip_dari"))
+            with col2:
+                sampai = st.date_input("Produksi sampai", datetime.now(WIB).date(), key=widget_key("lihat","zip_sampai"))
+            jumlah = len(cached(select_batches, dari, sampai))
+            st.caption(f"{jumlah} batch (termasuk arsip). PDF di-render paralel saat tombol diklik; "
+                       "batch yang tidak berubah diambil dari cache.")
+            st.download_button(
+                "Download ZIP Laporan", lambda: export_zip_bytes(dari, sampai),
+                f"laporan_{dari}_{sampai}.zip", "application/zip",
+                disabled=jumlah == 0, key=widget_key("lihat","zip_download"),
             )
 
-            # ===== TAMPILKAN TABEL HTML =====
-            df_view = df[[
-                "timestamp", "batch_id", "tanggal", "pic", "tempat_produksi",
-                "varian_produksi", "lokasi_gudang", "expired_date", "Status", "QR"
-            ]]
-
-            st.markdown(df_view.to_html(escape=False, index=False), unsafe_allow_html=True)
-
-            # ===== EXPORT PDF =====
-            pilih = st.selectbox("Ekspor PDF Batch", df["batch_id"].tolist(), key=widget_key("lihat_data","ekspor_pdf"))
-            if st.button("Ekspor PDF"):
-                pdf = export_pdf(pilih)
-                if pdf:
-                    st.download_button("Download PDF", open(pdf, "rb"), f"{pilih}.pdf")
-        else:
-            st.info("Tidak ada data.")
-
-    # ---------- Edit ----------
-    with tab3:
-        st.subheader("Edit Data")
-        df = pd.read_sql_query("SELECT * FROM produksi", conn)
-        if not df.empty:
-            pilih = st.selectbox("Pilih Batch", df["batch_id"].tolist(), key=widget_key("edit","pilih_batch"))
-            data = get_batch(pilih)
-            if data is not None:
-                info = data.iloc[0]
-
-                tempat = st.text_input("Tempat", info["tempat_produksi"])
-                varian = st.text_input("Varian", info["varian_produksi"])
-                gudang = st.text_input("Gudang", info["lokasi_gudang"])
-                expired = st.date_input("Expired", datetime.strptime(info["expired_date"], "%Y-%m-%d"))
-
-                if st.button("Simpan Perubahan"):
-                    cursor.execute("""
-                        UPDATE produksi SET tempat_produksi=?, varian_produksi=?, lokasi_gudang=?, expired_date=?, updated_at=?
-                        WHERE batch_id=?
-                    """, (tempat, varian, gudang, str(expired), now_wib(), pilih))
-                    conn.commit()
-                    st.success("Data diperbarui.")
-        else:
-            st.info("Tidak ada data.")
-
-    # ---------- Hapus ----------
-    with tab4:
-        st.subheader("Hapus Data")
-        df = pd.read_sql_query("SELECT * FROM produksi", conn)
-        if not df.empty:
-            pilih = st.selectbox("Pilih Batch", df["batch_id"].tolist(), key=widget_key("hapus","pilih_batch"))
-            if st.button("Hapus"):
-                cursor.execute("DELETE FROM produksi WHERE batch_id=?", (pilih,))
-                conn.commit()
-
-                p = QR_DIR / f"{pilih}.png"
-                if p.exists(): p.unlink()
-
-                st.warning(f"Batch {pilih} dihapus.")
-                log_activity(f"Hapus batch {pilih}")
+        with st.expander("Ekspor Data untuk ERP (CSV / XLSX / JSONL)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                tabel = st.radio("Data", ["produksi", "log_aktivitas"], horizontal=True, key=widget_key("ekspor","tabel"))
+                fmt = st.radio("Format", [f for f in EXPORT_FORMATS if f != "xlsx" or XLSX_AVAILABLE],
+                               horizontal=True, key=widget_key("ekspor","format"))
+                rentang = st.date_input("Rentang tanggal (kosongkan = semua)", [], key=widget_key("ekspor","rentang"))
+            filters = {"dari": None, "sampai": None}
+            if len(rentang) == 2:
+                filters.update(dari=str(rentang[0]), sampai=str(rentang[1]))
+            if tabel == "produksi":
+                with col2:
+                    filters["varian"] = st.multiselect("Varian", cached(distinct_values, "varian_produksi"), key=widget_key("ekspor","varian"))
+                    filters["gudang"] = st.multiselect("Lokasi Gudang", cached(distinct_values, "lokasi_gudang"), key=widget_key("ekspor","gudang"))
+                    filters["status"] = st.multiselect("Status", ["expired", "near", "fresh"], key=widget_key("ekspor","status"))
+            jumlah = cached(count_rows, tabel, filters["dari"], filters["sampai"],
+                            filters.get("varian"), filters.get("gudang"), filters.get("status"))
+            st.caption(f"{jumlah} baris. Untuk dump terjadwal: `python -m harlur.export` (lihat harlur/export.py).")
+            if not XLSX_AVAILABLE:
+                st.caption("XLSX butuh openpyxl (pip install openpyxl).")
+            st.download_button(
+                "Download Ekspor", lambda: export_data_bytes(tabel, fmt, filters),
+                export_filename(tabel, fmt), EXPORT_FORMATS[fmt],
+                disabled=jumlah == 0, key=widget_key("ekspor","download"),
+            )
+    else:
+        st.info("Tidak ada data.")
+
+
+# ---------- Edit ----------
+@bagian("edit")
+def section_edit():
+    st.subheader("Edit Data")
+    pilih = batch_picker("Pilih Batch", "edit")
+    if pilih:
+        data = get_batch(pilih)
+        if data is not None:
+            info = data.iloc[0]
+
+            tempat = st.text_input("Tempat", info["tempat_produksi"])
+            varian = st.text_input("Varian", info["varian_produksi"])
+            gudang = st.text_input("Gudang", info["lokasi_gudang"])
+            expired = st.date_input("Expired", datetime.strptime(info["expired_date"], "%Y-%m-%d"))
+
+            if st.button("Simpan Perubahan"):
+                produksi.update_batch(conn, pilih, tempat, varian, gudang, expired)
+                st.success("Data diperbarui.")
+                log_activity(f"Edit batch {pilih}")
+
+
+# ---------- Hapus ----------
+@bagian("hapus")
+def section_hapus():
+    st.subheader("Hapus Data")
+    pilih = batch_picker("Pilih Batch", "hapus")
+    if pilih and st.button("Hapus"):
+        # Soft delete: record & QR tetap ada untuk investigasi recall
+        if soft_delete(conn, pilih):
+            st.warning(f"Batch {pilih} dihapus.")
+            log_activity(f"Hapus batch {pilih}")
+
+    terhapus = cached(deleted_batches)
+    if not terhapus.empty:
+        with st.expander(f"Batch terhapus ({len(terhapus)})"):
+            st.dataframe(terhapus[["batch_id", "varian_produksi", "lokasi_gudang", "deleted_at"]], hide_index=True)
+            pulih = st.selectbox("Pulihkan Batch", terhapus["batch_id"].tolist(), key=widget_key("hapus","pulihkan"))
+            if st.button("Pulihkan"):
+                if restore_deleted(conn, pulih):
+                    st.success(f"Batch {pulih} dipulihkan.")
+                    log_activity(f"Pulihkan batch {pulih}")
+
+
+# ---------- Bulk ----------
+@bagian("bulk")
+def section_bulk():
+    st.subheader("Edit / Hapus Massal")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        f_varian = st.multiselect("Varian", cached(distinct_values, "varian_produksi"), key=widget_key("bulk","varian"))
+        f_tempat = st.multiselect("Tempat Produksi", cached(distinct_values, "tempat_produksi"), key=widget_key("bulk","tempat"))
+    with col2:
+        f_gudang = st.multiselect("Lokasi Gudang", cached(distinct_values, "lokasi_gudang"), key=widget_key("bulk","gudang"))
+        f_tanggal = st.date_input("Rentang Tanggal Produksi", [], key=widget_key("bulk","tanggal"))
+    with col3:
+        f_expired = st.date_input("Rentang Kedaluwarsa", [], key=widget_key("bulk","expired"))
+        f_upload = st.file_uploader("Daftar Batch ID (CSV/TXT)", ["csv", "txt"], key=widget_key("bulk","upload"))
+
+    batch_ids = None
+    if f_upload:
+        # Satu ID per baris; untuk CSV pakai kolom batch_id jika ada
+        text = f_upload.getvalue().decode("utf-8", errors="ignore")
+        if f_upload.name.endswith(".csv"):
+            up_df = pd.read_csv(io.StringIO(text), dtype=str)
+            kolom = "batch_id" if "batch_id" in up_df.columns else up_df.columns[0]
+            batch_ids = up_df[kolom].dropna().str.strip().str.upper().tolist()
         else:
-            st.info("Tidak ada data.")
-
-    # ---------- Backup & Restore ----------
-    with tab5:
-        st.subheader("Backup & Restore")
+            batch_ids = [b.strip().upper() for b in text.splitlines() if b.strip()]
+
+    filter_bulk = dict(
+        varian=f_varian, gudang=f_gudang, tempat=f_tempat,
+        tanggal=f_tanggal if len(f_tanggal) == 2 else None,
+        expired=f_expired if len(f_expired) == 2 else None,
+        batch_ids=batch_ids,
+    )
+    where, params = build_filter(conn, **filter_bulk)
+    # ID unggahan ada di tabel TEMP _bulk_ids yang tidak menaikkan data_versi,
+    # jadi isinya harus ikut kunci cache secara eksplisit
+    ids_key = tuple(sorted(set(batch_ids))) if batch_ids is not None else None
+    jumlah, contoh = QUERY_CACHE.get_or_compute(
+        conn, ("bulk_preview", where, tuple(params), ids_key), lambda: preview(conn, where, params)
+    )
+    st.caption(f"Dry run: {jumlah} batch akan terkena.")
+    if jumlah:
+        st.dataframe(contoh, hide_index=True)
+
+    aksi = st.radio("Aksi", ["Ubah", "Hapus"], horizontal=True, key=widget_key("bulk","aksi"))
+    changes = {}
+    if aksi == "Ubah":
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.checkbox("Ubah Tempat", key=widget_key("bulk","cek_tempat")):
+                changes["tempat_produksi"] = st.text_input("Tempat baru", key=widget_key("bulk","tempat_baru"))
+            if st.checkbox("Ubah Varian", key=widget_key("bulk","cek_varian")):
+                changes["varian_produksi"] = st.text_input("Varian baru", key=widget_key("bulk","varian_baru"))
+        with col2:
+            if st.checkbox("Ubah Gudang", key=widget_key("bulk","cek_gudang")):
+                changes["lokasi_gudang"] = st.text_input("Gudang baru", key=widget_key("bulk","gudang_baru"))
+            if st.checkbox("Ubah Kedaluwarsa", key=widget_key("bulk","cek_expired")):
+                changes["expired_date"] = st.date_input("Kedaluwarsa baru", key=widget_key("bulk","expired_baru"))
+
+    # Filter kosong berarti seluruh tabel — wajib dikonfirmasi eksplisit
+    tanpa_filter = params == [] and batch_ids is None
+    yakin = st.checkbox(
+        "Saya yakin menjalankan tanpa filter (semua batch)" if tanpa_filter else f"Konfirmasi {aksi.lower()} {jumlah} batch",
+        key=widget_key("bulk","konfirmasi")
+    )
+    if st.button("Jalankan", disabled=not (yakin and jumlah)):
+        keterangan = f"{jumlah} batch, filter: {describe_filter(**filter_bulk)}"
+        try:
+            if aksi == "Ubah":
+                op_id, n = bulk_update(conn, where, params, changes, keterangan)
+            else:
+                op_id, n = bulk_delete(conn, where, params, keterangan)
+            st.success(f"Operasi #{op_id}: {n} batch diproses. Bisa dibatalkan dalam {UNDO_WINDOW_MENIT} menit.")
+            log_activity(f"Bulk {aksi.lower()} #{op_id} ({n} batch, filter: {describe_filter(**filter_bulk)})")
+        except ValueError as e:
+            st.error(str(e))
+
+    ops = undoable_operations(conn)
+    if not ops.empty:
+        st.markdown("**Operasi yang masih bisa dibatalkan**")
+        st.dataframe(ops, hide_index=True)
+        op_pilih = st.selectbox("Batalkan Operasi", ops["id"].tolist(), key=widget_key("bulk","undo"))
+        if st.button("Undo"):
+            try:
+                n = undo(conn, int(op_pilih))
+                st.success(f"Operasi #{op_pilih} dibatalkan ({n} batch dipulihkan).")
+                log_activity(f"Undo bulk #{op_pilih} ({n} batch)")
+            except ValueError as e:
+                st.error(str(e))
+
+
+# ---------- Arsip ----------
+@bagian("arsip")
+def section_arsip():
+    st.subheader("Arsip Batch Lama")
+    bulan = st.number_input("Arsipkan batch yang kedaluwarsa lebih dari (bulan)", min_value=1, value=6, step=1)
+    kandidat = cached(archive_candidates, bulan)
+    st.caption(f"{kandidat} batch memenuhi kriteria.")
+    if st.button("Arsipkan Sekarang", disabled=kandidat == 0):
+        n = archive_expired(conn, bulan, qr_file)
+        st.success(f"{n} batch dipindahkan ke arsip.")
+        log_activity(f"Arsip {n} batch (expired > {bulan} bulan)")
+
+    arsip = cached(list_archived)
+    if not arsip.empty:
+        st.dataframe(arsip, hide_index=True)
+        kembali = st.selectbox("Kembalikan dari Arsip", arsip["batch_id"].tolist(), key=widget_key("arsip","kembalikan"))
+        if st.button("Kembalikan"):
+            if unarchive(conn, kembali, QR_STORE):
+                st.success(f"Batch {kembali} kembali ke data aktif.")
+                log_activity(f"Kembalikan batch {kembali} dari arsip")
+    else:
+        st.info("Arsip masih kosong.")
 
-        if st.button("Backup Sekarang"):
-            df = pd.read_sql_query("SELECT * FROM produksi", conn)
-            csv_bytes = df.to_csv(index=False).encode()
-            stamp = datetime.now(WIB).strftime('%Y%m%d_%H%M')
-            name = f"backup_{stamp}.csv"
-            backup_to_github(name, csv_bytes, "Backup manual")
 
-        GITHUB_USER = "frozeno24"
-        GITHUB_REPO = "harlur-traceability-qr"
-        TOKEN = st.secrets.get("GITHUB_TOKEN")
-        headers = {"Authorization": f"token {TOKEN}"}
+# ---------- Backup & Restore ----------
+@bagian("backup")
+def section_backup():
+    st.subheader("Backup & Restore")
 
-        api = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/backup"
-        files = []
+    if st.button("Backup Sekarang"):
+        csv_bytes = produksi_csv(conn)
+        stamp = datetime.now(WIB).strftime('%Y%m%d_%H%M')
+        name = f"backup_{stamp}.csv"
+        backup_to_github(name, csv_bytes, "Backup manual")
 
+    files = []
+    try:
+        files = [f for f in backup_backend().list() if f.endswith(".csv")]
+    except Exception:
+        pass
+
+    if files:
+        pilih = st.selectbox("Pilih Backup", sorted(files, reverse=True), key=widget_key("backup","pilih_backup"))
+        if st.button("Restore Backup"):
+            restore_from_github(pilih)
+    else:
+        st.info("Tidak ada file backup.")
+
+    with st.expander("Snapshot Database + QR"):
+        st.caption("Image database ringkas (VACUUM INTO) + bundel QR dalam satu file. "
+                   "Saat start tanpa database, app otomatis memulihkan snapshot terbaru.")
+        unggah = st.checkbox("Unggah juga ke GitHub", key=widget_key("snapshot","unggah"))
+        if st.button("Buat Snapshot"):
+            with st.spinner("Membuat snapshot..."):
+                snap = create_snapshot(DATA_DIR)
+            log_activity(f"Snapshot {snap.name}")
+            st.success(f"Snapshot dibuat: {snap.name} ({snap.stat().st_size / 1e6:.1f} MB)")
+            if unggah:
+                try:
+                    upload_snapshot(snap, backup_backend())
+                    st.success("Snapshot terunggah ke GitHub.")
+                except Exception as e:
+                    st.error(f"Gagal unggah snapshot: {e}")
+
+        snapshots = list_local(snapshot_dir(DATA_DIR))
+        if snapshots:
+            info = []
+            for p in snapshots:
+                m = read_manifest(p)
+                info.append({"file": p.name, "dibuat": m["created_at"], "batch": m["batches"],
+                             "qr": m["qr_files"], "MB": round(p.stat().st_size / 1e6, 1)})
+            st.dataframe(pd.DataFrame(info), hide_index=True)
+            pilih_snap = st.selectbox("Pulihkan Snapshot", [p.name for p in snapshots], key=widget_key("snapshot","pilih"))
+            if st.button("Pulihkan Snapshot"):
+                conn.close()
+                restore_snapshot(snapshot_dir(DATA_DIR) / pilih_snap, DATA_DIR)
+                clear_cache()
+                QUERY_CACHE.clear()
+                st.session_state["_snapshot_dipulihkan"] = pilih_snap
+                st.rerun()
+        if "_snapshot_dipulihkan" in st.session_state:
+            nama = st.session_state.pop("_snapshot_dipulihkan")
+            log_activity(f"Restore snapshot {nama}")
+            st.success(f"Snapshot {nama} dipulihkan.")
+
+    with st.expander("Sinkronisasi Antar Lokasi"):
+        info = sync_status(conn)
+        if info is None:
+            st.info(f"Sinkron belum aktif. Isi env {ENV_SYNC_SITE} (kode site stasiun ini) dan "
+                    f"{ENV_SYNC_HUB} (folder atau URL hub), lalu jalankan ulang app.")
+        else:
+            st.caption(f"Site {info['site']}: {info['pending']} batch menunggu dikirim. "
+                       "Perubahan tetap tersimpan di outbox selama offline.")
+            if info["cursors"]:
+                st.dataframe(pd.DataFrame(info["cursors"]), hide_index=True)
+            if st.button("Sinkronkan Sekarang", disabled=not SYNC_HUB):
+                try:
+                    hasil = run_sync(conn, open_hub(SYNC_HUB))
+                except Exception as e:
+                    st.error(f"Sinkron gagal, dicoba lagi nanti: {e}")
+                else:
+                    log_activity(f"Sinkron: kirim {hasil['pushed']} batch, terima {hasil['applied']} perubahan")
+                    st.success(f"{hasil['pushed']} batch dikirim, {hasil['changesets']} change set diterima "
+                               f"({hasil['applied']} diterapkan, {hasil['skipped']} kalah versi).")
+
+    with st.expander("Halaman Consumer Statis"):
+        st.caption("Pre-render kartu Consumer View semua batch untuk disajikan web server statis saat lonjakan scan. "
+                   "Build berikutnya hanya me-render batch yang diedit atau berganti status kedaluwarsa.")
+        mode_qr = st.radio("QR di halaman", ["link", "inline"], horizontal=True, key=widget_key("statis","mode_qr"))
+        semua = st.checkbox("Render ulang semua", key=widget_key("statis","semua"))
+        if st.button("Build Halaman Statis"):
+            with st.spinner("Membangun halaman..."):
+                hasil = build_site(conn, STATIC_DIR, qr_file, mode_qr, full=semua)
+            log_activity(f"Build halaman statis: {hasil['rendered']} halaman")
+            st.success(f"{hasil['rendered']} halaman di-render, {hasil['unchanged']} tetap, "
+                       f"{hasil['removed']} dihapus ({hasil['seconds']:.1f} s).")
+            st.code(str(STATIC_DIR))
+
+
+def page_manajemen_data():
+    st.title("📦 Manajemen Data Produksi")
+    # Hanya tab yang sedang dibuka yang dijalankan (query, listing QR,
+    # daftar backup GitHub); pindah tab = satu rerun penuh.
+    tabs = st.tabs(MANAJEMEN_TABS, key="manajemen_tab", on_change="rerun")
+    sections = [section_tambah, section_lihat, section_edit, section_hapus,
+                section_bulk, section_arsip, section_backup]
+    for tab, section in zip(tabs, sections):
+        with tab:
+            if tab.open:
+                section()
+
+# ===================== KATALOG VARIAN =====================
+def page_katalog_varian():
+    st.title("🏷️ Katalog Varian")
+    st.caption("Detail varian untuk Consumer View. Alias memetakan penulisan varian yang berbeda "
+               "(mis. \"Matcha Latte\", \"matcha\") ke satu varian.")
+
+    if "_varian_disimpan" in st.session_state:
+        st.success(f"Varian {st.session_state.pop('_varian_disimpan')} tersimpan.")
+    katalog = cached(list_varian)
+    st.dataframe(katalog, hide_index=True)
+
+    baru = "+ Varian baru"
+    pilih = st.selectbox("Pilih Varian", [baru] + katalog["nama"].tolist(), key=widget_key("varian","pilih"))
+    row = katalog[katalog["nama"] == pilih].iloc[0] if pilih != baru else None
+
+    def nilai(col, default=""):
+        return default if row is None or pd.isna(row[col]) else row[col]
+
+    with st.form(widget_key("varian", f"form_{pilih}")):
+        nama = st.text_input("Nama Varian", nilai("nama"))
+        deskripsi = st.text_area("Deskripsi", nilai("deskripsi"))
+        asal = st.text_area("Asal Bahan", nilai("asal_bahan"))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sweetness = st.slider("Sweetness", 0, 5, int(nilai("sweetness", 3)))
+        with col2:
+            aroma = st.slider("Aroma", 0, 5, int(nilai("aroma", 3)))
+        with col3:
+            body = st.slider("Body", 0, 5, int(nilai("body", 3)))
+        serving = st.text_input("Saran Penyajian", nilai("serving"))
+        alias = st.text_area("Alias (satu per baris)", "\n".join(nilai("alias").split(", ")) if nilai("alias") else "")
+        simpan = st.form_submit_button("Simpan Varian")
+
+    if simpan:
+        fields = {"nama": nama, "deskripsi": deskripsi, "asal_bahan": asal, "sweetness": sweetness,
+                  "aroma": aroma, "body": body, "serving": serving}
         try:
-            r = requests.get(api, headers=headers)
-            if r.status_code == 200:
-                for f in r.json():
-                    if f["name"].endswith(".csv"):
-                        files.append(f["name"])
-        except:
-            pass
-
-        if files:
-            pilih = st.selectbox("Pilih Backup", sorted(files, reverse=True), key=widget_key("backup","pilih_backup"))
-            if st.button("Restore Backup"):
-                restore_from_github(pilih)
+            save_varian(conn, None if row is None else int(row["id"]), fields, alias.splitlines())
+            log_activity(f"Simpan varian {nama}")
+            st.session_state["_varian_disimpan"] = nama
+            st.rerun()
+        except (ValueError, sqlite3.IntegrityError) as e:
+            st.error(f"Gagal menyimpan: {e}")
+
+    if row is not None and st.button("Hapus Varian", key=widget_key("varian","hapus")):
+        delete_varian(conn, int(row["id"]))
+        log_activity(f"Hapus varian {pilih}")
+        st.rerun()
+
+    st.subheader("Varian Belum Dikenali")
+    belum = cached(unmapped_texts)
+    if belum.empty:
+        st.success("Semua batch sudah terpetakan ke katalog.")
+    elif not katalog.empty:
+        st.dataframe(belum, hide_index=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            teks = st.selectbox("Teks varian", belum["varian_produksi"].tolist(), key=widget_key("varian","teks"))
+        with col2:
+            tujuan = st.selectbox("Jadikan alias dari", katalog["nama"].tolist(), key=widget_key("varian","tujuan"))
+        if st.button("Petakan", key=widget_key("varian","petakan")):
+            try:
+                n = add_alias(conn, int(katalog.loc[katalog["nama"] == tujuan, "id"].iloc[0]), teks)
+                log_activity(f"Alias varian '{teks}' -> {tujuan}")
+                st.success(f"{n} batch dipetakan ke {tujuan}.")
+            except ValueError as e:
+                st.error(str(e))
+
+    st.subheader("Jumlah Batch per Varian")
+    st.dataframe(cached(varian_counts), hide_index=True)
+
+# ===================== LOT & RECALL =====================
+def page_lot_recall():
+    st.title("🧪 Lot Bahan & Recall")
+    st.caption("Lot bahan baku supplier, lot campuran/olahan, dan batch yang memakainya.")
+
+    st.subheader("Telusur Maju: Lot → Batch")
+    kode_lot = cached(lot_codes)
+    if not kode_lot:
+        st.info("Belum ada lot bahan.")
+    else:
+        pilih_lot = st.selectbox("Lot bermasalah", kode_lot, key=widget_key("recall","lot"))
+        hasil = cached(trace_forward, pilih_lot)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Batch terdampak", len(hasil))
+        col2.metric("Masih aktif", int((hasil["status"] == "aktif").sum()))
+        col3.metric("Gudang", hasil.loc[hasil["status"] == "aktif", "lokasi_gudang"].nunique())
+        st.dataframe(forward_summary(hasil), hide_index=True)
+        with st.expander(f"Daftar {len(hasil)} batch"):
+            st.dataframe(hasil, hide_index=True)
+        st.download_button("Download Daftar Recall (CSV)", hasil.to_csv(index=False).encode(),
+                           f"recall_{pilih_lot}.csv", "text/csv", disabled=hasil.empty)
+
+    st.subheader("Telusur Mundur: Batch → Lot")
+    pilih = batch_picker("Batch", "recall")
+    if pilih:
+        lot_batch = cached(trace_backward, pilih)
+        if lot_batch.empty:
+            st.info(f"Belum ada lot bahan tercatat untuk {pilih}.")
         else:
-            st.info("Tidak ada file backup.")
+            st.caption("depth 0 = lot yang langsung dipakai; 1 dst. = lot asal dari lot campuran.")
+            st.dataframe(lot_batch, hide_index=True)
+
+    disimpan = st.session_state.pop("_lot_disimpan", None)
+    with st.expander("Lot Bahan", expanded=disimpan is not None):
+        if disimpan:
+            st.success(f"Lot {disimpan} tersimpan.")
+        with st.form("form_lot"):
+            col1, col2 = st.columns(2)
+            with col1:
+                kode = st.text_input("Kode Lot")
+                nama_bahan = st.text_input("Bahan", placeholder="matcha, cocoa, gula aren, ...")
+                supplier = st.text_input("Supplier")
+            with col2:
+                asal = st.text_input("Asal")
+                diterima = st.date_input("Tanggal Terima", datetime.now(WIB))
+                asal_lot = st.multiselect("Lot Asal (untuk lot campuran/olahan)", kode_lot)
+            simpan = st.form_submit_button("Simpan Lot")
+        if simpan:
+            try:
+                save_lot(conn, kode, nama_bahan, supplier, asal, diterima, lot_asal=asal_lot)
+                log_activity(f"Simpan lot bahan {kode}")
+                st.session_state["_lot_disimpan"] = kode
+                st.rerun()
+            except (ValueError, sqlite3.IntegrityError) as e:
+                st.error(f"Gagal menyimpan: {e}")
+        st.dataframe(cached(list_lots), hide_index=True)
+
+    with st.expander("Tautkan Lot ke Batch"):
+        pilih_batch = batch_picker("Batch", "tautan_lot")
+        if pilih_batch:
+            dipakai = st.multiselect("Lot yang dipakai", kode_lot,
+                                     default=[k for k in cached(trace_backward, pilih_batch)
+                                              .query("depth == 0")["kode"] if k in kode_lot],
+                                     key=widget_key("tautan_lot", f"lot_{pilih_batch}"))
+            if st.button("Simpan Tautan", key=widget_key("tautan_lot","simpan")):
+                link_batch(conn, pilih_batch, dipakai)
+                log_activity(f"Tautan lot {pilih_batch}: {', '.join(dipakai) or '-'}")
+                st.success(f"{len(dipakai)} lot ditautkan ke {pilih_batch}.")
+
+        upload = st.file_uploader("Import CSV (kolom batch_id, kode_lot, opsional jumlah, satuan)", type="csv",
+                                  key=widget_key("tautan_lot","csv"))
+        if upload is not None and st.button("Import Tautan", key=widget_key("tautan_lot","import")):
+            try:
+                n = import_links(conn, pd.read_csv(upload, dtype=str))
+                log_activity(f"Import {n} tautan batch-lot")
+                st.success(f"{n} tautan batch-lot diimpor.")
+            except ValueError as e:
+                st.error(str(e))
 
 # ===================== SCAN QR =====================
-elif menu == "Scan QR":
+def page_scan_qr():
     st.title("Scan QR Code")
     mode = st.radio("Metode Scan", ["Kamera", "Upload Gambar"])
 
@@ -433,9 +869,10 @@ elif menu == "Scan QR":
         class QRScan(VideoProcessorBase):
             def __init__(self): self.qr = None
             def recv(self, frame):
-                img = frame.to_ndarray(format="bgr24")
-                data,_,_ = cv2.QRCodeDetector().detectAndDecode(img)
-                if data: self.qr = data
+                with span("scan.recv"):
+                    img = frame.to_ndarray(format="bgr24")
+                    data = decode_qr(img)
+                    if data: self.qr = data
                 return frame
 
         ctx = webrtc_streamer(key="scan", mode=WebRtcMode.SENDRECV,
@@ -443,150 +880,267 @@ elif menu == "Scan QR":
                               media_stream_constraints={"video":True,"audio":False})
 
         if ctx.video_processor and ctx.video_processor.qr:
-            st.success(ctx.video_processor.qr)
+            st.success(batch_id_from_payload(ctx.video_processor.qr) or ctx.video_processor.qr)
             st.markdown(f"[Buka Tautan]({ctx.video_processor.qr})")
+            panel_mutasi(batch_id_from_payload(ctx.video_processor.qr))
 
     else:
         up = st.file_uploader("Unggah gambar", ["png","jpg","jpeg"])
         if up:
-            img = Image.open(up)
-            cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-            data,_,_ = cv2.QRCodeDetector().detectAndDecode(cv)
+            data = decode_qr(Image.open(up))
             if data:
-                st.success(data)
+                st.success(batch_id_from_payload(data) or data)
                 st.markdown(f"[Buka Tautan]({data})")
+                panel_mutasi(batch_id_from_payload(data))
             else:
                 st.error("QR tidak terbaca.")
 
+GUDANG_BARU = "➕ Gudang baru..."
+
+def pilih_gudang(label, options, name, default=None):
+    pilihan = list(options) + [GUDANG_BARU]
+    index = pilihan.index(default) if default in pilihan else 0
+    pilih = st.selectbox(label, pilihan, index=index, key=widget_key("mutasi", name))
+    if pilih == GUDANG_BARU:
+        return st.text_input(f"Nama {label.lower()}", key=widget_key("mutasi", f"{name}_baru"))
+    return pilih
+
+def panel_mutasi(batch_id):
+    """Catat barang masuk / pindah / keluar untuk batch hasil scan."""
+    if not batch_id:
+        return
+    st.subheader(f"📦 Mutasi Stok {batch_id}")
+    if "_mutasi_dicatat" in st.session_state:
+        st.success(st.session_state.pop("_mutasi_dicatat"))
+    df = get_batch(batch_id)
+    if df is None:
+        st.info("Batch tidak ada di data aktif; mutasi stok tidak bisa dicatat.")
+        return
+    posisi = cached(batch_stock, batch_id)
+    if posisi.empty:
+        st.caption("Belum ada stok tercatat untuk batch ini.")
+    else:
+        st.dataframe(posisi, hide_index=True)
+
+    jenis = st.radio("Jenis Mutasi", JENIS, horizontal=True, format_func=str.capitalize,
+                     key=widget_key("mutasi", "jenis"))
+    semua = cached(gudang_list)
+    ke, maks = None, None
+    if jenis == "masuk":
+        gudang = pilih_gudang("Gudang tujuan", semua, "masuk", default=df.iloc[0]["lokasi_gudang"])
+    elif posisi.empty:
+        st.warning("Batch ini belum punya stok di gudang mana pun; catat barang masuk dulu.")
+        return
+    else:
+        gudang = st.selectbox("Gudang asal", list(posisi["gudang"]), key=widget_key("mutasi", "dari"))
+        maks = int(posisi.loc[posisi["gudang"] == gudang, "jumlah"].iloc[0])
+        if jenis == "pindah":
+            ke = pilih_gudang("Gudang tujuan", [g for g in semua if g != gudang], "ke")
+    jumlah = st.number_input("Jumlah", min_value=1, max_value=maks, value=1, step=1,
+                             key=widget_key("mutasi", f"jumlah_{jenis}_{gudang}"))
+    catatan = st.text_input("Catatan", key=widget_key("mutasi", "catatan"), placeholder="No. surat jalan, tujuan, ...")
+
+    if st.button("Catat Mutasi", key=widget_key("mutasi", "catat")):
+        try:
+            record_movement(conn, batch_id, jenis, gudang, ke, jumlah, catatan)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            arah = f"{gudang} -> {ke}" if jenis == "pindah" else gudang
+            log_activity(f"Mutasi stok {jenis} {batch_id}: {jumlah} ({arah})")
+            st.session_state["_mutasi_dicatat"] = f"Mutasi {jenis} {batch_id} sebanyak {jumlah} tercatat ({arah})."
+            st.rerun()
+
+# ===================== STOK GUDANG =====================
+def page_stok_gudang():
+    st.title("🏬 Stok Gudang")
+    st.caption("Stok dihitung dari mutasi hasil scan QR (halaman Scan QR), bukan dari kolom lokasi gudang.")
+
+    stok = cached(stock_levels)
+    if stok.empty:
+        st.info("Belum ada mutasi stok. Scan QR batch lalu catat barang masuk.")
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total stok", f"{int(stok['jumlah'].sum()):,}")
+    col2.metric("Gudang", stok["gudang"].nunique())
+    col3.metric("Varian", stok["varian"].nunique())
+    st.dataframe(stok.pivot_table(index="gudang", columns="varian", values="jumlah", aggfunc="sum", fill_value=0))
+
+    st.subheader("Saran Ambil (FEFO)")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        gudang = st.selectbox("Gudang", sorted(stok["gudang"].unique()), key=widget_key("stok", "gudang"))
+    varian_gudang = stok[stok["gudang"] == gudang]
+    with col2:
+        varian = st.selectbox("Varian", ["Semua"] + list(varian_gudang["varian"]), key=widget_key("stok", "varian"))
+    with col3:
+        n = st.number_input("Jumlah batch", 1, 200, 20, key=widget_key("stok", "limit"))
+    variant_id = None if varian == "Semua" else int(
+        varian_gudang.loc[varian_gudang["varian"] == varian, "variant_id"].iloc[0])
+    saran = cached(fefo, gudang, variant_id, int(n))
+    if saran.empty:
+        st.info("Tidak ada stok yang belum kedaluwarsa.")
+    else:
+        st.dataframe(saran, hide_index=True)
+    kedaluwarsa = cached(expired_stock, gudang)
+    if not kedaluwarsa.empty:
+        st.warning(f"{len(kedaluwarsa)} batch kedaluwarsa ({int(kedaluwarsa['jumlah'].sum())} unit) masih tercatat "
+                   f"di {gudang}; keluarkan lewat Scan QR.")
+        with st.expander("Daftar stok kedaluwarsa"):
+            st.dataframe(kedaluwarsa, hide_index=True)
+
+    st.subheader("Mutasi Terbaru")
+    st.dataframe(cached(movements), hide_index=True)
+    with st.expander("Hitung Ulang Stok"):
+        st.caption("Menjumlah ulang seluruh buku mutasi; hanya perlu jika ringkasan stok diragukan.")
+        if st.button("Hitung Ulang dari Buku Mutasi", key=widget_key("stok", "rebuild")):
+            rebuild_stock(conn)
+            log_activity("Hitung ulang stok gudang")
+            st.rerun()
+
+# ===================== RIWAYAT BATCH =====================
+def page_riwayat_batch():
+    st.title("🕓 Riwayat Batch")
+
+    q = st.text_input("Cari Batch ID", key=widget_key("riwayat","cari"))
+    semua_batch = cached(history_batch_ids, q)
+    if not semua_batch:
+        st.info("Belum ada riwayat.")
+    else:
+        pilih = st.selectbox("Pilih Batch", semua_batch, key=widget_key("riwayat","pilih_batch"))
+        timeline = cached(batch_timeline, pilih)
+        st.subheader("Timeline")
+        st.dataframe(timeline, hide_index=True)
+
+        st.subheader("Rekonstruksi per Waktu")
+        col1, col2 = st.columns(2)
+        with col1:
+            tgl = st.date_input("Tanggal", datetime.now(WIB), key=widget_key("riwayat","tanggal"))
+        with col2:
+            jam = st.time_input("Jam", datetime.now(WIB).time(), key=widget_key("riwayat","jam"))
+        as_of = datetime.combine(tgl, jam)
+
+        snapshot = batch_as_of(conn, pilih, as_of)
+        if snapshot is None:
+            st.warning(f"Batch {pilih} belum ada atau sudah dihapus pada {as_of}.")
+        else:
+            st.dataframe(snapshot, hide_index=True)
+
+        if st.checkbox("Tampilkan seluruh tabel produksi pada waktu tersebut", key=widget_key("riwayat","semua")):
+            st.dataframe(produksi_as_of(conn, as_of), hide_index=True)
+
 # ===================== LOG AKTIVITAS =====================
-elif menu == "Log Aktivitas":
+def page_log_aktivitas():
     st.title("Log Aktivitas")
-    logs = pd.read_sql_query("SELECT * FROM log_aktivitas ORDER BY id DESC", conn)
+    logs = QUERY_CACHE.read_sql(conn, "SELECT * FROM log_aktivitas ORDER BY id DESC")
     st.dataframe(logs)
 
 # ===================== CONSUMER VIEW =====================
-elif menu == "Consumer View":
+def page_consumer_view():
     st.title("🔍 Informasi Produk Harlur Coffee")
 
     # AUTO ROUTE FROM QR
     params = st.query_params
-    batch_id = params.get("batch_id", "")
+    batch_id = batch_id_from_params(params)
 
     if not batch_id:
         st.warning("QR tidak berisi batch ID atau format URL tidak valid.")
-        st.stop()
+        return
 
-    df = pd.read_sql_query("SELECT * FROM produksi WHERE batch_id=?", conn, params=(batch_id,))
-    if df.empty:
+    df = get_batch(batch_id)
+    qr_bytes = None
+    if df is None:
+        # Batch lama sudah pindah ke arsip — tetap bisa ditampilkan
+        df = get_archived(conn, batch_id)
+        qr_bytes = archived_qr(conn, batch_id)
+    if df is None:
         st.error("Batch ID tidak ditemukan.")
-        st.stop()
+        return
 
     data = df.iloc[0]
-    varian = data["varian_produksi"].lower()
-
-    # ========== LOGIKA DATA ==========
-    VARIAN_DESKRIPSI = {
-        "coklat": "Bubuk coklat premium dengan rasa rich dan creamy.",
-        "matcha": "Matcha hijau berkualitas dengan aroma natural dan lembut.",
-        "kopi gula aren": "Espresso dengan gula aren asli, manis alami & beraroma kompleks.",
-        "thai tea": "Teh Thailand klasik dengan rempah lembut dan creamy finish."
-    }
-
-    ASAL_BAHAN = {
-        "coklat": "Kakao lokal dari Jawa Timur.",
-        "matcha": "Serbuk matcha impor dari Jepang.",
-        "kopi gula aren": "Kopi arabika Malabar + Gula aren Garut.",
-        "thai tea": "Daun teh Thailand dengan proses CTC."
-    }
-
-    TASTE_NOTES = {
-        "coklat": {"Sweetness": 4, "Aroma": 2, "Body": 4},
-        "matcha": {"Sweetness": 3, "Aroma": 3, "Body": 2},
-        "kopi gula aren": {"Sweetness": 4, "Aroma": 5, "Body": 4},
-        "thai tea": {"Sweetness": 4, "Aroma": 3, "Body": 3}
-    }
-
-    SERVING = {
-        "coklat": "Cocok panas atau dingin. Ideal 60–70°C jika disajikan hangat.",
-        "matcha": "Paling nikmat disajikan dengan es dan susu.",
-        "kopi gula aren": "Sajikan dingin (0–4°C).",
-        "thai tea": "Sajikan dengan es untuk aroma terbaik."
-    }
-
-    deskripsi = VARIAN_DESKRIPSI.get(varian, "Varian dengan standar kualitas Harlur Coffee.")
-    asal = ASAL_BAHAN.get(varian, "Bahan baku berasal dari distributor tersertifikasi.")
-    taste = TASTE_NOTES.get(varian, {"Sweetness": 3, "Aroma": 3, "Body": 3})
-    serving = SERVING.get(varian, "Dapat dinikmati panas atau dingin.")
-
-    # Hitung Expired (Fix Timezone issue)
-    days_left = (pd.to_datetime(data["expired_date"]) - datetime.now(WIB).replace(tzinfo=None)).days
-    
-    if days_left < 0:
-        badge = "<span style='color:#d32f2f; font-weight:bold; background:#ffebee; padding:2px 8px; border-radius:4px; border:1px solid #ffcdd2;'>🔴 Expired</span>"
-    elif days_left <= 30:
-        badge = "<span style='color:#f57c00; font-weight:bold; background:#fff3e0; padding:2px 8px; border-radius:4px; border:1px solid #ffe0b2;'>🟡 Near Expired</span>"
-    else:
-        badge = "<span style='color:#2e7d32; font-weight:bold; background:#e8f5e9; padding:2px 8px; border-radius:4px; border:1px solid #c8e6c9;'>🟢 Fresh</span>"
 
     # Siapkan QR
-    qr_path = QR_DIR / f"{batch_id}.png"
+    qr_path = qr_file(batch_id)
     qr_base64 = None
-    if qr_path.exists():
+    if qr_bytes is not None:
+        qr_base64 = base64.b64encode(qr_bytes).decode()
+    elif qr_path.exists():
         with open(qr_path, "rb") as f:
             qr_base64 = base64.b64encode(f.read()).decode()
 
-    # Pastikan string QR ini juga satu baris agar aman
-    qr_html = f"<img src='data:image/png;base64,{qr_base64}' width='150' style='display:block; margin: 10px auto; border-radius:8px;'>" if qr_base64 else "<i>QR Missing</i>"
-
-    # Visualisasi Dots
-    def dots(score):
-        return "<span style='color:#795548; font-size:16px;'>" + "●" * score + "</span>" + "<span style='color:#e0e0e0; font-size:16px;'>" + "○" * (5 - score) + "</span>"
-
-    taste_sweet = dots(taste["Sweetness"])
-    taste_aroma = dots(taste["Aroma"])
-    taste_body  = dots(taste["Body"])
-
-    # ========== PERBAIKAN UTAMA DI SINI ==========
-    # Perhatikan: Semua tag HTML di bawah ini MENTOK KIRI (tidak ada spasi di awal baris)
-    
-    html_card = f"""
-<div style="padding: 24px; border-radius: 16px; border: 1px solid #e0e0e0; box-shadow: 0 4px 12px rgba(0,0,0,0.08); background: #ffffff; font-family: sans-serif; color: #333; max-width: 500px; margin: auto;">
-<div style="text-align:center; margin-bottom:15px; border-bottom: 2px dashed #eee; padding-bottom: 15px;">
-<h2 style="margin:0; color:#4e342e; font-size: 26px;">{data['varian_produksi']}</h2>
-<p style="margin:10px 0 0 0; font-size:14px; color:#666;">BATCH: <b>{batch_id}</b> &nbsp;|&nbsp; {badge}</p>
-</div>
-<div style="text-align:center; margin-bottom:20px;">
-{qr_html}
-</div>
-<div style="margin-bottom:15px;">
-<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🍹 Deskripsi</div>
-<div style="font-size:14px; line-height:1.5;">{deskripsi}</div>
-</div>
-<div style="margin-bottom:15px;">
-<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🌱 Asal Bahan</div>
-<div style="font-size:14px; line-height:1.5;">{asal}</div>
-</div>
-<div style="margin-bottom:15px; background:#f5f5f5; padding:15px; border-radius:10px;">
-<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:10px; text-align:center;">🎯 Taste Notes</div>
-<div style="display:flex; justify-content:space-between; font-size:13px; text-align:center;">
-<div>Sweetness<br>{taste_sweet}</div>
-<div>Aroma<br>{taste_aroma}</div>
-<div>Body<br>{taste_body}</div>
-</div>
-</div>
-<div style="margin-bottom:15px;">
-<div style="font-weight:700; color:#4e342e; font-size:16px; margin-bottom:4px;">🏭 Detail Produksi</div>
-<ul style="font-size:14px; margin:0; padding-left:20px; color:#444;">
-<li><b>Tempat:</b> {data['tempat_produksi']}</li>
-<li><b>PIC:</b> {data['pic']}</li>
-<li><b>Gudang:</b> {data['lokasi_gudang']}</li>
-<li><b>Saran Penyajian:</b> {serving}</li>
-</ul>
-</div>
-<div style="margin-top:20px; font-size:11px; color:#aaa; text-align:center; border-top:1px solid #eee; padding-top:10px;">
-✅ Terverifikasi oleh Harlur Coffee Traceability System
-</div>
-</div>
-"""
-
-    st.markdown(html_card, unsafe_allow_html=True)
\ No newline at end of file
+    html_card = consumer_card_html(data, batch_id, qr_base64, info=info_for(conn, data))
+    st.markdown(html_card, unsafe_allow_html=True)
+
+# ===================== PERFORMANCE =====================
+def page_performance():
+    st.title("⏱️ Performance")
+    st.caption("Metrik dikumpulkan sejak proses Streamlit ini berjalan.")
+
+    snap = REGISTRY.snapshot()
+    if snap["spans"]:
+        perf = pd.DataFrame.from_dict(snap["spans"], orient="index").sort_values("total_s", ascending=False)
+        st.dataframe(perf.round(2), column_config={"_index": "span"})
+    else:
+        st.info("Belum ada data.")
+    if snap["counters"]:
+        st.json(snap["counters"])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Prometheus (text)", REGISTRY.to_prometheus(), "metrics.prom", "text/plain")
+    with col2:
+        st.download_button("JSON", REGISTRY.to_json(), "metrics.json", "application/json")
+    with col3:
+        if st.button("Reset Metrik"):
+            REGISTRY.reset()
+            st.rerun()
+
+    st.subheader("Cache Query")
+    cs = QUERY_CACHE.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit ratio", f"{cs['hit_ratio']:.0%}", f"{cs['hits']} hit / {cs['misses']} miss", delta_color="off")
+    col2.metric("Entri", cs["entries"])
+    col3.metric("Memori", f"{cs['bytes'] / 1e6:.1f} / {cs['max_bytes'] / 1e6:.0f} MB")
+    col4.metric("Versi data", cs["data_versi"] if cs["data_versi"] is not None else "-")
+    st.caption(f"{cs['evictions']} entri dibuang karena batas memori, {cs['invalidations']} kali dikosongkan karena data berubah.")
+    if st.button("Kosongkan Cache"):
+        QUERY_CACHE.clear()
+        st.rerun()
+
+    st.subheader("Profil cProfile")
+    if st.button("Profil rerun berikutnya"):
+        st.session_state["_profile_next"] = True
+        st.rerun()
+    hasil = st.session_state.get("_profile_result")
+    if hasil:
+        st.caption(f"Profil dari rerun {hasil['waktu']} (halaman {hasil['menu']})")
+        st.code(hasil["text"])
+        st.download_button("Download .prof", hasil["raw"], "rerun.prof")
+
+# ===================== ROUTING =====================
+PAGES = {
+    "Manajemen Data": page_manajemen_data,
+    "Katalog Varian": page_katalog_varian,
+    "Lot & Recall": page_lot_recall,
+    "Scan QR": page_scan_qr,
+    "Stok Gudang": page_stok_gudang,
+    "Riwayat Batch": page_riwayat_batch,
+    "Log Aktivitas": page_log_aktivitas,
+    "Consumer View": page_consumer_view,
+    "Performance": page_performance,
+}
+
+try:
+    with span(f"menu.{menu}"):
+        PAGES[menu]()
+finally:
+    if profiler is not None:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        with tempfile.NamedTemporaryFile(suffix=".prof") as f:
+            profiler.dump_stats(f.name)
+            raw = Path(f.name).read_bytes()
+        st.session_state["_profile_result"] = {
+            "waktu": now_wib(), "menu": menu, "text": out.getvalue(), "raw": raw,
+        }
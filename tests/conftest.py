@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from harlur.db import connect, init_db  # noqa: E402
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Pabrik database produksi kosong yang sudah diinisialisasi penuh."""
+    conns = []
+
+    def _make(name="data_produksi.db"):
+        conn = connect(tmp_path / name)
+        init_db(conn)
+        conns.append(conn)
+        return conn
+
+    yield _make
+    for conn in conns:
+        conn.close()
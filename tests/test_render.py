@@ -0,0 +1,28 @@
+from harlur.produksi import insert_batch
+from harlur.qr import batch_token
+from harlur.static_site import build_site
+from harlur.varian import save_varian
+
+SKRIP = "<script>alert(1)</script>"
+
+
+def test_halaman_statis_meng_escape_data_dan_katalog(make_db, tmp_path):
+    conn = make_db()
+    save_varian(conn, None, {
+        "nama": "Kopi <b>Susu</b>",
+        "deskripsi": f"Deskripsi {SKRIP}",
+        "asal_bahan": "<img src=x onerror=alert(1)>",
+        "serving": "Dingin & manis",
+    })
+    insert_batch(conn, "X-1", "2024-01-01", SKRIP, "Bandung <i>", "Kopi <b>Susu</b>", "Gudang \"A\"", "2099-01-01")
+
+    out = tmp_path / "site"
+    build_site(conn, out, lambda b: tmp_path / "qr" / f"{b}.png")
+    page = (out / "b" / f"{batch_token('X-1')}.html").read_text(encoding="utf-8")
+
+    assert SKRIP not in page
+    assert "<img src=x" not in page
+    assert "<b>Susu</b>" not in page
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in page
+    assert "Kopi &lt;b&gt;Susu&lt;/b&gt;" in page
+    assert "Dingin &amp; manis" in page
@@ -0,0 +1,65 @@
+import os
+import stat
+
+from harlur import snapshot
+from harlur.db import connect, init_db
+from harlur.produksi import insert_batch
+from harlur.storage import QR_DIR_NAME, QRStore
+
+
+def _snapshot(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    conn = connect(src / "data_produksi.db")
+    init_db(conn)
+    insert_batch(conn, "A-1", "2024-01-01", "Andi", "Bandung", "Arabica", "Gudang A", "2099-01-01")
+    conn.close()
+    QRStore(src / QR_DIR_NAME).write_bytes("A-1", b"qr-snapshot")
+    return snapshot.create_snapshot(src, tmp_path / "snaps")
+
+
+def test_restore_bermode_biasa(tmp_path):
+    zf = _snapshot(tmp_path)
+    dest = tmp_path / "dest"
+    snapshot.restore_snapshot(zf, dest)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE((dest / "data_produksi.db").stat().st_mode) == 0o666 & ~umask
+    assert QRStore(dest / QR_DIR_NAME).read_bytes("A-1") == b"qr-snapshot"
+
+
+def test_qr_root_dibuat_ulang_saat_restore(tmp_path, monkeypatch):
+    zf = _snapshot(tmp_path)
+    dest = tmp_path / "dest"
+    QRStore(dest / QR_DIR_NAME).write_bytes("LAMA", b"qr-lama")
+    replace = os.replace
+
+    def replace_lalu_app_menulis(src, dst):
+        replace(src, dst)
+        # Tepat setelah folder lama dipindah, app membuat qr_root lagi dan menyimpan QR baru
+        if str(src) == str(dest / QR_DIR_NAME):
+            QRStore(dest / QR_DIR_NAME).write_bytes("B-2", b"qr-baru")
+
+    monkeypatch.setattr(snapshot.os, "replace", replace_lalu_app_menulis)
+    thread = snapshot.restore_snapshot(zf, dest, background_qr=True)
+    thread.join()
+
+    assert thread.error is None and snapshot.qr_restore_error() is None
+    store = QRStore(dest / QR_DIR_NAME)
+    assert store.read_bytes("A-1") == b"qr-snapshot"
+    assert store.read_bytes("B-2") == b"qr-baru"
+    assert store.read_bytes("LAMA") is None
+    assert not list(dest.glob(".qr_*"))
+
+
+def test_kegagalan_thread_qr_terlihat(tmp_path, monkeypatch):
+    zf = _snapshot(tmp_path)
+
+    def gagal(zf_path, qr_root):
+        raise OSError("disk penuh")
+
+    monkeypatch.setattr(snapshot, "_extract_qr", gagal)
+    monkeypatch.setattr("threading.excepthook", lambda args: None)
+    thread = snapshot.restore_snapshot(zf, tmp_path / "dest", background_qr=True)
+    thread.join()
+    assert isinstance(snapshot.qr_restore_error(), OSError)
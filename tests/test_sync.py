@@ -0,0 +1,90 @@
+from harlur.arsip import attach_archive, archive_expired
+from harlur.produksi import insert_batch, update_batch
+from harlur.sync import DirHub, apply_changes, enable_sync, pending, sync
+
+
+def _row(conn, batch_id):
+    return conn.execute(
+        "SELECT pic, tempat_produksi, lokasi_gudang FROM produksi WHERE batch_id = ?", (batch_id,)
+    ).fetchone()
+
+
+def _dua_site(make_db, tmp_path):
+    ban, jkt = make_db("ban.db"), make_db("jkt.db")
+    enable_sync(ban, "BAN")
+    enable_sync(jkt, "JKT")
+    return ban, jkt, DirHub(tmp_path / "hub")
+
+
+def test_arsip_tidak_menghapus_batch_di_site_lain(make_db, tmp_path):
+    ban, jkt, hub = _dua_site(make_db, tmp_path)
+    insert_batch(ban, "BAN-1", "2020-01-01", "Andi", "Bandung", "Arabica", "Gudang A", "2020-06-01")
+    insert_batch(ban, "BAN-2", "2024-01-01", "Andi", "Bandung", "Arabica", "Gudang A", "2099-01-01")
+    sync(ban, hub)
+    sync(jkt, hub)
+    assert _row(jkt, "BAN-1") is not None
+
+    attach_archive(ban, tmp_path / "arsip.db")
+    assert archive_expired(ban, 1, lambda b: tmp_path / "qr" / f"{b}.png") == 1
+    assert pending(ban) == 0
+
+    sync(ban, hub)
+    hasil = sync(jkt, hub)
+    assert hasil["applied"] == 0
+    assert _row(jkt, "BAN-1") == ("Andi", "Bandung", "Gudang A")
+    assert _row(jkt, "BAN-2") is not None
+
+
+def test_push_melewati_batch_yang_sudah_diarsipkan(make_db, tmp_path):
+    ban, jkt, hub = _dua_site(make_db, tmp_path)
+    insert_batch(ban, "BAN-1", "2020-01-01", "Andi", "Bandung", "Arabica", "Gudang A", "2020-06-01")
+    sync(ban, hub)
+    sync(jkt, hub)
+
+    # Diubah lalu diarsipkan sebelum sempat dikirim: entri outbox tertinggal
+    update_batch(ban, "BAN-1", "Bandung", "Arabica", "Gudang B", "2020-06-01")
+    attach_archive(ban, tmp_path / "arsip.db")
+    archive_expired(ban, 1, lambda b: tmp_path / "qr" / f"{b}.png")
+    assert pending(ban) == 1
+
+    assert sync(ban, hub)["pushed"] == 0
+    sync(jkt, hub)
+    assert _row(jkt, "BAN-1") == ("Andi", "Bandung", "Gudang A")
+
+
+def test_konflik_last_writer_wins_konvergen(make_db, tmp_path):
+    ban, jkt, hub = _dua_site(make_db, tmp_path)
+    insert_batch(ban, "BAN-1", "2024-01-01", "Andi", "Bandung", "Arabica", "Gudang A", "2099-01-01")
+    sync(ban, hub)
+    sync(jkt, hub)
+
+    # Kedua site mengubah batch yang sama saat offline
+    update_batch(ban, "BAN-1", "Bandung", "Arabica", "Gudang BAN", "2099-01-01")
+    update_batch(jkt, "BAN-1", "Bandung", "Arabica", "Gudang JKT", "2099-01-01")
+    for _ in range(2):
+        sync(ban, hub)
+        sync(jkt, hub)
+
+    versi_ban = ban.execute("SELECT changed_at, tick, site FROM sync_versi WHERE batch_id = 'BAN-1'").fetchone()
+    versi_jkt = jkt.execute("SELECT changed_at, tick, site FROM sync_versi WHERE batch_id = 'BAN-1'").fetchone()
+    assert versi_ban == versi_jkt
+    assert _row(ban, "BAN-1") == _row(jkt, "BAN-1")
+    assert _row(ban, "BAN-1")[2] == f"Gudang {versi_ban[2]}"
+
+
+def test_apply_changes_versi_lama_dilewati(make_db):
+    conn = make_db()
+    enable_sync(conn, "BAN")
+    insert_batch(conn, "JKT-1", "2024-01-01", "Budi", "Jakarta", "Robusta", "Gudang A", "2099-01-01")
+    versi = list(conn.execute("SELECT changed_at, tick, site FROM sync_versi WHERE batch_id = 'JKT-1'").fetchone())
+    row = {"batch_id": "JKT-1", "pic": "Citra", "tempat_produksi": "Jakarta", "lokasi_gudang": "Gudang Z"}
+
+    lama = {"site": "JKT", "changes": [{"batch_id": "JKT-1", "versi": ["2000-01-01 00:00:00", 0, "JKT"], "row": row}]}
+    assert apply_changes(conn, lama) == (0, 1)
+    assert _row(conn, "JKT-1") == ("Budi", "Jakarta", "Gudang A")
+
+    baru = {"site": "JKT", "changes": [{"batch_id": "JKT-1", "versi": [versi[0], versi[1] + 1, "JKT"], "row": row}]}
+    assert apply_changes(conn, baru) == (1, 0)
+    assert _row(conn, "JKT-1") == ("Citra", "Jakarta", "Gudang Z")
+    # Perubahan hasil sinkron tidak masuk outbox lagi: hanya insert lokal yang menunggu
+    assert pending(conn) == 1